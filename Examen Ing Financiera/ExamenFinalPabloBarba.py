@@ -2,17 +2,36 @@ import streamlit as st
 import matplotlib.pyplot as plt
 import plotly.express as px
 import pandas as pd
-from datetime import timedelta
+from datetime import datetime
 import numpy as np
-import yfinance as yf
 import plotly.graph_objects as go
-import time
-import requests
-from yfinance import download
+
+from backtest import BLOQUE_TICKERS, PROCESOS_BACKTEST_APP, REJILLAS, backtest, comprar_y_mantener, resumen
+from cotizaciones import ultima_cotizacion
+from covarianza import estimar_covarianza
+from datos import TTL_HISTORIAL, cierres_desde, historial_periodo, recortar_periodo
+from frontera import frontera_optima, simular_portafolios
+from fundamentales import MULTIPLOS, TTL_FUNDAMENTALES, obtener_info, obtener_multiplos
+from graficas import PUNTOS_PANTALLA, UMBRAL_DENSIDAD, UMBRAL_WEBGL, linea, mapa_densidad
+from grafo import GrafoSecciones
+from indice_fundamentales import cargar_indice, elegir_pares, fila_ticker, posicion_en_grupo, version_indice
+from matriz_universo import leer_cierres
+from metricas import Cronometro, iniciar_servidor, metricas
+from indicadores import (DIAS_HABILES, IndicadoresEnVivo, beta_movil, cagr, macd, rendimiento_movil, rsi,
+                         sharpe_movil, tabla_indicadores, volatilidad_anual, volatilidad_movil)
+from planificador import SolicitudesAgotadasError
+from rebalanceo import CARTERAS, resumen_walk_forward, walk_forward
+from reportes import FORMATOS, avance_reporte, encolar_reporte
+from riesgo import tabla_riesgo, tabla_riesgo_activo
+from universo import cargar_universo
 
 # Configuración de la página
 st.set_page_config(page_title="Análisis Financiero", layout="wide")
 
+# Tiempos de cada sección de esta ejecución (y acumulados en las métricas del proceso)
+cronometro = Cronometro(metricas)
+iniciar_servidor()
+
 # -------- Sidebar --------
 with st.sidebar:
     st.title("📊 Panel de Análisis")
@@ -25,7 +44,25 @@ with st.sidebar:
 
     st.divider()
     
-    ticker_input = st.text_input("🔍 Ticker del S&P 500:", value="")
+    # Con el universo local el campo autocompleta por símbolo o nombre de la empresa
+    universo = cargar_universo()
+    if universo is not None:
+        ticker_input = st.selectbox(
+            "🔍 Ticker del S&P 500:", universo.opciones, index=None, format_func=universo.etiqueta,
+            placeholder="Símbolo o nombre de la empresa", accept_new_options=True, filter_mode="fuzzy",
+        ) or ""
+    else:
+        ticker_input = st.text_input("🔍 Ticker del S&P 500:", value="")
+
+    st.divider()
+
+    # Solo la tarjeta de precio y la gráfica se refrescan; el resto de la página no se recalcula
+    modo_en_vivo = st.toggle("🔴 Cotización en vivo", value=False)
+    intervalo_en_vivo = st.slider("Actualizar cada (segundos):", min_value=5, max_value=120, value=15, disabled=not modo_en_vivo)
+
+    st.divider()
+
+    modo_depuracion = st.toggle("🛠️ Panel de métricas", value=False)
 
 # -------- Encabezado principal --------
 st.markdown("""
@@ -41,101 +78,448 @@ st.divider()
 
 # -------- Funciones --------
 
+@metricas.medido()
 def validar_ticker(ticker):
+    # Búsqueda en memoria primero; un símbolo fuera de la tabla (SPY, otras
+    # bolsas) se confirma pidiendo su historial a través del planificador
+    if universo is not None and ticker in universo:
+        return True
     try:
-        data = download(ticker, period="1wk", progress=False)
+        data = historial_periodo(ticker, "1wk")
         return not data.empty
-    except requests.exceptions.HTTPError as e:
-        if e.response.status_code == 429:
-            print("🔴 Demasiadas solicitudes. Espera unos segundos.")
-            time.sleep(10)  # Espera 10 segundos
-            return validar_ticker(ticker)  # Reintentar
+    except SolicitudesAgotadasError:
+        print("🔴 Demasiadas solicitudes. Espera unos segundos.")
         return False
     except Exception:
         return False
 
 
+@metricas.medido()
 def obtener_info_empresa(ticker):
-    info = yf.Ticker(ticker).info
+    info = obtener_info(ticker)
     nombre = info.get("longName", "Nombre no disponible")
     sector = info.get("sector", "Sector no disponible")
     descripcion = info.get("longBusinessSummary", "Descripción no disponible")
     return nombre, sector, descripcion
 
-def calcular_cagr_1y(data):
-    if data.empty or "Close" not in data.columns:
-        return None
-    fecha_final = data.index[-1]
-    fecha_inicial = fecha_final - timedelta(days=365)
-    data_filtrada = data[data.index >= fecha_inicial]
-    if len(data_filtrada) < 2:
-        return None
 
-    precio_inicio = data_filtrada["Close"].iloc[0]
-    precio_fin = data_filtrada["Close"].iloc[-1]
+def indicadores_en_vivo(ticker):
+    """Estado de RSI, MACD y volatilidad de ``ticker`` al último cierre diario.
+    Se guarda en la sesión y en cada refresco solo se leen las barras desde el
+    último cierre visto; se arma de cero con todo el historial al cambiar de
+    ticker o si el historial ajustado cambió."""
+    guardado = st.session_state.get("indicadores_en_vivo")
+    indicadores = None
+    if guardado is not None and guardado["ticker"] == ticker:
+        indicadores = IndicadoresEnVivo.desde_estado(guardado["estado"])
+        cierres = cierres_desde(ticker, indicadores.fecha)
+        if not indicadores.sigue(cierres):
+            indicadores = None
+    if indicadores is None:
+        indicadores, cierres = IndicadoresEnVivo(), cierres_desde(ticker)
+    indicadores.avanzar(cierres)
+    st.session_state["indicadores_en_vivo"] = {"ticker": ticker, "estado": indicadores.estado()}
+    return indicadores
+
+
+def tarjeta_precio(ticker, data_actual):
+    # Usar valores individuales
+    precio_actual = float(data_actual["Close"].iloc[-1])
+    precio_anterior = float(data_actual["Close"].iloc[-2]) if len(data_actual) > 1 else precio_actual
+
+    open_ = float(data_actual["Open"].iloc[-1])
+    high_ = float(data_actual["High"].iloc[-1])
+    low_ = float(data_actual["Low"].iloc[-1])
+    close_ = float(data_actual["Close"].iloc[-1])
+
+    fecha = data_actual.index[-1].strftime('%Y-%m-%d')
+    titulo_ohlc = f"OHLC (último cierre - {fecha})"
+
+    # En modo en vivo se usa la última cotización del sondeo de fondo, si ya llegó
+    cotizacion = ultima_cotizacion(ticker, intervalo_en_vivo) if modo_en_vivo else None
+    if cotizacion is not None:
+        precio_actual = close_ = cotizacion["precio"]
+        precio_anterior = cotizacion["cierre_anterior"]
+        open_, high_, low_ = cotizacion["apertura"], cotizacion["maximo"], cotizacion["minimo"]
+        titulo_ohlc = f"OHLC (en vivo - {datetime.fromtimestamp(cotizacion['momento']):%H:%M:%S})"
+
+    # Indicadores con la cotización como cierre del día: cuesta lo mismo en cada refresco
+    linea_indicadores = ""
+    if cotizacion is not None:
+        vivos = indicadores_en_vivo(ticker).con_precio(precio_actual)
+        linea_indicadores = (
+            f"<br>📊 <strong>RSI (14):</strong> {vivos['RSI']:.1f} &nbsp;&nbsp; <strong>MACD:</strong> {vivos['MACD']:.2f} "
+            f"(señal {vivos['Señal']:.2f}) &nbsp;&nbsp; <strong>Volatilidad (252 días):</strong> {vivos['Volatilidad'] * 100:.2f}%"
+        )
+
+    cambio_pct = float(((precio_actual - precio_anterior) / precio_anterior) * 100)
+
+    color = "2ECC71" if cambio_pct >= 0 else "E74C3C"
+    flecha = "🔼" if cambio_pct >= 0 else "🔽"
+
+    # Mostrar datos en formato bonito
+    st.markdown(f"""
+    <div style="background-color:#F8F9F9; padding: 20px; border-radius: 10px; margin-bottom: 25px;">
+        <h3 style="color:#333333;">📈 Precio actual de <span style="color:#0072B2;">{ticker}</span>:</h3>
+        <div style="font-size: 26px; font-weight: bold; color: #{color};">
+            {precio_actual:.2f} USD &nbsp; {flecha} {cambio_pct:.2f}%
+        </div>
+        <br>
+        <div style="font-size: 16px; color: #555555;">
+            <strong>{titulo_ohlc}:</strong><br>
+            🟢 <strong>Apertura:</strong> {open_:.2f} &nbsp;&nbsp; 🔺 <strong>Máximo:</strong> {high_:.2f} &nbsp;&nbsp;
+            🔻 <strong>Mínimo:</strong> {low_:.2f} &nbsp;&nbsp; ⚪ <strong>Cierre:</strong> {close_:.2f}
+            {linea_indicadores}
+        </div>
+    </div>
+    """, unsafe_allow_html=True)
 
-    if isinstance(precio_inicio, pd.Series):
-        precio_inicio = precio_inicio.item()
-    if isinstance(precio_fin, pd.Series):
-        precio_fin = precio_fin.item()
 
-    if pd.isna(precio_inicio) or pd.isna(precio_fin):
-        return None
+def grafica_precio(ticker, data, periodo):
+    cierres = data["Close"]
+
+    # En modo en vivo el último punto sigue a la cotización actual
+    cotizacion = ultima_cotizacion(ticker, intervalo_en_vivo) if modo_en_vivo else None
+    if cotizacion is not None:
+        hoy = pd.Timestamp(datetime.fromtimestamp(cotizacion["momento"]).date())
+        cierres = cierres.copy()
+        cierres.loc[max(hoy, cierres.index[-1])] = cotizacion["precio"]
+
+    fig = go.Figure()
+    fig.add_trace(linea(
+        cierres,
+        mode="lines",
+        name="Precio de cierre",
+        line=dict(color="green", width=2)
+    ))
+
+    fig.update_layout(
+        title=f"Historial de Precio de Cierre: {ticker} ({periodo})",
+        xaxis_title="Fecha",
+        yaxis_title="Precio (USD)",
+        template="plotly_white",
+        height=500
+    )
+
+    st.plotly_chart(fig, use_container_width=True)
+
+
+def ventana_visible(fechas):
+    """Rango de fechas que se grafica. Si el historial no cabe en pantalla aparece
+    un control para acercarse: las series se vuelven a reducir sobre el rango
+    elegido, así que al acercarse se recupera el detalle."""
+    inicio, fin = fechas[0].to_pydatetime(), fechas[-1].to_pydatetime()
+    if len(fechas) <= PUNTOS_PANTALLA:
+        return inicio, fin
+    return st.slider("🔎 Ventana visible:", min_value=inicio, max_value=fin, value=(inicio, fin), format="YYYY-MM-DD")
+
+
+def controles_riesgo(clave):
+    """Nivel de confianza, horizonte y trayectorias simuladas de una sección de riesgo."""
+    col_nivel, col_horizonte, col_trayectorias = st.columns(3)
+    with col_nivel:
+        nivel = st.selectbox(
+            "Nivel de confianza:", [0.90, 0.95, 0.99], index=1, format_func=lambda n: f"{n:.0%}", key=f"nivel_{clave}"
+        )
+    with col_horizonte:
+        horizonte = st.select_slider("Horizonte (días hábiles):", options=[1, 5, 10, 21], value=1, key=f"horizonte_{clave}")
+    with col_trayectorias:
+        trayectorias = st.select_slider(
+            "Trayectorias simuladas:", options=[10_000, 100_000, 500_000], value=100_000, key=f"trayectorias_{clave}"
+        )
+    return nivel, horizonte, trayectorias
+
+
+def en_porcentaje(tabla):
+    return tabla.map(lambda v: f"{v * 100:.2f}%" if pd.notna(v) else "N/D")
+
+
+def tabla_backtest(tabla):
+    """Métricas del backtest con porcentajes; rotación y operaciones como números."""
+    formatos = {"Rotación anual": "{:.1f}", "Operaciones": "{:.1f}", "Tickers": "{:.0f}"}
+    return tabla.apply(lambda columna: columna.map(
+        lambda v: formatos.get(columna.name, "{:.2%}").format(v) if pd.notna(v) else "N/D"
+    ))
+
+
+def panel_reportes(con_sondeo):
+    """Avance y descargas de los reportes por lote de esta sesión. Mientras alguno
+    está en curso el panel se redibuja solo; al terminar el último se vuelve a
+    dibujar la página una vez, ya sin sondeo."""
+    avances = {id_: avance_reporte(id_) for id_ in st.session_state.get("reportes", [])}
+    avances = {id_: avance for id_, avance in avances.items() if avance is not None}
+    st.session_state["reportes"] = list(avances)
+
+    for id_, avance in reversed(avances.items()):
+        creado = datetime.fromtimestamp(avance["creado"])
+        st.caption(f"{creado:%H:%M:%S} · {', '.join(avance['tickers'][:5])}{'…' if avance['total'] > 5 else ''} · {avance['estado']}")
+        st.progress(avance["completados"] / avance["total"], text=f"{avance['completados']}/{avance['total']} tickers")
+        for formato, contenido in avance["archivos"].items():
+            st.download_button(
+                f"⬇️ {formato.upper()}", contenido, file_name=f"reporte_{creado:%Y%m%d_%H%M%S}.{formato}",
+                mime=FORMATOS[formato], key=f"descarga_{id_}_{formato}", on_click="ignore"
+            )
+        for formato, error in avance["errores_formato"].items():
+            st.warning(f"No se pudo generar {formato.upper()}: {error}")
+        if avance["errores"]:
+            st.caption("Sin reporte: " + ", ".join(f"{t} ({e})" for t, e in avance["errores"].items()))
+
+    if con_sondeo and all(avance["estado"] == "Listo" for avance in avances.values()):
+        st.rerun()
 
-    cagr = (precio_fin / precio_inicio) ** (1 / 1) - 1
-    return round(cagr * 100, 2)
 
-def calcular_cagr_3y(data):
-    if data.empty or "Close" not in data.columns:
-        return None
-    fecha_final = data.index[-1]
-    fecha_inicial = fecha_final - timedelta(days=1095)
-    data_filtrada = data[data.index >= fecha_inicial]
-    if len(data_filtrada) < 2:
-        return None
+def en_vivo(funcion):
+    """En modo en vivo, ``funcion`` se vuelve un fragmento que se redibuja solo,
+    cada ``intervalo_en_vivo`` segundos, sin volver a ejecutar el resto del script."""
+    if modo_en_vivo:
+        return st.fragment(funcion, run_every=intervalo_en_vivo)
+    return funcion
 
-    precio_inicio = data_filtrada["Close"].iloc[0]
-    precio_fin = data_filtrada["Close"].iloc[-1]
 
-    if isinstance(precio_inicio, pd.Series):
-        precio_inicio = precio_inicio.item()
-    if isinstance(precio_fin, pd.Series):
-        precio_fin = precio_fin.item()
+# -------- Secciones del análisis --------
+# Cada cálculo pesado es un nodo del grafo: al mover un widget solo se rehacen
+# los nodos cuyas entradas cambiaron y los que dependen de ellos.
+grafo = GrafoSecciones(st.session_state.setdefault("grafo_secciones", {}))
 
-    if pd.isna(precio_inicio) or pd.isna(precio_fin):
-        return None
 
-    cagr = (precio_fin / precio_inicio) ** (1 / 1) - 1
-    return round(cagr * 100, 2)
+@grafo.nodo(entradas=("ticker",), ttl=TTL_HISTORIAL)
+def rendimientos_activo(ticker):
+    # CAGR anualizado sobre cierres sin ajustar (los reportes por lote usan las mismas funciones)
+    cierres_5y = historial_periodo(ticker, "5y", ajustado=False)["Close"]
+    cierres_1y = historial_periodo(ticker, "1y", ajustado=False)["Close"]
+    cagrs = tuple(None if pd.isna(c) else float(c) for c in (cagr(cierres_5y, años) for años in (1, 3, 5)))
 
-def calcular_cagr_5y(data):
-    if data.empty or "Close" not in data.columns:
-        return None
-    fecha_final = data.index[-1]
-    fecha_inicial = fecha_final - timedelta(days=1825)
-    data_filtrada = data[data.index >= fecha_inicial]
-    if len(data_filtrada) < 2:
-        return None
+    # Volatilidad con rendimientos diarios logarítmicos del último año
+    if len(cierres_1y.dropna()) < 2:
+        return cagrs, None
+    return cagrs, round(float(volatilidad_anual(cierres_1y)) * 100, 2)
 
-    precio_inicio = data_filtrada["Close"].iloc[0]
-    precio_fin = data_filtrada["Close"].iloc[-1]
 
-    if isinstance(precio_inicio, pd.Series):
-        precio_inicio = precio_inicio.item()
-    if isinstance(precio_fin, pd.Series):
-        precio_fin = precio_fin.item()
+@grafo.nodo(entradas=("ticker", "nivel", "horizonte", "trayectorias"), ttl=TTL_HISTORIAL)
+def riesgo_activo(ticker, nivel, horizonte, trayectorias):
+    cierres = historial_periodo(ticker, "3y")["Close"].rename(ticker)
+    return tabla_riesgo_activo(cierres, nivel, horizonte, trayectorias, semilla=0)
 
-    if pd.isna(precio_inicio) or pd.isna(precio_fin):
-        return None
 
-    cagr = (precio_fin / precio_inicio) ** (1 / 1) - 1
-    return round(cagr * 100, 2)
+@grafo.nodo(entradas=("ticker",), dependencias=("rendimientos_activo",))
+def grafica_rendimientos(ticker, rendimientos_activo):
+    periodos = ["1 año", "3 años", "5 años"]
+    rendimientos = [r if r is not None else 0 for r in rendimientos_activo[0]]
+
+    # Gráfico de barras horizontales
+    fig_bar, ax = plt.subplots(figsize=(8, 2.5))
+    colores = ["green" if r >= 0 else "red" for r in rendimientos]
+    bars = ax.barh(periodos, rendimientos, color=colores, height=0.5)
+
+    # Etiquetas
+    for i, v in enumerate(rendimientos):
+        ax.text(v + 0.5 if v >= 0 else v - 5, i, f"{v:.2f}%", va='center', fontsize=10, color='#333')
+
+    ax.set_xlabel("Rendimiento (%)")
+    ax.set_xlim(min(-10, min(rendimientos) - 5), max(10, max(rendimientos) + 5))
+    ax.set_title(f"Rendimiento anualizado - {ticker}", fontsize=13)
+    ax.axvline(0, color='gray', linewidth=0.8)
+    ax.spines[['top', 'right']].set_visible(False)
+    ax.grid(axis='x', linestyle='--', alpha=0.3)
+    return fig_bar
+
+
+@grafo.nodo(entradas=("ticker", "periodo_seleccionado"), ttl=TTL_HISTORIAL)
+def indicadores_tecnicos(ticker, periodo_seleccionado):
+    data = historial_periodo(ticker, periodo_seleccionado)
+    data["RSI"] = rsi(data["Close"], ventana=14)
+    data["MACD"], data["Signal"] = macd(data["Close"], rapida=12, lenta=26, senal=9)
+    return data
+
+
+@grafo.nodo(entradas=("ticker", "comparables"), ttl=TTL_FUNDAMENTALES)
+def multiplos(ticker, comparables):
+    df_val = pd.DataFrame([obtener_multiplos(ticker)])
+    df_comparables = pd.DataFrame([obtener_multiplos(comp) for comp in comparables])
+    return df_val, df_comparables
+
+
+@grafo.nodo(entradas=("ticker", "criterio_pares", "version_indice"))
+def multiplos_indice(ticker, criterio_pares, version_indice):
+    # Todo sale del índice local; solo un ticker fuera del índice consulta su .info
+    indice_sp500 = cargar_indice()
+    fila = fila_ticker(indice_sp500, ticker)
+    pares, criterio = elegir_pares(indice_sp500, fila, criterio_pares)
+
+    columnas = list(MULTIPLOS)
+    df_val = pd.DataFrame([{"Ticker": ticker, **fila[columnas].astype(float).to_dict()}])
+    df_comparables = indice_sp500.loc[pares, columnas].astype(float).rename_axis("Ticker").reset_index()
+    posicion = posicion_en_grupo(fila, indice_sp500.loc[pares]).astype(float)
+    return df_val, df_comparables, posicion, f"{criterio}: {fila[criterio]}"
+
+
+@grafo.nodo(entradas=("tickers",), ttl=TTL_HISTORIAL)
+def cierres_portafolio(tickers):
+    # Cierres de todo el historial en float32; los tickers de la matriz del universo no se descargan
+    return leer_cierres(tickers)
+
+
+@grafo.nodo(dependencias=("cierres_portafolio",))
+def tabla_portafolio(cierres_portafolio):
+    cierres, _ = cierres_portafolio
+    return tabla_indicadores(recortar_periodo(cierres, "5y"))
+
+
+ESTIMADORES_COVARIANZA = {
+    "Ledoit-Wolf": "ledoit_wolf",
+    "Muestral": "muestral",
+    "Exponencial (EWMA)": "ewma",
+    "Modelo de factores": "factores",
+}
+# Con más activos que esto la covarianza se estima en float32 (mitad de memoria)
+ACTIVOS_FLOAT32 = 200
+
+
+@grafo.nodo(entradas=("estimador",), dependencias=("cierres_portafolio",))
+def estimacion_portafolio(estimador, cierres_portafolio):
+    cierres, _ = cierres_portafolio
+    precios = recortar_periodo(cierres, "3y")
+
+    # Rendimientos medios y covarianza anuales; cada par de tickers usa las fechas que tienen ambos
+    dtype = np.float32 if precios.shape[1] > ACTIVOS_FLOAT32 else np.float64
+    return estimar_covarianza(precios, ESTIMADORES_COVARIANZA[estimador], dtype=dtype)
+
+
+@grafo.nodo(entradas=("modo_frontera", "n_portfolios", "rf", "cota_max"), dependencias=("estimacion_portafolio",))
+def frontera(modo_frontera, n_portfolios, rf, cota_max, estimacion_portafolio):
+    mean_returns, cov_matrix = estimacion_portafolio
+    if modo_frontera == "Optimización exacta":
+        # ~100 puntos exactos de la frontera por la línea crítica (long-only, con tope por activo)
+        return frontera_optima(mean_returns, cov_matrix, rf=rf, cota_max=cota_max)
+    # Simulación de portafolios (matriz de pesos n_portfolios x n_activos)
+    return simular_portafolios(mean_returns, cov_matrix, n_portfolios, rf=rf)
+
+
+@grafo.nodo(entradas=("modo_frontera",), dependencias=("frontera",))
+def grafica_frontera(modo_frontera, frontera):
+    df_portafolios, _ = frontera
+    titulo = f"Frontera Eficiente del Portafolio ({modo_frontera})"
+    etiquetas = {"Volatilidad": "Volatilidad Esperada", "Rendimiento": "Rendimiento Esperado"}
+
+    # Nubes muy grandes: mapa de calor con el mejor Sharpe de cada celda
+    if len(df_portafolios) > UMBRAL_DENSIDAD:
+        return mapa_densidad(df_portafolios, "Volatilidad", "Rendimiento", "Sharpe Ratio",
+                             titulo=titulo, labels=etiquetas, height=600)
+
+    fig = px.scatter(
+            df_portafolios,
+            x="Volatilidad",
+            y="Rendimiento",
+            color="Sharpe Ratio",
+            color_continuous_scale="Turbo",
+            title=titulo,
+            labels=etiquetas,
+            height=600,
+            render_mode="webgl" if len(df_portafolios) > UMBRAL_WEBGL else "svg"
+        )
+    if modo_frontera == "Optimización exacta":
+        fig.update_traces(mode="lines+markers")
+    return fig
+
+
+@grafo.nodo(
+    entradas=("nivel", "horizonte", "trayectorias"),
+    dependencias=("cierres_portafolio", "estimacion_portafolio", "frontera"),
+)
+def riesgo_portafolios(nivel, horizonte, trayectorias, cierres_portafolio, estimacion_portafolio, frontera):
+    cierres, _ = cierres_portafolio
+    mean_returns, cov_matrix = estimacion_portafolio
+    df_portafolios, matriz_pesos = frontera
+    precios = recortar_periodo(cierres, "3y")[mean_returns.index]
+
+    tablas = {}
+    for nombre, idx in (("Máximo Sharpe Ratio", df_portafolios["Sharpe Ratio"].idxmax()),
+                        ("Mínima Volatilidad", df_portafolios["Volatilidad"].idxmin())):
+        tablas[nombre] = tabla_riesgo(
+            precios, matriz_pesos[idx], mean_returns, cov_matrix, nivel, horizonte, trayectorias, semilla=0
+        )
+    return pd.concat(tablas, axis=1)
+
+
+ETIQUETAS_REJILLA = {
+    "ventana": "Ventana RSI", "inferior": "Banda inferior", "superior": "Banda superior",
+    "rapida": "EMA rápida", "lenta": "EMA lenta", "senal": "Señal",
+}
+
+
+@grafo.nodo(entradas=("estrategia_bt", "periodo_bt", "costo_bt", "rejilla_bt"), dependencias=("cierres_portafolio",))
+def backtest_senales(estrategia_bt, periodo_bt, costo_bt, rejilla_bt, cierres_portafolio):
+    cierres, _ = cierres_portafolio
+    precios = recortar_periodo(cierres, periodo_bt)
+    # Con pocos tickers levantar procesos cuesta más que evaluar la rejilla en serie
+    procesos = PROCESOS_BACKTEST_APP if precios.shape[1] > BLOQUE_TICKERS else 1
+    resultados = backtest(precios, estrategia_bt, rejilla_bt, costo_bt, procesos)
+    return resultados, comprar_y_mantener(precios)
+
+
+# La ventana móvil de ``rebalanceo`` solo admite estimadores con sumas acumulables (sin EWMA)
+ESTIMADORES_WALK_FORWARD = {nombre: metodo for nombre, metodo in ESTIMADORES_COVARIANZA.items() if metodo != "ewma"}
+
+
+@grafo.nodo(
+    entradas=("ventana_wf", "frecuencia_wf", "estimador_wf", "costo_wf", "rf", "cota_max"),
+    dependencias=("cierres_portafolio",),
+)
+def walk_forward_portafolios(ventana_wf, frecuencia_wf, estimador_wf, costo_wf, rf, cota_max, cierres_portafolio):
+    cierres, _ = cierres_portafolio
+    valores, pesos, rotacion = walk_forward(
+        cierres, ventana_wf * DIAS_HABILES, frecuencia_wf, ESTIMADORES_WALK_FORWARD[estimador_wf], rf, cota_max, costo_wf
+    )
+    return valores, pesos, resumen_walk_forward(valores, rotacion, rf, costo_wf)
+
+
+VENTANAS_ANALISIS = {"1 mes": 21, "3 meses": 63, "6 meses": 126, "1 año": 252}
+
+
+@grafo.nodo(entradas=("referencia", "rf"), dependencias=("cierres_portafolio",), ttl=TTL_HISTORIAL)
+def analisis_movil(referencia, rf, cierres_portafolio):
+    # Todo el historial disponible y todas las ventanas a la vez (costo lineal en el largo del historial)
+    precios, _ = cierres_portafolio
+    ventanas = tuple(VENTANAS_ANALISIS.values())
+    series = {
+        "Volatilidad": volatilidad_movil(precios, ventanas),
+        "Rendimiento": rendimiento_movil(precios, ventanas),
+        "Sharpe": sharpe_movil(precios, ventanas, rf=rf),
+    }
+    data_referencia = historial_periodo(referencia, "max") if referencia else pd.DataFrame()
+    if not data_referencia.empty and "Close" in data_referencia.columns:
+        series["Beta"] = beta_movil(precios, data_referencia["Close"], ventanas)
+    return series
+
+
+@grafo.nodo(entradas=("metrica_movil", "ventanas_movil", "referencia"), dependencias=("analisis_movil",))
+def grafica_movil(metrica_movil, ventanas_movil, referencia, analisis_movil):
+    tabla = analisis_movil[metrica_movil]
+    en_porcentaje = metrica_movil in ("Volatilidad", "Rendimiento")
+
+    fig = go.Figure()
+    for etiqueta in ventanas_movil:
+        for tkr, serie in tabla[VENTANAS_ANALISIS[etiqueta]].items():
+            fig.add_trace(linea(serie * 100 if en_porcentaje else serie, mode="lines", name=f"{tkr} ({etiqueta})"))
+
+    titulo = f"{metrica_movil} móvil" + (f" contra {referencia}" if metrica_movil == "Beta" else "")
+    fig.update_layout(
+        title=titulo,
+        xaxis_title="Fecha",
+        yaxis_title=f"{metrica_movil} (%)" if en_porcentaje else metrica_movil,
+        template="plotly_white",
+        height=500
+    )
+    return fig
 
 
 # -------- Lógica principal --------
+cronometro.marca("Inicio y barra lateral")
+
 if ticker_input:
-    ticker_input = ticker_input.upper()
-    if validar_ticker(ticker_input):
+    ticker_input = ticker_input.upper().strip()
+    ticker_valido = validar_ticker(ticker_input)
+    if ticker_valido:
         st.success(f"✅ Información encontrada para: **{ticker_input}**")
         
         st.divider()
@@ -156,43 +540,13 @@ if ticker_input:
         """, unsafe_allow_html=True)
     
         st.divider()
+        cronometro.marca("Información de la empresa")
         
             # Obtener precio actual y datos OHLC (últimos 2 días)
-    data_actual = yf.download(ticker_input, period="2d", interval="1d")
+    data_actual = historial_periodo(ticker_input, "2d") if ticker_valido else pd.DataFrame()
 
     if not data_actual.empty and "Close" in data_actual.columns:
-        # Usar valores individuales
-        precio_actual = float(data_actual["Close"].iloc[-1])
-        precio_anterior = float(data_actual["Close"].iloc[-2]) if len(data_actual) > 1 else precio_actual
-
-
-        cambio_pct = float(((precio_actual - precio_anterior) / precio_anterior) * 100)
-
-        color = "2ECC71" if cambio_pct >= 0 else "E74C3C"
-        flecha = "🔼" if cambio_pct >= 0 else "🔽"
-
-        open_ = float(data_actual["Open"].iloc[-1])
-        high_ = float(data_actual["High"].iloc[-1])
-        low_ = float(data_actual["Low"].iloc[-1])
-        close_ = float(data_actual["Close"].iloc[-1])
-
-        fecha = data_actual.index[-1].strftime('%Y-%m-%d')
-
-        # Mostrar datos en formato bonito
-        st.markdown(f"""
-        <div style="background-color:#F8F9F9; padding: 20px; border-radius: 10px; margin-bottom: 25px;">
-            <h3 style="color:#333333;">📈 Precio actual de <span style="color:#0072B2;">{ticker_input}</span>:</h3>
-            <div style="font-size: 26px; font-weight: bold; color: #{color};">
-                {precio_actual:.2f} USD &nbsp; {flecha} {cambio_pct:.2f}%
-            </div>
-            <br>
-            <div style="font-size: 16px; color: #555555;">
-                <strong>OHLC (último cierre - {fecha}):</strong><br>
-                🟢 <strong>Apertura:</strong> {open_:.2f} &nbsp;&nbsp; 🔺 <strong>Máximo:</strong> {high_:.2f} &nbsp;&nbsp;
-                🔻 <strong>Mínimo:</strong> {low_:.2f} &nbsp;&nbsp; ⚪ <strong>Cierre:</strong> {close_:.2f}
-            </div>
-        </div>
-        """, unsafe_allow_html=True)
+        en_vivo(tarjeta_precio)(ticker_input, data_actual)
 
 
         st.divider()
@@ -216,40 +570,25 @@ if ticker_input:
 
         # Mostrar gráfica si hay ticker
         if ticker_input:
-            data = yf.Ticker(ticker_input).history(period=periodo_seleccionado, interval="1d", auto_adjust=True)
+            data = historial_periodo(ticker_input, periodo_seleccionado)
+            ventana = (None, None)
 
             if data.empty or "Close" not in data.columns:
                 st.warning("⚠️ No se encontraron datos válidos para este ticker.")
             else:
-                data.index = data.index.tz_localize(None)
-
-                fig = go.Figure()
-                fig.add_trace(go.Scatter(
-                    x=data.index,
-                    y=data["Close"],
-                    mode="lines",
-                    name="Precio de cierre",
-                    line=dict(color="green", width=2)
-                ))
-
-                fig.update_layout(
-                    title=f"Historial de Precio de Cierre: {ticker_input} ({periodo})",
-                    xaxis_title="Fecha",
-                    yaxis_title="Precio (USD)",
-                    template="plotly_white",
-                    height=500
-                )
-
-                st.plotly_chart(fig, use_container_width=True)
+                ventana = ventana_visible(data.index)
+                en_vivo(grafica_precio)(ticker_input, data.loc[ventana[0]:ventana[1]], periodo)
 
         
         st.divider()
 
+        cronometro.marca("Precio y gráfica")
+
         # -------- Rendimiento anualizado (CAGR) --------
         st.subheader("📈 Cálculo de Rendimientos Anualizados")
 
-        precios_1y = yf.download(ticker_input, period="1y")
-        rendimiento_anual = calcular_cagr_1y(precios_1y)
+        (rendimiento_1, rendimiento_3, rendimiento_5), volatilidad_pct = grafo.valor("rendimientos_activo", ticker=ticker_input)
+        rendimiento_anual = rendimiento_1
  
         if rendimiento_anual is not None:
             st.markdown(f"""
@@ -261,8 +600,7 @@ if ticker_input:
             </div>
             """, unsafe_allow_html=True)
 
-        precios_3y = yf.download(ticker_input, period="3y")
-        rendimiento_anual = calcular_cagr_3y(precios_3y)
+        rendimiento_anual = rendimiento_3
  
         if rendimiento_anual is not None:
             st.markdown(f"""
@@ -274,8 +612,7 @@ if ticker_input:
             </div>
             """, unsafe_allow_html=True)
 
-        precios_5y = yf.download(ticker_input, period="5y")
-        rendimiento_anual = calcular_cagr_5y(precios_5y)
+        rendimiento_anual = rendimiento_5
  
         if rendimiento_anual is not None:
             st.markdown(f"""
@@ -302,35 +639,7 @@ if ticker_input:
          # -------- Gráfico comparativo de rendimientos (estético) --------
         st.subheader("📊 Comparación visual de rendimientos anualizados")
 
-        # Crear listas de datos
-        periodos = ["1 año", "3 años", "5 años"]
-        rendimientos = []
-
-        # Recalcular para asegurar consistencia
-        rendimiento_1 = calcular_cagr_1y(precios_1y)
-        rendimiento_3 = calcular_cagr_3y(precios_3y)
-        rendimiento_5 = calcular_cagr_5y(precios_5y)
-
-        for r in [rendimiento_1, rendimiento_3, rendimiento_5]:
-            rendimientos.append(r if r is not None else 0)
-
-        # Gráfico de barras horizontales
-        fig_bar, ax = plt.subplots(figsize=(8, 2.5))
-        colores = ["green" if r >= 0 else "red" for r in rendimientos]
-        bars = ax.barh(periodos, rendimientos, color=colores, height=0.5)
-
-        # Etiquetas
-        for i, v in enumerate(rendimientos):
-            ax.text(v + 0.5 if v >= 0 else v - 5, i, f"{v:.2f}%", va='center', fontsize=10, color='#333')
-
-        ax.set_xlabel("Rendimiento (%)")
-        ax.set_xlim(min(-10, min(rendimientos) - 5), max(10, max(rendimientos) + 5))
-        ax.set_title(f"Rendimiento anualizado - {ticker_input}", fontsize=13)
-        ax.axvline(0, color='gray', linewidth=0.8)
-        ax.spines[['top', 'right']].set_visible(False)
-        ax.grid(axis='x', linestyle='--', alpha=0.3)
-
-        st.pyplot(fig_bar)
+        st.pyplot(grafo.valor("grafica_rendimientos", ticker=ticker_input))
 
         st.divider()
 
@@ -338,14 +647,7 @@ if ticker_input:
        
         st.subheader("📉 Volatilidad anualizada (riesgo del activo)")
         
-         # Calcular rendimientos diarios logarítmicos
-        precios_1y["LogRet"] = np.log(precios_1y["Close"] / precios_1y["Close"].shift(1))
-        rendimientos_diarios = precios_1y["LogRet"].dropna()
-
-        if not rendimientos_diarios.empty:
-            volatilidad_anual = np.std(rendimientos_diarios) * np.sqrt(252)
-            volatilidad_pct = round(volatilidad_anual * 100, 2)
-
+        if volatilidad_pct is not None:
             st.markdown(f"""
             <div style="font-size: 22px; color: #FFFFFF;">
                 <strong>Volatilidad anualizada para {ticker_input}:</strong> 
@@ -366,19 +668,9 @@ if ticker_input:
 
             # ==    = RSI ===
 
-            # -------- Calcular RSI (14 días) correctamente --------
-            window = 14
-            delta = data["Close"].diff()
-
-            gain = delta.where(delta > 0, 0.0)
-            loss = -delta.where(delta < 0, 0.0)
-
-            avg_gain = gain.rolling(window=window).mean()
-            avg_loss = loss.rolling(window=window).mean()
-
-            rs = avg_gain / avg_loss
-            rsi = 100 - (100 / (1 + rs))
-            data["RSI"] = rsi
+            # -------- RSI (14 días) y MACD del periodo seleccionado --------
+            data = grafo.valor("indicadores_tecnicos", ticker=ticker_input, periodo_seleccionado=periodo_seleccionado)
+            data = data.loc[ventana[0]:ventana[1]]
 
 
             # -------- Gráfica de RSI en Plotly --------
@@ -391,9 +683,8 @@ if ticker_input:
                 st.warning("⚠️ No hay datos suficientes para calcular el RSI.")
             else:
                 fig_rsi = go.Figure()
-                fig_rsi.add_trace(go.Scatter(
-                    x=data_rsi.index,
-                    y=data_rsi["RSI"],
+                fig_rsi.add_trace(linea(
+                    data_rsi["RSI"],
                     mode="lines",
                     name="RSI",
                     line=dict(color="orange", width=2)
@@ -424,15 +715,6 @@ if ticker_input:
             """, unsafe_allow_html=True) 
 
             # === MACD ===#
-                        # -------- Calcular MACD --------
-            ema_12 = data["Close"].ewm(span=12, adjust=False).mean()
-            ema_26 = data["Close"].ewm(span=26, adjust=False).mean()
-
-            macd = ema_12 - ema_26
-            signal = macd.ewm(span=9, adjust=False).mean()
-
-            data["MACD"] = macd
-            data["Signal"] = signal
 
             st.divider()
 
@@ -448,17 +730,15 @@ if ticker_input:
             else:
                 fig_macd = go.Figure()
 
-                fig_macd.add_trace(go.Scatter(
-                    x=data_macd.index,
-                    y=data_macd["MACD"],
+                fig_macd.add_trace(linea(
+                    data_macd["MACD"],
                     mode="lines",
                     name="MACD",
                     line=dict(color="blue", width=2)
                 ))
 
-                fig_macd.add_trace(go.Scatter(
-                    x=data_macd.index,
-                    y=data_macd["Signal"],
+                fig_macd.add_trace(linea(
+                    data_macd["Signal"],
                     mode="lines",
                     name="Señal",
                     line=dict(color="orange", width=1.5, dash="dot")
@@ -486,66 +766,87 @@ if ticker_input:
         st.divider()
 
 
-        st.markdown("<h2 style='color:#FFFFFF;'>💸 Valuación por múltiplos</h2>", unsafe_allow_html=True)
+        cronometro.marca("Rendimientos, volatilidad e indicadores técnicos")
 
-        # Inputs dinámicos de comparables
-        st.markdown("<p style='color:#FFFFFF;'>Seleccione hasta 4 acciones comparables:</p>", unsafe_allow_html=True)
-        col1, col2, col3, col4 = st.columns(4)
-        with col1:
-            comp1 = st.text_input("Comparable 1", value="AAPL")
-        with col2:
-            comp2 = st.text_input("Comparable 2", value="MSFT")
-        with col3:
-            comp3 = st.text_input("Comparable 3", value="GOOGL")
-        with col4:
-            comp4 = st.text_input("Comparable 4", value="AMZN")
+        # -------- Valor en riesgo del activo --------
+        st.subheader(f"🛡️ Valor en riesgo (VaR) y pérdida esperada (CVaR) de {ticker_input}")
+        nivel, horizonte, trayectorias = controles_riesgo("activo")
+        try:
+            riesgo = grafo.valor(
+                "riesgo_activo", ticker=ticker_input, nivel=nivel, horizonte=horizonte, trayectorias=trayectorias
+            )
+            st.dataframe(en_porcentaje(riesgo), use_container_width=True)
+            st.markdown(f"""
+            <div style="background-color: #F4F6F7; padding: 15px; border-radius: 8px; font-size: 15px; color: #333; margin-top: 15px;">
+                📌 <strong>Explicación:</strong> El <em>VaR</em> es la pérdida que no se supera en {nivel:.0%} de los casos
+                en {horizonte} día(s) hábil(es); el <em>CVaR</em> es la pérdida promedio en el {1 - nivel:.0%} restante.
+                El método histórico usa los últimos 3 años tal como ocurrieron, el paramétrico supone rendimientos normales
+                y Monte Carlo simula {trayectorias:,} escenarios (movimiento browniano geométrico o remuestreo de días históricos).
+            </div>
+            """, unsafe_allow_html=True)
+        except Exception as e:
+            st.warning(f"No se pudo calcular el valor en riesgo. Error: {e}")
 
-        comparables = [comp1, comp2, comp3, comp4]
-        comparables = [c.upper().strip() for c in comparables if c.strip() != "" and c.upper() != ticker_input]
+        st.divider()
+        cronometro.marca("Riesgo del activo")
+
+        st.markdown("<h2 style='color:#FFFFFF;'>💸 Valuación por múltiplos</h2>", unsafe_allow_html=True)
+
+        # Con el índice local del S&P 500 los pares se eligen solos; sin él se escriben a mano
+        indice_sp500 = cargar_indice()
+        fuentes_comparables = ["Automáticos (índice S&P 500)", "Manuales"] if indice_sp500 is not None else ["Manuales"]
+        fuente_comparables = st.radio("Comparables:", fuentes_comparables, horizontal=True)
+
+        if fuente_comparables == "Manuales":
+            # Inputs dinámicos de comparables
+            st.markdown("<p style='color:#FFFFFF;'>Seleccione hasta 4 acciones comparables:</p>", unsafe_allow_html=True)
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                comp1 = st.text_input("Comparable 1", value="AAPL")
+            with col2:
+                comp2 = st.text_input("Comparable 2", value="MSFT")
+            with col3:
+                comp3 = st.text_input("Comparable 3", value="GOOGL")
+            with col4:
+                comp4 = st.text_input("Comparable 4", value="AMZN")
+
+            comparables = [comp1, comp2, comp3, comp4]
+            comparables = [c.upper().strip() for c in comparables if c.strip() != "" and c.upper() != ticker_input]
+        else:
+            criterio_pares = st.radio("Pares de la misma:", ["Industria", "Sector"], horizontal=True)
 
         # Extraer múltiplos del ticker principal
-        info_objetivo = yf.Ticker(ticker_input).info
         try:
-            pe = info_objetivo.get("trailingPE", None)
-            pb = info_objetivo.get("priceToBook", None)
-            ev_ebitda = info_objetivo.get("enterpriseToEbitda", None)
-            ev_sales = info_objetivo.get("enterpriseToRevenue", None)
-
-            df_val = pd.DataFrame([{
-                "Ticker": ticker_input,
-                "P/E": pe,
-                "P/B": pb,
-                "EV/EBITDA": ev_ebitda,
-                "EV/Sales": ev_sales
-            }])
+            if fuente_comparables == "Manuales":
+                df_val, df_comparables = grafo.valor("multiplos", ticker=ticker_input, comparables=comparables)
+            else:
+                df_val, df_comparables, posicion, grupo = grafo.valor(
+                    "multiplos_indice", ticker=ticker_input, criterio_pares=criterio_pares, version_indice=version_indice()
+                )
 
             st.markdown(f"<h4 style='color:#FFFFFF;'>🔍 Múltiplos de {ticker_input}</h4>", unsafe_allow_html=True)
 
-            # Comparables
-            datos_comparables = []
-            for comp in comparables:
-                comp_info = yf.Ticker(comp).info
-                datos_comparables.append({
-                    "Ticker": comp,
-                    "P/E": comp_info.get("trailingPE", None),
-                    "P/B": comp_info.get("priceToBook", None),
-                    "EV/EBITDA": comp_info.get("enterpriseToEbitda", None),
-                    "EV/Sales": comp_info.get("enterpriseToRevenue", None)
-                })
-
-            df_comparables = pd.DataFrame(datos_comparables)
             df_comparados = pd.concat([df_val, df_comparables], ignore_index=True)
 
             styled_df = df_comparados.set_index("Ticker").round(2).style.background_gradient(cmap="Blues").format("{:.2f}")
             st.markdown("<p style='color:#FFFFFF;'>📊 Comparación de múltiplos:</p>", unsafe_allow_html=True)
             st.dataframe(df_comparados.set_index("Ticker").round(2), use_container_width=True)
 
-            # Cálculo de promedios
-            df_sector = df_comparables.dropna().select_dtypes(include=np.number)
-            promedios = df_sector.mean()
+            if fuente_comparables == "Manuales":
+                # Cálculo de promedios
+                df_sector = df_comparables.dropna().select_dtypes(include=np.number)
+                promedios = df_sector.mean()
+                nombre_referencia = "Promedio"
+
+                st.markdown("<p style='color:#FFFFFF;'>📈 Promedios de los comparables:</p>", unsafe_allow_html=True)
+                st.dataframe(promedios.to_frame(name="Promedio").round(2).T)
+            else:
+                # Mediana y percentil dentro del grupo (percentil 100 = múltiplo más alto del grupo)
+                promedios = posicion["Mediana del grupo"].dropna()
+                nombre_referencia = "Mediana"
 
-            st.markdown("<p style='color:#FFFFFF;'>📈 Promedios de los comparables:</p>", unsafe_allow_html=True)
-            st.dataframe(promedios.to_frame(name="Promedio").round(2).T)
+                st.markdown(f"<p style='color:#FFFFFF;'>📈 Posición de {ticker_input} entre {len(df_comparables)} pares ({grupo}):</p>", unsafe_allow_html=True)
+                st.dataframe(posicion.round(2), use_container_width=True)
 
             # Diagnóstico
             st.markdown("""
@@ -566,7 +867,7 @@ if ticker_input:
 
                 st.markdown(f"""
                     <div style='font-size: 20px; color: #FFFFFF; margin-bottom: 10px;'>
-                        <strong>{col}:</strong> {val:.2f} &nbsp;&nbsp; vs &nbsp;&nbsp; <strong>Promedio:</strong> {prom:.2f} → {estado}
+                        <strong>{col}:</strong> {val:.2f} &nbsp;&nbsp; vs &nbsp;&nbsp; <strong>{nombre_referencia}:</strong> {prom:.2f} → {estado}
                     </div>
                 """, unsafe_allow_html=True)
         except Exception as e:
@@ -589,6 +890,7 @@ if ticker_input:
         """, unsafe_allow_html=True)
 
         st.divider()
+        cronometro.marca("Valuación por múltiplos")
 
         st.header("📊 Simulador de Portafolio: Rendimiento y Volatilidad")
 
@@ -597,67 +899,35 @@ if ticker_input:
 
         tickers = [t.strip().upper() for t in tickers_input.split(",") if t.strip() != ""]
 
-        st.divider()
-
-        def calcular_cagr(data, años):
-            if data.empty or "Close" not in data.columns:
-                return None
-
-            fecha_final = data.index[-1]
-            fecha_inicial = fecha_final - timedelta(days=365 * años)
-
-            data_filtrada = data.loc[data.index >= fecha_inicial]
-
-            if data_filtrada["Close"].dropna().shape[0] < 2:
-                return None
-
-            # Asegurar que se accede al valor como escalar
-            try:
-                precio_inicio = float(data_filtrada["Close"].iloc[0])
-                precio_fin = float(data_filtrada["Close"].iloc[-1])
-            except:
-                return None
-
-            if precio_inicio == 0 or pd.isna(precio_inicio) or pd.isna(precio_fin):
-                return None
-
-            cagr = (precio_fin / precio_inicio) ** (1 / años) - 1
-            return round(cagr * 100, 2)
+        # Una sola descarga concurrente para la tabla de rendimientos y la frontera eficiente
+        cierres_tickers, errores_tickers = grafo.valor("cierres_portafolio", tickers=tickers)
 
+        st.divider()
 
         # Resultados
         rendimientos = []
         volatilidades = []
 
-        for tkr in tickers:
-            try:
-                data = yf.download(tkr, period="5y", interval="1d", auto_adjust=True)
-                data = data.dropna()
+        for tkr, error in errores_tickers.items():
+            st.warning(f"No se pudo obtener datos para {tkr}: {error}")
 
-                cagr_1 = calcular_cagr(data, 1)
-                cagr_3 = calcular_cagr(data, 3)
-                cagr_5 = calcular_cagr(data, 5)
+        # CAGR y volatilidad de todos los tickers en una sola pasada sobre la matriz de cierres
+        indicadores_5y = grafo.valor("tabla_portafolio", tickers=tickers)
 
-                # Volatilidad anualizada
-                log_ret = np.log(data["Close"] / data["Close"].shift(1)).dropna()
-                vol = np.std(log_ret) * np.sqrt(252)
-                vol_pct = round(vol * 100, 2)
+        for tkr in indicadores_5y.index:
+            fila = indicadores_5y.loc[tkr]
+            cagrs = {años: fila[f"CAGR {años} año(s)"] for años in (1, 3, 5)}
+            vol_pct = round(fila["Volatilidad"] * 100, 2)
 
-                rendimientos.append({
-                    "Ticker": tkr,
-                    "1 año(s)": f"{float(cagr_1):.2f}%" if cagr_1 is not None else "N/D",
-                    "3 año(s)": f"{float(cagr_3):.2f}%" if cagr_3 is not None else "N/D",
-                    "5 año(s)": f"{float(cagr_5):.2f}%" if cagr_5 is not None else "N/D"
-                })
+            rendimientos.append({
+                "Ticker": tkr,
+                **{f"{años} año(s)": f"{float(c):.2f}%" if pd.notna(c) else "N/D" for años, c in cagrs.items()}
+            })
 
-                volatilidades.append({
-                    "Ticker": tkr,
-                    "Volatilidad Anual": f"{float(vol_pct):.2f}%"
-                })
-
-
-            except Exception as e:
-                st.warning(f"No se pudo obtener datos para {tkr}: {e}")
+            volatilidades.append({
+                "Ticker": tkr,
+                "Volatilidad Anual": f"{float(vol_pct):.2f}%"
+            })
 
         # Mostrar resultados
         col1, col2 = st.columns(2)
@@ -672,6 +942,7 @@ if ticker_input:
             st.caption("La volatilidad anualizada representa el riesgo del activo, calculado como la desviación estándar de los rendimientos diarios multiplicada por la raíz cuadrada de 252 (días hábiles por año).")
             st.dataframe(pd.DataFrame(volatilidades), use_container_width=True)
 
+        cronometro.marca("Simulador de portafolio")
 
         import plotly.express as px
 
@@ -679,108 +950,280 @@ if ticker_input:
         st.header("🌐 Visualización de Frontera Eficiente")
 
         # Parámetros
-        n_portfolios = 5000
-        rf = 0.03  # tasa libre de riesgo fija
+        col_modo, col_rf, col_cota = st.columns(3)
+        with col_modo:
+            modo_frontera = st.radio("Método:", ["Monte Carlo", "Optimización exacta"], horizontal=True)
+        with col_rf:
+            rf = st.number_input("Tasa libre de riesgo (%):", value=3.0, step=0.25) / 100
+        with col_cota:
+            cota_max = st.slider(
+                "Peso máximo por activo (%):", min_value=5, max_value=100, value=100, step=5,
+                disabled=modo_frontera != "Optimización exacta"
+            ) / 100
+
+        estimador = st.selectbox(
+            "Estimador de covarianza:", list(ESTIMADORES_COVARIANZA),
+            help="Ledoit-Wolf y el modelo de factores se mantienen estables con muchos activos y pocos datos; EWMA da más peso a los días recientes."
+        )
+
+        n_portfolios = st.select_slider(
+            "Número de portafolios simulados:",
+            options=[1_000, 5_000, 10_000, 50_000, 100_000, 500_000, 1_000_000],
+            value=5_000,
+            disabled=modo_frontera != "Monte Carlo"
+        )
 
         # Descargar precios históricos de los tickers
         try:
-            precios = yf.download(tickers, period="3y", interval="1d", auto_adjust=True)["Close"]
-            precios = precios.dropna(axis=1)  # eliminar columnas con datos faltantes
-
-            # Calcular rendimientos diarios y medias anuales
-            daily_returns = precios.pct_change().dropna()
-            mean_returns = daily_returns.mean() * 252
-            cov_matrix = daily_returns.cov() * 252
-
-            # Simulación de portafolios
-            results = {
-                "Rendimiento": [],
-                "Volatilidad": [],
-                "Sharpe Ratio": [],
-                "Pesos": []
-            }
-        
-            for _ in range(n_portfolios):
-                pesos = np.random.random(len(mean_returns))
-                pesos /= np.sum(pesos)
+            mean_returns, cov_matrix = grafo.valor("estimacion_portafolio", tickers=tickers, estimador=estimador)
+            df_portafolios, matriz_pesos = grafo.valor(
+                "frontera", tickers=tickers, estimador=estimador, modo_frontera=modo_frontera, n_portfolios=n_portfolios,
+                rf=rf, cota_max=cota_max
+            )
+            sin_datos = [t for t in cierres_tickers if t not in mean_returns.index]
+            if sin_datos:
+                st.caption(f"Sin historial suficiente para la frontera: {', '.join(sin_datos)}")
+            frontera_lista = True
+        except Exception as e:
+             st.error(f"No se pudo construir la frontera eficiente. Error: {e}")
+             frontera_lista = False
+
+        # Portafolios óptimos, gráfica y VaR solo si la frontera se pudo construir
+        if frontera_lista:
+                # Identificar portafolios óptimos
+            idx_sharpe = df_portafolios["Sharpe Ratio"].idxmax()
+            idx_min_vol = df_portafolios["Volatilidad"].idxmin()
+            idx_max_ret = df_portafolios["Rendimiento"].idxmax()
+
+                # Solo los portafolios óptimos llevan sus pesos como diccionario con los tickers
+            tickers_list = mean_returns.index.tolist()
+
+            def portafolio_con_pesos(idx):
+                portafolio = df_portafolios.loc[idx].to_dict()
+                portafolio["Pesos"] = dict(zip(tickers_list, matriz_pesos[idx].astype(float)))
+                return portafolio
+
+            port_sharpe = portafolio_con_pesos(idx_sharpe)
+            port_min_vol = portafolio_con_pesos(idx_min_vol)
+            port_max_ret = portafolio_con_pesos(idx_max_ret)
+
+                # Mostrar comparativa
+            st.header("🎯 Comparativa de Portafolios Óptimos")
+            tabs = st.tabs(["Maxímo Sharpe Ratio", "Mínima Volatilidad", "Máximo Retorno"])
+
+            for i, (nombre, portafolio) in enumerate(zip(
+                    ["Maxímo Sharpe Ratio", "Mínima Volatilidad", "Máximo Retorno"],
+                    [port_sharpe, port_min_vol, port_max_ret])):
+
+                    with tabs[i]:
+                        st.subheader(f"{nombre}")
+
+                        st.markdown(f"""
+                        - **Rendimiento Esperado:** {portafolio['Rendimiento']*100:.2f}%
+                        - **Volatilidad Esperada:** {portafolio['Volatilidad']*100:.2f}%
+                        - **Sharpe Ratio:** {portafolio['Sharpe Ratio']:.2f}
+                        """)
+
+                        st.markdown("**Composición del Portafolio**")
+                        pesos_dict = portafolio["Pesos"]
+                        pesos_series = pd.Series(pesos_dict).sort_values(ascending=False)
+                        pesos_df = pd.DataFrame({"Ticker": pesos_series.index, "Peso": (pesos_series * 100).round(2).astype(str) + "%"})
+                        st.dataframe(pesos_df, use_container_width=True)
+
+                # Gráfica
+            fig = grafo.valor(
+                "grafica_frontera", tickers=tickers, estimador=estimador, modo_frontera=modo_frontera, n_portfolios=n_portfolios,
+                rf=rf, cota_max=cota_max
+            )
 
-                rendimiento = np.dot(pesos, mean_returns)
-                volatilidad = np.sqrt(np.dot(pesos.T, np.dot(cov_matrix, pesos)))
-                sharpe = (rendimiento - rf) / volatilidad
+            st.plotly_chart(fig, use_container_width=True)   
 
-                results["Rendimiento"].append(rendimiento)
-                results["Volatilidad"].append(volatilidad)
-                results["Sharpe Ratio"].append(sharpe)
-                results["Pesos"].append(pesos)
+            # -------- Valor en riesgo de los portafolios óptimos --------
+            st.subheader("🛡️ Valor en riesgo de los portafolios óptimos")
+            nivel, horizonte, trayectorias = controles_riesgo("portafolios")
+            try:
+                riesgo = grafo.valor(
+                    "riesgo_portafolios", tickers=tickers, estimador=estimador, modo_frontera=modo_frontera,
+                    n_portfolios=n_portfolios, rf=rf, cota_max=cota_max, nivel=nivel, horizonte=horizonte,
+                    trayectorias=trayectorias
+                )
+                st.dataframe(en_porcentaje(riesgo), use_container_width=True)
+                st.caption("Pesos fijos durante el horizonte (comprar y mantener); Monte Carlo usa la covarianza del estimador elegido.")
+            except Exception as e:
+                st.warning(f"No se pudo calcular el valor en riesgo de los portafolios. Error: {e}")
+
+        st.divider()
+        cronometro.marca("Frontera eficiente")
+
+        # -------- Análisis en ventanas móviles --------
+        st.header("🔁 Análisis en Ventanas Móviles")
+        st.caption("Volatilidad, rendimiento anualizado, Sharpe y beta de cada ticker calculados sobre ventanas que se desplazan día a día por todo el historial disponible; permiten ver cómo cambia el régimen de riesgo y rendimiento en el tiempo.")
 
-            df_portafolios = pd.DataFrame(results)
+        col_metrica, col_ventanas, col_referencia = st.columns(3)
+        with col_metrica:
+            metrica_movil = st.selectbox("Métrica:", ["Volatilidad", "Rendimiento", "Sharpe", "Beta"])
+        with col_ventanas:
+            ventanas_movil = st.multiselect("Ventanas:", list(VENTANAS_ANALISIS), default=["3 meses", "1 año"])
+        with col_referencia:
+            referencia = st.text_input("Índice de referencia (beta):", value="SPY").upper().strip()
+
+        try:
+            series_moviles = grafo.valor("analisis_movil", tickers=tickers, referencia=referencia, rf=rf)
+            if metrica_movil not in series_moviles:
+                st.warning(f"No se pudo obtener el historial de {referencia} para calcular la beta.")
+            elif ventanas_movil:
+                st.plotly_chart(grafo.valor(
+                    "grafica_movil", tickers=tickers, referencia=referencia, rf=rf,
+                    metrica_movil=metrica_movil, ventanas_movil=ventanas_movil
+                ), use_container_width=True)
         except Exception as e:
-             st.error(f"No se pudo construir la frontera eficiente. Error: {e}")
-            # Identificar portafolios óptimos
-        idx_sharpe = df_portafolios["Sharpe Ratio"].idxmax()
-        idx_min_vol = df_portafolios["Volatilidad"].idxmin()
-        idx_max_ret = df_portafolios["Rendimiento"].idxmax()
-
-        pf_sharpe = df_portafolios.loc[idx_sharpe]
-        pf_min_vol = df_portafolios.loc[idx_min_vol]
-        pf_max_ret = df_portafolios.loc[idx_max_ret]
-
-            # Código a agregar DESPUÉS de generar df_portafolios y ANTES de graficar:
-
-            # Convertir pesos a diccionarios con los tickers
-        n_assets = len(mean_returns)
-        tickers_list = precios.columns.tolist()
-        df_portafolios["Pesos"] = df_portafolios["Pesos"].apply(lambda w: dict(zip(tickers_list, w)))
-
-            # Encontrar portafolios óptimos
-        port_sharpe = df_portafolios.loc[df_portafolios["Sharpe Ratio"].idxmax()]
-        port_min_vol = df_portafolios.loc[df_portafolios["Volatilidad"].idxmin()]
-        port_max_ret = df_portafolios.loc[df_portafolios["Rendimiento"].idxmax()]
-
-            # Mostrar comparativa
-        st.header("🎯 Comparativa de Portafolios Óptimos")
-        tabs = st.tabs(["Maxímo Sharpe Ratio", "Mínima Volatilidad", "Máximo Retorno"])
-
-        for i, (nombre, portafolio) in enumerate(zip(
-                ["Maxímo Sharpe Ratio", "Mínima Volatilidad", "Máximo Retorno"],
-                [port_sharpe, port_min_vol, port_max_ret])):
-
-                with tabs[i]:
-                    st.subheader(f"{nombre}")
-
-                    st.markdown(f"""
-                    - **Rendimiento Esperado:** {portafolio['Rendimiento']*100:.2f}%
-                    - **Volatilidad Esperada:** {portafolio['Volatilidad']*100:.2f}%
-                    - **Sharpe Ratio:** {portafolio['Sharpe Ratio']:.2f}
-                    """)
-
-                    st.markdown("**Composición del Portafolio**")
-                    pesos_dict = portafolio["Pesos"]
-                    pesos_series = pd.Series(pesos_dict).sort_values(ascending=False)
-                    pesos_df = pd.DataFrame({"Ticker": pesos_series.index, "Peso": (pesos_series * 100).round(2).astype(str) + "%"})
-                    st.dataframe(pesos_df, use_container_width=True)
-
-            # Gráfica
-        fig = px.scatter(
-                df_portafolios,
-                x="Volatilidad",
-                y="Rendimiento",
-                color="Sharpe Ratio",
-                color_continuous_scale="Turbo",
-                title="Frontera Eficiente del Portafolio (Monte Carlo)",
-                labels={"Volatilidad": "Volatilidad Esperada", "Rendimiento": "Rendimiento Esperado"},
-                height=600
-            )
+            st.error(f"No se pudo calcular el análisis móvil. Error: {e}")
+
+        st.divider()
+        cronometro.marca("Ventanas móviles")
+
+        # -------- Backtest de señales --------
+        st.header("🧪 Backtest de Señales RSI y MACD")
+        st.caption("Convierte los indicadores técnicos en señales de compra y venta y evalúa todas las combinaciones de parámetros elegidas sobre los tickers del portafolio. RSI: compra cuando baja de la banda inferior y vende cuando supera la superior. MACD: comprado mientras el MACD está por encima de su señal. Las operaciones se ejecutan al cierre del día de la señal.")
+
+        col_estrategia, col_periodo_bt, col_costo = st.columns(3)
+        with col_estrategia:
+            estrategia_bt = st.radio("Estrategia:", ["RSI", "MACD"], horizontal=True).lower()
+        with col_periodo_bt:
+            periodo_bt = st.selectbox("Periodo del backtest:", ["1y", "3y", "5y", "10y", "max"], index=2)
+        with col_costo:
+            costo_bt = st.number_input("Costo por operación (pb):", min_value=0.0, value=10.0, step=5.0) / 10_000
+
+        rejilla_bt = {}
+        for columna, (parametro, valores) in zip(st.columns(3), REJILLAS[estrategia_bt].items()):
+            with columna:
+                rejilla_bt[parametro] = sorted(st.multiselect(
+                    f"{ETIQUETAS_REJILLA[parametro]}:", list(valores), default=list(valores), key=f"rejilla_{estrategia_bt}_{parametro}"
+                ))
+
+        try:
+            if not all(rejilla_bt.values()):
+                st.info("Elija al menos un valor de cada parámetro.")
+            else:
+                resultados_bt, referencia_bt = grafo.valor(
+                    "backtest_senales", tickers=tickers, estrategia_bt=estrategia_bt, periodo_bt=periodo_bt,
+                    costo_bt=costo_bt, rejilla_bt=rejilla_bt
+                )
+                ranking = resumen(resultados_bt)
+                st.subheader("🏆 Mejores combinaciones (promedio entre tickers)")
+                st.dataframe(tabla_backtest(ranking.head(10)), use_container_width=True)
+                st.caption(
+                    f"Comprar y mantener en el mismo periodo: rendimiento anual promedio "
+                    f"{referencia_bt['Rendimiento anual'].mean():.2%}, máximo drawdown promedio "
+                    f"{referencia_bt['Máximo drawdown'].mean():.2%}."
+                )
+
+                mejor = dict(zip(ranking.index.names, np.atleast_1d(ranking.index[0])))
+                st.subheader("📋 Mejor combinación por ticker: " + ", ".join(f"{ETIQUETAS_REJILLA[k]} {v}" for k, v in mejor.items()))
+                filas_mejor = resultados_bt.loc[(resultados_bt[list(mejor)] == pd.Series(mejor)).all(axis=1)]
+                st.dataframe(tabla_backtest(filas_mejor.set_index("Ticker")[ranking.columns.drop("Tickers")]), use_container_width=True)
+        except Exception as e:
+            st.error(f"No se pudo ejecutar el backtest. Error: {e}")
 
-        st.plotly_chart(fig, use_container_width=True)   
+        st.divider()
+        cronometro.marca("Backtest de señales")
+
+        # -------- Rebalanceo walk-forward --------
+        st.header("⏩ Rebalanceo Walk-Forward de los Portafolios Óptimos")
+        st.caption("En cada fecha de rebalanceo se estiman rendimientos y covarianza solo con la ventana de datos anterior, se recalculan los portafolios óptimos de la frontera exacta y se mantienen hasta el rebalanceo siguiente. El resultado es fuera de muestra e incluye el costo de operar; usa la tasa libre de riesgo y el peso máximo por activo de la frontera.")
+
+        col_ventana_wf, col_frecuencia_wf, col_estimador_wf, col_costo_wf = st.columns(4)
+        with col_ventana_wf:
+            ventana_wf = st.select_slider("Ventana de estimación (años):", options=[1, 2, 3, 5], value=3)
+        with col_frecuencia_wf:
+            frecuencia_wf = st.radio("Rebalanceo:", ["Mensual", "Trimestral"], horizontal=True).lower()
+        with col_estimador_wf:
+            estimador_wf = st.selectbox("Estimador:", list(ESTIMADORES_WALK_FORWARD), key="estimador_wf")
+        with col_costo_wf:
+            costo_wf = st.number_input("Costo por unidad operada (pb):", min_value=0.0, value=10.0, step=5.0,
+                                       key="costo_wf") / 10_000
+
+        try:
+            valores_wf, pesos_wf, resumen_wf = grafo.valor(
+                "walk_forward_portafolios", tickers=tickers, ventana_wf=ventana_wf, frecuencia_wf=frecuencia_wf,
+                estimador_wf=estimador_wf, costo_wf=costo_wf, rf=rf, cota_max=cota_max
+            )
+            fig_wf = go.Figure()
+            for cartera in CARTERAS:
+                fig_wf.add_trace(linea(valores_wf[cartera], mode="lines", name=cartera))
+            fig_wf.update_layout(
+                title=f"Valor de 1 invertido con rebalanceo {frecuencia_wf}",
+                xaxis_title="Fecha",
+                yaxis_title="Valor",
+                template="plotly_white",
+                height=500
+            )
+            st.plotly_chart(fig_wf, use_container_width=True)
+            st.dataframe(tabla_backtest(resumen_wf), use_container_width=True)
 
+            st.markdown(f"**Pesos del último rebalanceo ({pesos_wf[CARTERAS[0]].index[-1]:%Y-%m-%d})**")
+            ultimos = pd.DataFrame({cartera: pesos_wf[cartera].iloc[-1] for cartera in CARTERAS[:3]})
+            st.dataframe(en_porcentaje(ultimos.loc[(ultimos > 0).any(axis=1)]), use_container_width=True)
+        except Exception as e:
+            st.error(f"No se pudo simular el rebalanceo walk-forward. Error: {e}")
 
         st.divider()
+        cronometro.marca("Rebalanceo walk-forward")
 
     else:
          st.error("❌ Ticker inválido, por favor revise e intente de nuevo.")
+         sugerencias = universo.buscar(ticker_input) if universo is not None else []
+         if sugerencias:
+             st.info("¿Quiso decir " + ", ".join(f"**{universo.etiqueta(t)}**" for t in sugerencias) + "?")
     
 
+# -------- Reportes por lote --------
+# El análisis de cada ticker corre en hilos de fondo: la página sigue respondiendo
+# y solo el panel de avance se redibuja hasta que los archivos están listos
+with st.sidebar:
+    st.divider()
+    with st.expander("📦 Reportes por lote"):
+        tickers_reporte = st.text_area("Tickers (separados por coma):", placeholder="AAPL, MSFT, NVDA, ...")
+        formatos_reporte = st.multiselect("Formatos:", list(FORMATOS), default=list(FORMATOS), format_func=str.upper)
+        if st.button("Generar reporte"):
+            try:
+                id_reporte = encolar_reporte(tickers_reporte.replace("\n", ",").split(","), formatos_reporte)
+                st.session_state.setdefault("reportes", []).append(id_reporte)
+            except ValueError as e:
+                st.warning(str(e))
+
+        avances = [avance_reporte(id_) for id_ in st.session_state.get("reportes", [])]
+        en_curso = any(avance is not None and avance["estado"] != "Listo" for avance in avances)
+        st.fragment(panel_reportes, run_every=2 if en_curso else None)(en_curso)
+
+
+# -------- Panel de métricas --------
+if modo_depuracion:
+    with st.sidebar:
+        st.divider()
+        st.subheader("🛠️ Métricas")
+
+        st.caption("Esta ejecución (segundos por sección)")
+        st.dataframe(pd.DataFrame(cronometro.tiempos, columns=["Sección", "Segundos"]).round(4), hide_index=True)
+
+        datos_metricas = metricas.como_dict()
+        st.caption("Solicitudes de datos (acumulado del proceso)")
+        st.dataframe(pd.DataFrame(datos_metricas["solicitudes"]).round(4), hide_index=True)
+
+        st.caption("Tickers más lentos")
+        tickers_lentos = pd.DataFrame.from_dict(datos_metricas["tickers"], orient="index")
+        if not tickers_lentos.empty:
+            st.dataframe(tickers_lentos.sort_values("maximo", ascending=False).head(10).round(4))
+
+        st.caption("Cachés")
+        st.dataframe(pd.DataFrame.from_dict(datos_metricas["caches"], orient="index").round(3))
+
+        st.caption("Secciones y nodos (acumulado del proceso)")
+        st.dataframe(pd.DataFrame.from_dict(datos_metricas["secciones"], orient="index").round(4))
+
+        st.download_button("⬇️ Métricas (JSON)", metricas.como_json(), file_name="metricas.json", mime="application/json")
+        st.download_button("⬇️ Métricas (Prometheus)", metricas.como_prometheus(), file_name="metricas.prom", mime="text/plain")
+
 st.caption("Profe pongame 100 :)")
 
 
@@ -0,0 +1,253 @@
+# -------- Backtest de señales RSI y MACD --------
+# Convierte los indicadores de la app en posiciones (comprado o fuera) y evalúa
+# rejillas de parámetros sobre muchos tickers a la vez:
+#
+#   rsi    compra cuando el RSI baja de ``inferior`` y vende cuando supera ``superior``
+#   macd   comprado mientras el MACD está por encima de su línea de señal
+#
+# La posición de cada cierre se aplica al rendimiento del día siguiente y cada
+# cambio de posición paga ``costo`` sobre el valor operado. Cada celda de la
+# rejilla (parámetros del indicador x bloque de tickers) calcula el indicador
+# una vez y evalúa con él todas las bandas; las celdas se reparten en
+# PROCESOS_BACKTEST procesos que leen la matriz de precios desde memoria
+# compartida, sin copiarla a cada uno. Los procesos se inician con "spawn" (no
+# se copia un servidor con hilos) y la app usa PROCESOS_BACKTEST_APP, por
+# defecto 1, para que una sesión no ocupe todos los núcleos. Desde la consola:
+#
+#   python backtest.py --estrategia rsi --periodo 5y              # universo local de tickers
+#   python backtest.py --estrategia macd --tickers AAPL MSFT NVDA --salida macd.csv
+
+import argparse
+import itertools
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from indicadores import DIAS_HABILES, macd, rsi
+
+ESTRATEGIAS = ("rsi", "macd")
+REJILLAS = {
+    "rsi": {"ventana": (7, 14, 21, 28), "inferior": (20, 25, 30, 35), "superior": (65, 70, 75, 80)},
+    "macd": {"rapida": (5, 8, 12, 16), "lenta": (21, 26, 34, 50), "senal": (5, 9, 13)},
+}
+# Parámetros que definen el indicador; el resto (bandas) se evalúa dentro de la celda
+PARAMETROS_INDICADOR = {"rsi": ("ventana",), "macd": ("rapida", "lenta", "senal")}
+
+COSTO_OPERACION = 0.001  # 10 pb por cada cambio de posición
+BLOQUE_TICKERS = 100
+PROCESOS_BACKTEST = int(os.environ.get("PROCESOS_BACKTEST", os.cpu_count() or 1))
+# Procesos por backtest dentro del servidor de Streamlit (1 = en el mismo proceso)
+PROCESOS_BACKTEST_APP = int(os.environ.get("PROCESOS_BACKTEST_APP", 1))
+
+METRICAS = ["Rendimiento total", "Rendimiento anual", "Tasa de acierto", "Máximo drawdown",
+            "Rotación anual", "Exposición", "Operaciones"]
+
+
+# -------- Señales --------
+
+def _arrastrar(senal):
+    """Repite hacia abajo el último valor no NaN de cada columna (0 antes del primero)."""
+    filas = np.where(np.isnan(senal), 0, np.arange(len(senal))[:, None])
+    np.maximum.accumulate(filas, axis=0, out=filas)
+    return np.nan_to_num(senal[filas, np.arange(senal.shape[1])])
+
+
+def posiciones_rsi(valores_rsi, inferior=30, superior=70):
+    """1 desde que el RSI baja de ``inferior`` hasta que sube de ``superior``; 0 si no."""
+    senal = np.where(valores_rsi < inferior, 1.0, np.where(valores_rsi > superior, 0.0, np.nan))
+    return _arrastrar(senal)
+
+
+def posiciones_macd(linea_macd, linea_senal):
+    """1 mientras el MACD está por encima de su señal; 0 si no."""
+    return (linea_macd > linea_senal).astype(float)
+
+
+# -------- Evaluación --------
+
+def evaluar(posiciones, precios, costo=COSTO_OPERACION):
+    """Métricas por columna de las ``posiciones`` (fechas x tickers, 0 o 1)
+    sobre ``precios`` (arrays del mismo tamaño): dict métrica -> array."""
+    rendimientos = precios[1:] / precios[:-1] - 1
+    validos = ~np.isnan(rendimientos)
+    rendimientos = np.where(validos, rendimientos, 0.0)
+    posiciones = np.where(np.isnan(precios), 0.0, posiciones)
+
+    previa = posiciones[:-1]
+    cambios = np.abs(np.diff(posiciones, axis=0))
+    neto = previa * rendimientos - costo * cambios
+    logaritmos = np.log1p(neto)
+    acumulado = np.cumsum(logaritmos, axis=0)
+    años = np.maximum(validos.sum(axis=0), 1) / DIAS_HABILES
+
+    caida = np.expm1(acumulado - np.maximum(np.maximum.accumulate(acumulado, axis=0), 0)).min(axis=0)
+
+    # Tasa de acierto por operación: cada día comprado se suma a la operación abierta
+    entradas = np.diff(posiciones, axis=0) > 0
+    entradas = np.concatenate([posiciones[:1] > 0, entradas])
+    operacion = np.cumsum(entradas, axis=0)[:-1]
+    maximo = int(operacion.max(initial=0)) + 1
+    n_tickers = posiciones.shape[1]
+    en_operacion = previa > 0
+    ids = (operacion + np.arange(n_tickers) * maximo)[en_operacion]
+    resultado = np.bincount(ids, weights=logaritmos[en_operacion], minlength=n_tickers * maximo)
+    dias = np.bincount(ids, minlength=n_tickers * maximo)
+    resultado, existe = resultado.reshape(n_tickers, maximo), dias.reshape(n_tickers, maximo) > 0
+    operaciones = existe.sum(axis=1)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return {
+            "Rendimiento total": np.expm1(acumulado[-1]),
+            "Rendimiento anual": np.expm1(acumulado[-1] / años),
+            "Tasa de acierto": np.where(operaciones > 0, ((resultado > 0) & existe).sum(axis=1) / operaciones, np.nan),
+            "Máximo drawdown": caida,
+            "Rotación anual": cambios.sum(axis=0) / años,
+            "Exposición": (previa * validos).sum(axis=0) / np.maximum(validos.sum(axis=0), 1),
+            "Operaciones": operaciones,
+        }
+
+
+def combinaciones(estrategia, rejilla=None):
+    """Lista de dicts de parámetros de la rejilla (la MACD exige rápida < lenta)."""
+    rejilla = REJILLAS[estrategia] if rejilla is None else rejilla
+    nombres = list(rejilla)
+    todas = [dict(zip(nombres, valores)) for valores in itertools.product(*rejilla.values())]
+    if estrategia == "macd":
+        todas = [c for c in todas if c["rapida"] < c["lenta"]]
+    return todas
+
+
+def _celda(estrategia, indicador, bandas, precios, costo):
+    """Filas (parámetros, métricas por ticker) de un indicador y todas sus bandas."""
+    tabla = pd.DataFrame(precios)
+    if estrategia == "rsi":
+        valores = rsi(tabla, indicador["ventana"]).to_numpy()
+        posiciones = [posiciones_rsi(valores, **b) for b in bandas]
+    else:
+        linea_macd, linea_senal = macd(tabla, indicador["rapida"], indicador["lenta"], indicador["senal"])
+        posiciones = [posiciones_macd(linea_macd.to_numpy(), linea_senal.to_numpy())]
+    return [({**indicador, **b}, evaluar(p, precios, costo)) for b, p in zip(bandas, posiciones)]
+
+
+# -------- Procesos con memoria compartida --------
+
+_compartido = {}
+
+
+def _adjuntar(nombre, forma):
+    # Solo se adjunta: el proceso principal crea el bloque y lo libera al terminar
+    memoria = shared_memory.SharedMemory(name=nombre)
+    _compartido["memoria"] = memoria
+    _compartido["precios"] = np.ndarray(forma, dtype=np.float64, buffer=memoria.buf)
+
+
+def _celda_compartida(estrategia, indicador, bandas, columnas, costo):
+    return _celda(estrategia, indicador, bandas, _compartido["precios"][:, columnas[0]:columnas[1]], costo)
+
+
+def backtest(precios, estrategia="rsi", rejilla=None, costo=COSTO_OPERACION, procesos=PROCESOS_BACKTEST,
+             bloque_tickers=BLOQUE_TICKERS):
+    """Métricas de cada combinación de la rejilla en cada ticker de ``precios``
+    (fechas x tickers): una fila por combinación y ticker."""
+    if estrategia not in ESTRATEGIAS:
+        raise ValueError(f"Estrategia no soportada: {estrategia} (opciones: {', '.join(ESTRATEGIAS)})")
+
+    claves = PARAMETROS_INDICADOR[estrategia]
+    todas = combinaciones(estrategia, rejilla)
+    grupos = {}
+    for combinacion in todas:
+        indicador = tuple(combinacion[k] for k in claves)
+        grupos.setdefault(indicador, []).append({k: v for k, v in combinacion.items() if k not in claves})
+
+    matriz = np.ascontiguousarray(precios.to_numpy(dtype=np.float64))
+    bloques = [(inicio, min(inicio + bloque_tickers, matriz.shape[1]))
+               for inicio in range(0, matriz.shape[1], bloque_tickers)]
+    celdas = [(dict(zip(claves, indicador)), bandas, columnas)
+              for indicador, bandas in grupos.items() for columnas in bloques]
+
+    if procesos > 1 and len(celdas) > 1:
+        memoria = shared_memory.SharedMemory(create=True, size=max(matriz.nbytes, 1))
+        try:
+            np.ndarray(matriz.shape, dtype=np.float64, buffer=memoria.buf)[:] = matriz
+            with ProcessPoolExecutor(max_workers=min(procesos, len(celdas)),
+                                     mp_context=multiprocessing.get_context("spawn"), initializer=_adjuntar,
+                                     initargs=(memoria.name, matriz.shape)) as ejecutor:
+                futuros = [ejecutor.submit(_celda_compartida, estrategia, indicador, bandas, columnas, costo)
+                           for indicador, bandas, columnas in celdas]
+                resultados = [f.result() for f in futuros]
+        finally:
+            memoria.close()
+            memoria.unlink()
+    else:
+        resultados = [_celda(estrategia, indicador, bandas, matriz[:, columnas[0]:columnas[1]], costo)
+                      for indicador, bandas, columnas in celdas]
+
+    columnas_resultado = list(todas[0] if todas else claves) + ["Ticker"] + METRICAS
+    tablas = [pd.DataFrame(columns=columnas_resultado)]
+    for (_, _, columnas), filas in zip(celdas, resultados):
+        tickers = precios.columns[columnas[0]:columnas[1]]
+        for parametros, metricas in filas:
+            tabla = pd.DataFrame(metricas, index=tickers)
+            tablas.append(tabla.assign(**parametros).rename_axis("Ticker").reset_index())
+    return pd.concat(tablas[1:] or tablas, ignore_index=True)[columnas_resultado]
+
+
+def comprar_y_mantener(precios):
+    """Mismas métricas para la posición comprada todo el periodo, como referencia."""
+    matriz = precios.to_numpy(dtype=np.float64)
+    return pd.DataFrame(evaluar(np.ones_like(matriz), matriz, costo=0.0), index=precios.columns)[METRICAS]
+
+
+def resumen(resultados):
+    """Promedio de cada métrica entre tickers por combinación, de la mejor a la peor
+    por rendimiento anual."""
+    parametros = [c for c in resultados.columns if c not in METRICAS and c != "Ticker"]
+    tabla = resultados.groupby(parametros)[METRICAS].mean()
+    tabla["Tickers"] = resultados.groupby(parametros)["Ticker"].nunique()
+    return tabla.sort_values("Rendimiento anual", ascending=False)
+
+
+def main(argv=None):
+    from datos import recortar_periodo
+    from matriz_universo import leer_cierres
+
+    parser = argparse.ArgumentParser(description="Backtest de señales RSI o MACD sobre una rejilla de parámetros.")
+    parser.add_argument("--estrategia", choices=ESTRATEGIAS, default="rsi")
+    parser.add_argument("--tickers", nargs="+", help="tickers a evaluar (por defecto, el universo local)")
+    parser.add_argument("--periodo", default="5y")
+    parser.add_argument("--costo", type=float, default=COSTO_OPERACION, help="costo por cambio de posición (fracción)")
+    parser.add_argument("--procesos", type=int, default=PROCESOS_BACKTEST)
+    parser.add_argument("--salida", help="CSV con el resultado por combinación y ticker")
+    args = parser.parse_args(argv)
+
+    tickers = args.tickers
+    if tickers is None:
+        from universo import cargar_universo
+        universo = cargar_universo()
+        if universo is None:
+            parser.error("no hay universo local de tickers; use --tickers o python universo.py")
+        tickers = universo.opciones
+
+    # Con la matriz del universo (python matriz_universo.py) los precios se leen sin abrir cada historial
+    cierres, errores = leer_cierres(tickers)
+    for ticker, error in errores.items():
+        print(f"Sin datos para {ticker}: {error}", file=sys.stderr)
+    precios = recortar_periodo(cierres, args.periodo)
+
+    resultados = backtest(precios, args.estrategia, costo=args.costo, procesos=args.procesos)
+    if args.salida:
+        resultados.to_csv(args.salida, index=False)
+    with pd.option_context("display.width", 200, "display.max_columns", 20):
+        print(resumen(resultados).head(15).round(4))
+        print("\nComprar y mantener (promedio):")
+        print(comprar_y_mantener(precios).mean().round(4).to_string())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
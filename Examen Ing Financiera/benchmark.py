@@ -0,0 +1,234 @@
+# -------- Benchmarks de los cálculos --------
+# Mide tiempo y memoria pico de cada etapa de análisis sobre historiales OHLCV
+# sintéticos (semilla fija, sin red) del largo y ancho pedidos. Con
+# ``--guardar`` el resultado queda como línea base de esa configuración; las
+# siguientes corridas se comparan contra ella y el script termina con código 1
+# si alguna etapa es más lenta o usa más memoria que la base más la tolerancia.
+#
+#   python benchmark.py                          # 5 años x 20 tickers
+#   python benchmark.py --anios 50 --tickers 500
+#   python benchmark.py --guardar                # guarda la línea base
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from backtest import backtest, combinaciones
+from covarianza import METODOS as METODOS_COVARIANZA, estimar_covarianza
+from datos import ajustar_precios, matriz_cierres, recortar_periodo
+from frontera import frontera_optima, simular_portafolios
+from graficas import mapa_densidad, reducir
+from indicadores import (DIAS_HABILES, IndicadoresEnVivo, RSIIncremental, beta_movil, cagr, macd, rsi, sharpe_movil,
+                         tabla_indicadores, volatilidad_anual, volatilidad_movil)
+from matriz_universo import abrir_matriz, escribir_matriz
+from rebalanceo import walk_forward
+from riesgo import TRAYECTORIAS, var_historico, var_montecarlo
+
+ARCHIVO_LINEA_BASE = Path(__file__).parent / "benchmarks" / "linea_base.json"
+REPETICIONES = 3
+TOLERANCIA = 1.5  # una etapa falla si tarda (o consume) más de 1.5 veces la base
+PISO_SEGUNDOS = 0.01  # diferencias menores se consideran ruido
+PISO_MEMORIA_MB = 1.0
+PORTAFOLIOS_FRONTERA = (5_000, 100_000, 1_000_000)
+# La matriz de pesos de la frontera es portafolios x activos: se limita el ancho
+ACTIVOS_FRONTERA = 20
+ACTIVOS_FRONTERA_EXACTA = 100
+
+
+# -------- Datos sintéticos --------
+
+def historiales_sinteticos(anios, n_tickers, semilla=0):
+    """Historiales diarios OHLCV como los de ``datos`` (caminata log-normal),
+    con una acción por ticker que empieza a cotizar más tarde que el resto."""
+    rng = np.random.default_rng(semilla)
+    fechas = pd.bdate_range(end="2024-12-31", periods=int(anios * DIAS_HABILES))
+    n = len(fechas)
+
+    historiales = {}
+    for i in range(n_tickers):
+        deriva, volatilidad = rng.uniform(0.0, 0.0008), rng.uniform(0.01, 0.03)
+        cierre = 50 * np.exp(np.cumsum(rng.normal(deriva, volatilidad, n)))
+        rango = np.abs(rng.normal(0, volatilidad, n)) * cierre
+        data = pd.DataFrame({
+            "Open": cierre * (1 + rng.normal(0, volatilidad / 4, n)),
+            "High": cierre + rango,
+            "Low": cierre - rango,
+            "Close": cierre,
+            "Adj Close": cierre * np.linspace(0.9, 1.0, n),
+            "Volume": rng.integers(100_000, 10_000_000, n),
+            "Dividends": 0.0,
+            "Stock Splits": 0.0,
+        }, index=fechas)
+        if i % 7 == 6:
+            data = data.iloc[n // 3:]
+        historiales[f"T{i:03d}"] = data
+    return historiales
+
+
+# -------- Medición --------
+
+def medir(funcion, repeticiones=REPETICIONES):
+    """Mejor tiempo de ``repeticiones`` corridas y memoria pico de una corrida aparte."""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+
+    tracemalloc.start()
+    funcion()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"segundos": min(tiempos), "memoria_mb": pico / 2 ** 20}
+
+
+def etapas(historiales):
+    """``(nombre, función, repeticiones)`` de cada etapa sobre los historiales."""
+    precios = matriz_cierres(historiales, "max")
+    primero = precios.iloc[:, 0].dropna()
+    referencia = precios.mean(axis=1)
+
+    rendimientos = precios.iloc[:, :ACTIVOS_FRONTERA].pct_change().dropna()
+    mean_returns = rendimientos.mean() * DIAS_HABILES
+    cov_matrix = rendimientos.cov() * DIAS_HABILES
+    rendimientos_exacta = precios.iloc[:, :ACTIVOS_FRONTERA_EXACTA].dropna().pct_change().dropna()
+    mean_exacta = rendimientos_exacta.mean() * DIAS_HABILES
+    cov_exacta = rendimientos_exacta.cov() * DIAS_HABILES
+
+    def rsi_incremental():
+        indicador = RSIIncremental(14)
+        for precio in primero.to_numpy():
+            indicador.actualizar(precio)
+
+    en_vivo = IndicadoresEnVivo().avanzar(primero)
+
+    # Secciones del ticker como las calcula la página (nodos rendimientos_activo e indicadores_tecnicos)
+    historial = next(iter(historiales.values())).drop(columns=["Adj Close"])
+
+    def rendimientos_activo():
+        cierres_5y = recortar_periodo(historial, "5y")["Close"]
+        cierres_1y = recortar_periodo(historial, "1y")["Close"]
+        return [cagr(cierres_5y, años) for años in (1, 3, 5)], volatilidad_anual(cierres_1y)
+
+    def indicadores_tecnicos():
+        data = recortar_periodo(historial, "max")
+        data["RSI"] = rsi(data["Close"], ventana=14)
+        data["MACD"], data["Signal"] = macd(data["Close"], rapida=12, lenta=26, senal=9)
+        return data
+
+    nube = simular_portafolios(mean_returns, cov_matrix, PORTAFOLIOS_FRONTERA[-1], semilla=0)[0]
+    precios_frontera = precios[mean_returns.index]
+    pesos_iguales = np.full(len(mean_returns), 1 / len(mean_returns))
+
+    yield "ajustar_precios", lambda: [ajustar_precios(data) for data in historiales.values()], REPETICIONES
+    yield "matriz_cierres", lambda: matriz_cierres(historiales, "5y"), REPETICIONES
+    yield "rendimientos del activo (página)", rendimientos_activo, REPETICIONES
+    yield "indicadores técnicos max (página)", indicadores_tecnicos, REPETICIONES
+    yield "cagr 1/3/5 años", lambda: [cagr(precios, años) for años in (1, 3, 5)], REPETICIONES
+    yield "rsi simple", lambda: rsi(precios), REPETICIONES
+    yield "rsi wilder", lambda: rsi(precios, metodo="wilder"), REPETICIONES
+    yield "macd", lambda: macd(precios), REPETICIONES
+    yield "volatilidad_anual", lambda: volatilidad_anual(precios), REPETICIONES
+    yield "tabla_indicadores 5y (portafolio)", lambda: tabla_indicadores(recortar_periodo(precios, "5y")), REPETICIONES
+    yield "rsi incremental (1 ticker)", rsi_incremental, REPETICIONES
+    yield "indicadores en vivo (1 cotización)", lambda: en_vivo.con_precio(primero.iloc[-1]), REPETICIONES
+    yield "volatilidad_movil", lambda: volatilidad_movil(precios), REPETICIONES
+    yield "sharpe_movil", lambda: sharpe_movil(precios), REPETICIONES
+    yield "beta_movil", lambda: beta_movil(precios, referencia), REPETICIONES
+    yield "reducir LTTB (1 ticker)", lambda: reducir(primero), REPETICIONES
+    for metodo in METODOS_COVARIANZA:
+        yield (f"covarianza {metodo}", lambda metodo=metodo: estimar_covarianza(precios, metodo, usar_cache=False),
+               REPETICIONES)
+    for n in PORTAFOLIOS_FRONTERA:
+        yield f"frontera monte carlo {n:,}", lambda n=n: simular_portafolios(mean_returns, cov_matrix, n, semilla=0), 1
+    yield "frontera exacta", lambda: frontera_optima(mean_exacta, cov_exacta), 1
+    for estrategia in ("rsi", "macd"):
+        yield (f"backtest {estrategia} ({len(combinaciones(estrategia))} combinaciones)",
+               lambda estrategia=estrategia: backtest(precios, estrategia, procesos=1), 1)
+    yield "var histórico 10 días", lambda: var_historico(precios_frontera, pesos_iguales, horizonte=10), REPETICIONES
+    for metodo in ("gbm", "bootstrap"):
+        yield (f"var monte carlo {metodo} {TRAYECTORIAS:,}",
+               lambda metodo=metodo: var_montecarlo(pesos_iguales, mean_returns, cov_matrix, precios_frontera,
+                                                    horizonte=10, metodo=metodo, semilla=0), 1)
+    for frecuencia in ("mensual", "trimestral"):
+        yield (f"walk-forward {frecuencia}",
+               lambda frecuencia=frecuencia: walk_forward(precios.iloc[:, :ACTIVOS_FRONTERA_EXACTA], DIAS_HABILES,
+                                                          frecuencia), 1)
+    yield "mapa_densidad 1,000,000", lambda: mapa_densidad(nube, "Volatilidad", "Rendimiento", "Sharpe Ratio"), 1
+
+    # Misma tabla que matriz_cierres, leída de la matriz mapeada (abierta una vez por proceso)
+    with tempfile.TemporaryDirectory(ignore_cleanup_errors=True) as directorio:
+        escribir_matriz(historiales, directorio)
+        algunos = list(historiales)[:ACTIVOS_FRONTERA]
+        yield "matriz mapeada 5y (todos)", lambda: abrir_matriz(directorio).tabla(None, "5y"), REPETICIONES
+        yield (f"matriz mapeada 5y ({len(algunos)} tickers)", lambda: abrir_matriz(directorio).tabla(algunos, "5y"),
+               REPETICIONES)
+
+
+# -------- Línea base --------
+
+def comparar(resultados, base, tolerancia):
+    """Etapas que superan a la ``base`` por más de la ``tolerancia`` (y del ruido)."""
+    regresiones = []
+    for nombre, medida in resultados.items():
+        anterior = base.get(nombre)
+        if anterior is None:
+            continue
+        for clave, piso in (("segundos", PISO_SEGUNDOS), ("memoria_mb", PISO_MEMORIA_MB)):
+            if medida[clave] > anterior[clave] * tolerancia and medida[clave] - anterior[clave] > piso:
+                regresiones.append(f"{nombre}: {clave} {anterior[clave]:.3f} -> {medida[clave]:.3f}")
+    return regresiones
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks de los cálculos de la app (sin red).")
+    parser.add_argument("--anios", type=float, default=5, help="años de historial diario (1 a 50)")
+    parser.add_argument("--tickers", type=int, default=20, help="cantidad de tickers (1 a 500)")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--guardar", action="store_true", help="guardar el resultado como línea base")
+    parser.add_argument("--tolerancia", type=float, default=TOLERANCIA)
+    parser.add_argument("--linea-base", type=Path, default=ARCHIVO_LINEA_BASE)
+    args = parser.parse_args(argv)
+
+    if not 1 <= args.anios <= 50 or not 1 <= args.tickers <= 500:
+        parser.error("--anios debe estar entre 1 y 50 y --tickers entre 1 y 500")
+
+    configuracion = f"{args.anios:g} años x {args.tickers} tickers (semilla {args.semilla})"
+    historiales = historiales_sinteticos(args.anios, args.tickers, args.semilla)
+
+    resultados = {}
+    for nombre, funcion, repeticiones in etapas(historiales):
+        resultados[nombre] = medir(funcion, repeticiones)
+        print(f"{nombre:<36} {resultados[nombre]['segundos']:>9.4f} s {resultados[nombre]['memoria_mb']:>10.1f} MB")
+
+    bases = json.loads(args.linea_base.read_text(encoding="utf-8")) if args.linea_base.exists() else {}
+    if args.guardar:
+        bases[configuracion] = resultados
+        args.linea_base.parent.mkdir(parents=True, exist_ok=True)
+        args.linea_base.write_text(json.dumps(bases, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"\nLínea base guardada para {configuracion} en {args.linea_base}")
+        return 0
+
+    if configuracion not in bases:
+        print(f"\nNo hay línea base para {configuracion}; use --guardar para crearla.")
+        return 0
+
+    regresiones = comparar(resultados, bases[configuracion], args.tolerancia)
+    if regresiones:
+        print(f"\n❌ Regresiones contra la línea base ({configuracion}):")
+        for regresion in regresiones:
+            print(f"  - {regresion}")
+        return 1
+    print(f"\n✅ Sin regresiones contra la línea base ({configuracion}).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+# -------- Caché en memoria con expiración (TTL) y desalojo LRU --------
+# Vive a nivel de módulo, así que la comparten todas las secciones del script
+# y todas las sesiones de Streamlit del mismo proceso. ``SolicitudesEnCurso``
+# evita además que varias sesiones pidan a la vez el mismo dato que aún no
+# está en caché: la primera lo descarga y las demás esperan ese resultado.
+
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from metricas import metricas
+
+
+class CacheTTL:
+    """Diccionario acotado: cada valor caduca a los ``ttl`` segundos y, al
+    superar ``max_elementos``, se descarta el usado hace más tiempo. Con
+    ``nombre``, cada lectura cuenta como acierto o fallo en las métricas."""
+
+    def __init__(self, ttl, max_elementos=256, nombre=None):
+        self.ttl = ttl
+        self.max_elementos = max_elementos
+        self.nombre = nombre
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obtener(self, clave):
+        """Valor guardado para ``clave`` o None si no existe o ya caducó."""
+        valor = self._obtener(clave)
+        if self.nombre is not None:
+            metricas.registrar_cache(self.nombre, valor is not None)
+        return valor
+
+    def _obtener(self, clave):
+        with self._lock:
+            guardado = self._datos.get(clave)
+            if guardado is None:
+                return None
+            momento, valor = guardado
+            if time.time() - momento >= self.ttl:
+                del self._datos[clave]
+                return None
+            self._datos.move_to_end(clave)
+            return valor
+
+    def guardar(self, clave, valor, momento=None):
+        with self._lock:
+            self._datos[clave] = (time.time() if momento is None else momento, valor)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.max_elementos:
+                self._datos.popitem(last=False)
+
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()
+
+    def __len__(self):
+        return len(self._datos)
+
+
+class SolicitudesEnCurso:
+    """Agrupa llamadas simultáneas con la misma clave: la primera ejecuta la
+    función y las que llegan mientras tanto reciben su mismo resultado (o su
+    misma excepción). Con ``nombre``, cada llamada agrupada cuenta como acierto
+    en las métricas."""
+
+    def __init__(self, nombre=None):
+        self.nombre = nombre
+        self._en_curso = {}
+        self._lock = threading.Lock()
+
+    def ejecutar(self, clave, funcion, *args, **kwargs):
+        with self._lock:
+            futuro = self._en_curso.get(clave)
+            primera = futuro is None
+            if primera:
+                futuro = self._en_curso[clave] = Future()
+
+        if self.nombre is not None:
+            metricas.registrar_cache(self.nombre, not primera)
+        if not primera:
+            return futuro.result()
+
+        try:
+            futuro.set_result(funcion(*args, **kwargs))
+        except BaseException as e:
+            futuro.set_exception(e)
+        finally:
+            with self._lock:
+                del self._en_curso[clave]
+        return futuro.result()
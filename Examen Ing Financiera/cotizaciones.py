@@ -0,0 +1,83 @@
+# -------- Cotizaciones en vivo --------
+# Un único hilo de fondo por proceso consulta la última cotización de los
+# tickers que alguna sesión está mirando, cada uno a su intervalo. Las
+# sesiones solo leen el último valor guardado, así que refrescar la tarjeta de
+# precio no genera tráfico extra por usuario ni vuelve a ejecutar el script.
+
+import threading
+import time
+
+from proveedores import descargar_cotizacion
+
+INTERVALO_MINIMO = 5  # segundos
+# Un ticker deja de consultarse si ninguna sesión lo pidió en este tiempo
+INACTIVIDAD_MAXIMA = 120
+
+_lock = threading.Lock()
+_suscripciones = {}   # ticker -> {"intervalo", "ultimo_pedido", "proxima"}
+_cotizaciones = {}    # ticker -> dict con la última cotización
+_despertar = threading.Event()
+_hilo = None
+
+
+def _bucle_sondeo():
+    while True:
+        ahora = time.time()
+        with _lock:
+            for ticker, sub in list(_suscripciones.items()):
+                if ahora - sub["ultimo_pedido"] > INACTIVIDAD_MAXIMA:
+                    del _suscripciones[ticker]
+            pendientes = [t for t, sub in _suscripciones.items() if sub["proxima"] <= ahora]
+
+        for ticker in pendientes:
+            try:
+                cotizacion = descargar_cotizacion(ticker)
+            except Exception:
+                cotizacion = None
+            with _lock:
+                if cotizacion is not None:
+                    _cotizaciones[ticker] = cotizacion
+                if ticker in _suscripciones:
+                    _suscripciones[ticker]["proxima"] = time.time() + _suscripciones[ticker]["intervalo"]
+
+        with _lock:
+            proxima = min((sub["proxima"] for sub in _suscripciones.values()), default=None)
+        espera = None if proxima is None else max(proxima - time.time(), 0.1)
+        _despertar.wait(espera)
+        _despertar.clear()
+
+
+def _asegurar_hilo():
+    global _hilo
+    with _lock:
+        if _hilo is None or not _hilo.is_alive():
+            _hilo = threading.Thread(target=_bucle_sondeo, name="sondeo-cotizaciones", daemon=True)
+            _hilo.start()
+
+
+def ultima_cotizacion(ticker, intervalo=15):
+    """Última cotización conocida de ``ticker`` (o None si aún no llegó).
+
+    Suscribe el ticker al sondeo de fondo con el ``intervalo`` pedido; si
+    varias sesiones lo miran a distinto ritmo se usa el más rápido.
+    """
+    ticker = ticker.upper().strip()
+    intervalo = max(INTERVALO_MINIMO, intervalo)
+    ahora = time.time()
+
+    with _lock:
+        sub = _suscripciones.get(ticker)
+        nuevo = sub is None
+        if nuevo:
+            _suscripciones[ticker] = {"intervalo": intervalo, "ultimo_pedido": ahora, "proxima": ahora}
+        else:
+            sub["ultimo_pedido"] = ahora
+            if intervalo < sub["intervalo"]:
+                sub["intervalo"] = intervalo
+                sub["proxima"] = min(sub["proxima"], ahora + intervalo)
+        cotizacion = _cotizaciones.get(ticker)
+
+    _asegurar_hilo()
+    if nuevo:
+        _despertar.set()
+    return cotizacion
@@ -0,0 +1,235 @@
+# -------- Estimación de covarianzas para universos grandes --------
+# La covarianza muestral sobre filas completas descarta cualquier ticker con un
+# solo hueco y, con cientos de activos y pocos años de datos, queda mal
+# condicionada (o singular): la frontera devuelve pesos sin sentido. Aquí cada
+# par de tickers usa las fechas que tienen ambos, y todo se calcula con
+# productos de matrices sobre los rendimientos (huecos en cero) y su máscara
+# de datos presentes:
+#
+#   muestral      covarianza por pares, llevada a la matriz semidefinida más cercana
+#   ledoit_wolf   contracción de Ledoit-Wolf hacia la identidad escalada
+#   ewma          productos con pesos exponenciales (vida media en días)
+#   factores      k factores estadísticos (componentes principales) + riesgo propio
+#
+# Con ``dtype=np.float32`` las matrices ocupan la mitad de memoria. Los
+# resultados se guardan en caché por conjunto de tickers, rango de fechas,
+# huella de los valores y parámetros, y la comparten todas las sesiones.
+# ``CovarianzaMovil`` guarda las sumas de una ventana que se desplaza (agregar
+# y quitar filas) y da los mismos estimadores sin recorrer la ventana completa
+# en cada paso.
+
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+from cache import CacheTTL
+from datos import TTL_HISTORIAL
+from indicadores import DIAS_HABILES
+
+METODOS = ("muestral", "ledoit_wolf", "ewma", "factores")
+
+# Un ticker con menos rendimientos diarios que esto queda fuera de la estimación
+MINIMO_OBSERVACIONES = 60
+VIDA_MEDIA_EWMA = 60
+FACTORES = 5
+# Piso de los autovalores, relativo a la varianza media, al proyectar a semidefinida
+PISO_AUTOVALOR = 1e-8
+
+_cache = CacheTTL(TTL_HISTORIAL, max_elementos=32, nombre="covarianza")
+
+
+def rendimientos_diarios(precios, minimo_observaciones=MINIMO_OBSERVACIONES):
+    """Rendimientos diarios sin rellenar huecos; descarta los tickers con pocos datos."""
+    rendimientos = precios.pct_change(fill_method=None).iloc[1:]
+    rendimientos = rendimientos.loc[:, rendimientos.count() >= minimo_observaciones]
+    return rendimientos.dropna(how="all")
+
+
+def huella(tabla):
+    """Resumen corto de los valores de ``tabla``: dos tablas con las mismas
+    columnas y fechas pero distintos precios no comparten entrada en la caché."""
+    valores = np.ascontiguousarray(tabla.to_numpy(dtype=np.float64))
+    return hashlib.blake2b(valores.view(np.uint8), digest_size=16).hexdigest()
+
+
+def _centrar(rendimientos, dtype, pesos=None):
+    """``(x, m)``: rendimientos menos la media (ponderada) de su columna, con
+    ceros en los huecos, y la máscara de datos presentes."""
+    m = rendimientos.notna().to_numpy().astype(dtype)
+    x = np.nan_to_num(rendimientos.to_numpy(dtype=dtype))
+    w = m if pesos is None else m * pesos[:, None]
+    medias = (w * x).sum(axis=0) / w.sum(axis=0)
+    return (x - medias) * m, m
+
+
+def _semidefinida(cov):
+    """Matriz semidefinida positiva más cercana (en norma de Frobenius), con un
+    piso pequeño en los autovalores para que quede invertible."""
+    autovalores, autovectores = np.linalg.eigh(cov)
+    relativo = max(PISO_AUTOVALOR, 10 * np.finfo(cov.dtype).eps)
+    piso = relativo * max(np.trace(cov) / len(cov), np.finfo(cov.dtype).tiny)
+    if autovalores[0] >= piso:
+        return cov
+    cov = (autovectores * np.maximum(autovalores, piso)) @ autovectores.T
+    return (cov + cov.T) / 2
+
+
+def _muestral(x, m):
+    pares = m.T @ m
+    return _semidefinida((x.T @ x) / np.maximum(pares - 1, 1))
+
+
+def _ledoit_wolf(x, m):
+    # Ledoit y Wolf (2004) con sumas por pares: con datos completos coincide con
+    # la versión clásica sobre la covarianza sesgada (dividida por n)
+    cuadrados = x * x
+    return _contraer(x.T @ x, cuadrados.T @ cuadrados, m.T @ m)
+
+
+def _contraer(productos, productos_cuadrados, pares):
+    """Contracción de Ledoit-Wolf a partir de las sumas por par de x_i·x_j y de
+    (x_i·x_j)² (rendimientos ya centrados) y de la cantidad de fechas del par."""
+    pares = np.maximum(pares, 1)
+    muestral = productos / pares
+    # Varianza de cada producto x_i·x_j alrededor de su media, por par
+    pi = productos_cuadrados / pares - muestral ** 2
+
+    p = len(muestral)
+    mu = np.trace(muestral) / p
+    delta = muestral.copy()
+    delta[np.diag_indices(p)] -= mu
+    delta = (delta ** 2).sum()
+    beta = min((pi / pares).sum(), delta)
+    contraccion = beta / delta if delta > 0 else 1.0
+
+    cov = (1 - contraccion) * muestral
+    cov[np.diag_indices(p)] += contraccion * mu
+    return _semidefinida(cov)
+
+
+def _ewma(rendimientos, dtype, vida_media):
+    n = len(rendimientos)
+    pesos = 0.5 ** (np.arange(n - 1, -1, -1, dtype=dtype) / vida_media)
+    x, m = _centrar(rendimientos, dtype, pesos)
+    ponderados = m * pesos[:, None]
+    return _semidefinida(((x * pesos[:, None]).T @ x) / np.maximum(ponderados.T @ m, np.finfo(dtype).tiny))
+
+
+def _factores(muestral, k):
+    # Factores de la matriz de correlación, para que los activos más volátiles no dominen
+    desvio = np.sqrt(np.diag(muestral))
+    correlacion = muestral / np.outer(desvio, desvio)
+
+    k = min(k, len(correlacion) - 1)
+    if k < 1:
+        return muestral
+    autovalores, autovectores = np.linalg.eigh(correlacion)
+    cargas = autovectores[:, -k:] * np.sqrt(np.maximum(autovalores[-k:], 0))
+    comun = cargas @ cargas.T
+    # Riesgo propio: lo que los factores no explican de la varianza de cada activo
+    propio = np.maximum(1 - np.diag(comun), PISO_AUTOVALOR)
+    comun[np.diag_indices_from(comun)] += propio
+    return comun * np.outer(desvio, desvio)
+
+
+def estimar_covarianza(precios, metodo="ledoit_wolf", dtype=np.float64, minimo_observaciones=MINIMO_OBSERVACIONES,
+                       vida_media=VIDA_MEDIA_EWMA, factores=FACTORES, dias=DIAS_HABILES, usar_cache=True):
+    """Rendimientos medios y matriz de covarianza anualizados ``(mean, cov)`` de
+    ``precios`` (fechas x tickers, con huecos). Los tickers con menos de
+    ``minimo_observaciones`` rendimientos no aparecen en el resultado."""
+    if metodo not in METODOS:
+        raise ValueError(f"Estimador de covarianza no soportado: {metodo} (opciones: {', '.join(METODOS)})")
+    dtype = np.dtype(dtype)
+
+    rendimientos = rendimientos_diarios(precios, minimo_observaciones)
+    if rendimientos.empty:
+        raise ValueError("Ningún ticker tiene suficientes datos para estimar la covarianza.")
+
+    parametros = {"ewma": vida_media, "factores": factores}.get(metodo)
+    clave = (tuple(rendimientos.columns), rendimientos.index[0], rendimientos.index[-1], len(rendimientos),
+             huella(rendimientos), metodo, parametros, dtype.str, minimo_observaciones, dias)
+    guardado = _cache.obtener(clave) if usar_cache else None
+    if guardado is not None:
+        return guardado
+
+    if metodo == "ewma":
+        cov = _ewma(rendimientos, dtype, vida_media)
+    else:
+        x, m = _centrar(rendimientos, dtype)
+        if metodo == "muestral":
+            cov = _muestral(x, m)
+        elif metodo == "ledoit_wolf":
+            cov = _ledoit_wolf(x, m)
+        else:
+            cov = _factores(_muestral(x, m), factores)
+
+    tickers = rendimientos.columns
+    resultado = (
+        rendimientos.mean().astype(dtype) * dias,
+        pd.DataFrame(cov * dias, index=tickers, columns=tickers),
+    )
+    _cache.guardar(clave, resultado)
+    return resultado
+
+
+class CovarianzaMovil:
+    """Sumas por par de una ventana de rendimientos diarios (con huecos) que se
+    actualizan al agregar o quitar filas: mover la ventana cuesta lo que las
+    filas que entran y salen, no lo que mide la ventana. ``estimar`` da lo mismo
+    que ``estimar_covarianza`` sobre las filas de la ventana (sin anualizar)."""
+
+    METODOS = ("muestral", "ledoit_wolf", "factores")
+
+    def __init__(self, n_activos, dtype=np.float64):
+        forma = (n_activos, n_activos)
+        # Para cada par (i, j), sobre las fechas con dato en ambos:
+        #   n: fechas   x: Σ x_i   xy: Σ x_i·x_j   x2: Σ x_i²   x2y: Σ x_i²·x_j   x2y2: Σ x_i²·x_j²
+        self._sumas = {clave: np.zeros(forma, dtype=dtype) for clave in ("n", "x", "xy", "x2", "x2y", "x2y2")}
+
+    def _actualizar(self, filas, signo):
+        filas = np.atleast_2d(filas)
+        m = (~np.isnan(filas)).astype(self._sumas["n"].dtype)
+        x = np.nan_to_num(filas).astype(m.dtype)
+        x2 = x * x
+        s = self._sumas
+        s["n"] += signo * (m.T @ m)
+        s["x"] += signo * (x.T @ m)
+        s["xy"] += signo * (x.T @ x)
+        s["x2"] += signo * (x2.T @ m)
+        s["x2y"] += signo * (x2.T @ x)
+        s["x2y2"] += signo * (x2.T @ x2)
+
+    def agregar(self, filas):
+        self._actualizar(filas, 1)
+
+    def quitar(self, filas):
+        self._actualizar(filas, -1)
+
+    @property
+    def observaciones(self):
+        """Rendimientos con dato de cada activo dentro de la ventana."""
+        return np.rint(np.diag(self._sumas["n"])).astype(int)
+
+    def estimar(self, metodo="ledoit_wolf", activos=None, factores=FACTORES):
+        """``(media, cov)`` diarias de los ``activos`` (posiciones; por defecto todos)."""
+        if metodo not in self.METODOS:
+            raise ValueError(f"Estimador no soportado en ventana móvil: {metodo} (opciones: {', '.join(self.METODOS)})")
+        seleccion = np.arange(len(self._sumas["n"])) if activos is None else np.asarray(activos)
+        s = {clave: suma[np.ix_(seleccion, seleccion)] for clave, suma in self._sumas.items()}
+        n = s["n"]
+
+        # Medias de cada columna con todos sus datos (las de ``_centrar``)
+        media = np.diag(s["x"]) / np.maximum(np.diag(n), 1)
+        a, b = media[:, None], media[None, :]
+        # Σ (x_i - a)(x_j - b) y Σ (x_i - a)²(x_j - b)² sobre las fechas del par, desarrollados en sumas
+        productos = s["xy"] - b * s["x"] - a * s["x"].T + n * a * b
+        if metodo == "ledoit_wolf":
+            cuadrados = (s["x2y2"] - 2 * b * s["x2y"] + b ** 2 * s["x2"] - 2 * a * s["x2y"].T + 4 * a * b * s["xy"]
+                         - 2 * a * b ** 2 * s["x"] + a ** 2 * s["x2"].T - 2 * a ** 2 * b * s["x"].T + a ** 2 * b ** 2 * n)
+            return media, _contraer(productos, cuadrados, n)
+
+        muestral = _semidefinida(productos / np.maximum(n - 1, 1))
+        if metodo == "factores":
+            return media, _factores(muestral, factores)
+        return media, muestral
@@ -0,0 +1,209 @@
+# -------- Capa de historial de precios --------
+# Descarga el historial diario completo de cada ticker una sola vez y sirve
+# todos los periodos que usa la app (1wk, 2d, 1y, 3y, 5y y el timeframe del
+# gráfico) recortando en memoria por fecha.
+#
+# Cada historial se guarda además en disco (un archivo Parquet por ticker) con
+# precios sin ajustar y la columna "Adj Close". Al refrescar solo se piden las
+# barras posteriores a la última guardada, y la vista ajustada (la que usaba
+# auto_adjust=True) se reconstruye con el factor Adj Close / Close.
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+
+from cache import CacheTTL, SolicitudesEnCurso
+from metricas import metricas
+from proveedores import descargar_historial
+
+# Segundos que se reutiliza un historial antes de volver a consultar Yahoo
+TTL_HISTORIAL = 60 * 60
+
+# Historiales completos que se conservan en memoria (los demás se releen del almacén)
+MAX_HISTORIALES = int(os.environ.get("MAX_HISTORIALES", 128))
+
+# Descargas simultáneas como máximo al pedir varios tickers a la vez
+MAX_HILOS_DESCARGA = 8
+
+# Carpeta del almacén local de precios (un .parquet por ticker)
+DIRECTORIO_ALMACEN = Path(os.environ.get("ALMACEN_PRECIOS", Path(__file__).parent / "almacen"))
+
+COLUMNAS_PRECIO = ["Open", "High", "Low", "Close"]
+
+# Periodos expresados en filas (días hábiles) o como desplazamiento de fecha
+PERIODOS_DIAS = {"1d": 1, "2d": 2, "5d": 5}
+PERIODOS_FECHA = {
+    "1wk": pd.DateOffset(weeks=1),
+    "1mo": pd.DateOffset(months=1),
+    "3mo": pd.DateOffset(months=3),
+    "6mo": pd.DateOffset(months=6),
+    "1y": pd.DateOffset(years=1),
+    "2y": pd.DateOffset(years=2),
+    "3y": pd.DateOffset(years=3),
+    "5y": pd.DateOffset(years=5),
+    "10y": pd.DateOffset(years=10),
+}
+
+_historiales = CacheTTL(TTL_HISTORIAL, MAX_HISTORIALES, nombre="historial_memoria")
+_historiales_en_curso = SolicitudesEnCurso(nombre="historial_en_curso")
+
+
+# -------- Almacén en disco --------
+
+def _ruta_almacen(ticker):
+    return DIRECTORIO_ALMACEN / f"{ticker}.parquet"
+
+
+def _descargar(ticker, inicio=None):
+    return descargar_historial(ticker, inicio)
+
+
+def _guardar(ticker, data):
+    DIRECTORIO_ALMACEN.mkdir(parents=True, exist_ok=True)
+    ruta = _ruta_almacen(ticker)
+    temporal = ruta.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+    data.to_parquet(temporal)
+    os.replace(temporal, ruta)
+
+
+def cargar_almacen(ticker):
+    """Historial sin ajustar guardado en disco, o None si no existe."""
+    ruta = _ruta_almacen(ticker)
+    if not ruta.exists():
+        return None
+    return pd.read_parquet(ruta)
+
+
+def actualizar_almacen(ticker):
+    """Sincroniza el archivo de ``ticker`` con el proveedor pidiendo solo barras nuevas."""
+    guardado = cargar_almacen(ticker)
+
+    if guardado is None or guardado.empty:
+        metricas.registrar_cache("almacen", False)
+        data = _descargar(ticker)
+    else:
+        ruta = _ruta_almacen(ticker)
+        if time.time() - ruta.stat().st_mtime < TTL_HISTORIAL:
+            metricas.registrar_cache("almacen", True)
+            return guardado
+
+        metricas.registrar_cache("almacen", False)
+
+        # Se vuelve a pedir la última barra guardada por si era una sesión sin cerrar
+        ultimo = guardado.index[-1]
+        nuevos = _descargar(ticker, inicio=ultimo)
+        nuevos = nuevos.loc[nuevos.index >= ultimo]
+
+        if nuevos.empty:
+            os.utime(ruta)
+            return guardado
+
+        # Solo cuentan los eventos de barras nuevas: la última guardada ya los tenía aplicados
+        eventos = nuevos.loc[nuevos.index > ultimo].reindex(columns=["Dividends", "Stock Splits"]).fillna(0)
+        if (eventos != 0).any().any():
+            # Un dividendo o split cambia los factores de ajuste de todo el historial
+            data = _descargar(ticker)
+        else:
+            data = pd.concat([guardado.loc[guardado.index < nuevos.index[0]], nuevos])
+
+    if not data.empty:
+        _guardar(ticker, data)
+    return data
+
+
+def ajustar_precios(data):
+    """Vista ajustada (equivalente a auto_adjust=True) de un historial sin ajustar."""
+    if data.empty or "Adj Close" not in data.columns:
+        return data
+    factor = data["Adj Close"] / data["Close"]
+    ajustado = data.drop(columns=["Adj Close"])
+    ajustado[COLUMNAS_PRECIO] = data[COLUMNAS_PRECIO].mul(factor, axis=0)
+    return ajustado
+
+
+# -------- Historial en memoria --------
+
+def obtener_historial(ticker, ajustado=True):
+    """Historial diario de ``ticker`` desde su primer dato ("max")."""
+    ticker = ticker.upper().strip()
+
+    vistas = _historiales.obtener(ticker)
+    if vistas is None:
+        # Una sola carga por ticker aunque varias sesiones lo pidan a la vez
+        vistas = _historiales_en_curso.ejecutar(ticker, _cargar_historial, ticker)
+    return vistas[ajustado]
+
+
+def _cargar_historial(ticker):
+    crudo = actualizar_almacen(ticker)
+    vistas = {
+        True: ajustar_precios(crudo),
+        False: crudo.drop(columns=["Adj Close"], errors="ignore"),
+    }
+    _historiales.guardar(ticker, vistas)
+    return vistas
+
+
+def recortar_periodo(data, periodo):
+    """Devuelve una copia de ``data`` con solo el ``periodo`` más reciente."""
+    if data.empty or periodo == "max":
+        return data.copy()
+
+    if periodo in PERIODOS_DIAS:
+        return data.iloc[-PERIODOS_DIAS[periodo]:].copy()
+
+    if periodo not in PERIODOS_FECHA:
+        raise ValueError(f"Periodo no soportado: {periodo}")
+
+    fecha_inicial = data.index[-1] - PERIODOS_FECHA[periodo]
+    return data.loc[data.index >= fecha_inicial].copy()
+
+
+def historial_periodo(ticker, periodo, ajustado=True):
+    return recortar_periodo(obtener_historial(ticker, ajustado), periodo)
+
+
+def cierres_desde(ticker, fecha=None, ajustado=True):
+    """Cierres de ``ticker`` desde ``fecha`` (incluida), o todos si es None.
+    Es una vista sobre el historial en memoria: no copia los años anteriores."""
+    cierres = obtener_historial(ticker, ajustado)["Close"]
+    if fecha is None:
+        return cierres
+    return cierres.iloc[cierres.index.searchsorted(fecha):]
+
+
+# -------- Varios tickers --------
+
+def obtener_historiales(tickers, max_hilos=MAX_HILOS_DESCARGA):
+    """Historiales de varios tickers descargados en paralelo (hilos acotados).
+
+    Devuelve ``(historiales, errores)``: dos diccionarios por ticker, uno con
+    los DataFrames y otro con la excepción de los que fallaron.
+    """
+    unicos = list(dict.fromkeys(t.upper().strip() for t in tickers))
+    historiales, errores = {}, {}
+    if not unicos:
+        return historiales, errores
+
+    with ThreadPoolExecutor(max_workers=min(max_hilos, len(unicos))) as ejecutor:
+        futuros = {t: ejecutor.submit(obtener_historial, t) for t in unicos}
+        for ticker, futuro in futuros.items():
+            try:
+                historiales[ticker] = futuro.result()
+            except Exception as e:
+                errores[ticker] = e
+    return historiales, errores
+
+
+def matriz_cierres(historiales, periodo, columna="Close"):
+    """Tabla ancha fechas x tickers con la ``columna`` de cada historial."""
+    series = {
+        ticker: recortar_periodo(data, periodo)[columna]
+        for ticker, data in historiales.items()
+        if not data.empty and columna in data.columns
+    }
+    return pd.DataFrame(series)
@@ -0,0 +1,371 @@
+# -------- Frontera eficiente (Monte Carlo vectorizado) --------
+# Genera la matriz de pesos completa por bloques y calcula rendimiento,
+# volatilidad y Sharpe de todos los portafolios con operaciones matriciales,
+# sin bucles de Python por portafolio.
+
+import numpy as np
+import pandas as pd
+
+# Portafolios por bloque: acota la memoria temporal de cada paso
+TAMANO_BLOQUE = 50_000
+
+
+def generar_pesos(rng, n_portafolios, n_activos, metodo="uniforme"):
+    """Matriz (n_portafolios x n_activos) de pesos no negativos que suman 1."""
+    if metodo == "dirichlet":
+        return rng.dirichlet(np.ones(n_activos), size=n_portafolios)
+    if metodo != "uniforme":
+        raise ValueError(f"Método de muestreo no soportado: {metodo}")
+    pesos = rng.random((n_portafolios, n_activos))
+    pesos /= pesos.sum(axis=1, keepdims=True)
+    return pesos
+
+
+def simular_portafolios(mean_returns, cov_matrix, n_portafolios, rf=0.03, metodo="uniforme",
+                        semilla=None, tamano_bloque=TAMANO_BLOQUE):
+    """Simula ``n_portafolios`` portafolios aleatorios long-only.
+
+    Devuelve ``(df, pesos)``: un DataFrame con las columnas Rendimiento,
+    Volatilidad y Sharpe Ratio, y la matriz de pesos (float32) alineada por
+    fila con el DataFrame y por columna con ``mean_returns``.
+    """
+    mu = np.asarray(mean_returns, dtype=float)
+    cov = np.asarray(cov_matrix, dtype=float)
+    n_activos = len(mu)
+    rng = np.random.default_rng(semilla)
+
+    pesos = np.empty((n_portafolios, n_activos), dtype=np.float32)
+    rendimientos = np.empty(n_portafolios)
+    volatilidades = np.empty(n_portafolios)
+
+    for inicio in range(0, n_portafolios, tamano_bloque):
+        fin = min(inicio + tamano_bloque, n_portafolios)
+        bloque = generar_pesos(rng, fin - inicio, n_activos, metodo)
+
+        pesos[inicio:fin] = bloque
+        rendimientos[inicio:fin] = bloque @ mu
+        # w' Σ w de cada fila sin construir matrices n x n por portafolio
+        volatilidades[inicio:fin] = np.sqrt(np.einsum("ij,ij->i", bloque @ cov, bloque))
+
+    df = pd.DataFrame({
+        "Rendimiento": rendimientos,
+        "Volatilidad": volatilidades,
+        "Sharpe Ratio": (rendimientos - rf) / volatilidades,
+    })
+    return df, pesos
+
+
+# -------- Frontera exacta (línea crítica) --------
+# Cada punto resuelve  min w'Σw - t·μ'w  sujeto a  Σw = 1,  cota_min <= w <= cota_max.
+# Mientras no cambia qué pesos están en sus cotas la solución es lineal en t, así
+# que la frontera es una poligonal en el espacio de pesos. El método de la línea
+# crítica (Markowitz) la recorre de quiebre en quiebre, desde el portafolio de
+# máximo rendimiento (t = ∞) hasta el de mínima varianza (t = 0): en cada quiebre
+# un peso libre llega a su cota o uno en su cota se libera. Entre dos quiebres
+# cualquier punto de la frontera sale exacto por interpolación.
+
+# La inversa de 2·Σ_LL (L = pesos libres) se actualiza con fórmulas de rango uno
+# al entrar o salir un activo, así cada quiebre cuesta O(n²) en lugar de O(k³).
+
+ACTUALIZACIONES_MAX = 64  # actualizaciones de rango uno antes de reinvertir desde cero
+
+
+def _invertir_libres(cov, libres, ridge):
+    sistema = 2 * cov[np.ix_(libres, libres)]
+    sistema[np.diag_indices_from(sistema)] += ridge
+    return np.linalg.inv(sistema)
+
+
+def _inversa_quitar(inversa, posicion):
+    resto = np.delete(np.arange(len(inversa)), posicion)
+    columna = inversa[resto, posicion]
+    return inversa[np.ix_(resto, resto)] - np.outer(columna, columna) / inversa[posicion, posicion]
+
+
+def _inversa_agregar(inversa, cov, libres, j, ridge):
+    c = 2 * cov[libres, j]
+    u = inversa @ c
+    schur = 2 * cov[j, j] + ridge - c @ u
+    if schur <= ridge:
+        raise np.linalg.LinAlgError("Matriz de covarianza singular en el conjunto libre")
+    k = len(libres)
+    nueva = np.empty((k + 1, k + 1))
+    nueva[:k, :k] = inversa + np.outer(u, u) / schur
+    nueva[:k, k] = nueva[k, :k] = -u / schur
+    nueva[k, k] = 1 / schur
+    return nueva
+
+
+def _tramo(inversa, mu, cov, libres, fijos):
+    """Tramo ``w = a + t·b`` con los pesos ``libres`` libres y el resto en
+    ``fijos``, y el gradiente ``p + t·q`` de cada peso (nulo en los libres)."""
+    # w_L = a + t·b  con  2 Σ_LL w_L = t μ_L - 2 Σ_LF w_F + ν 1  y  Σ w_L = 1 - Σ w_F
+    unos = inversa.sum(axis=1)
+    c = inversa @ mu[libres]
+    d = inversa @ (2 * (cov @ fijos))[libres]
+    nu_a = (1 - fijos.sum() + d.sum()) / unos.sum()
+    nu_b = -c.sum() / unos.sum()
+    a, b = fijos.copy(), np.zeros(len(mu))
+    a[libres] = nu_a * unos - d
+    b[libres] = c + nu_b * unos
+    p = 2 * (cov @ a) - nu_a
+    q = 2 * (cov @ b) - mu - nu_b
+    return a, b, p, q
+
+
+def _validar_cotas(n_activos, cota_min, cota_max):
+    if cota_min > cota_max or n_activos * cota_max < 1 or n_activos * cota_min > 1:
+        raise ValueError(
+            f"No existe un portafolio con {n_activos} activos y pesos entre {cota_min:.2%} y {cota_max:.2%}."
+        )
+
+
+def portafolio_max_rendimiento(mean_returns, cota_min=0.0, cota_max=1.0):
+    """Llena primero los activos de mayor rendimiento hasta su cota máxima."""
+    mu = np.asarray(mean_returns, dtype=float)
+    _validar_cotas(len(mu), cota_min, cota_max)
+    pesos = np.full(len(mu), cota_min)
+    restante = 1 - pesos.sum()
+    for i in np.argsort(-mu):
+        extra = min(cota_max - cota_min, restante)
+        pesos[i] += extra
+        restante -= extra
+        if restante <= 0:
+            break
+    return pesos
+
+
+def _estadisticas(pesos, mu, cov, rf):
+    rendimiento = pesos @ mu
+    volatilidad = np.sqrt(np.einsum("ij,ij->i", pesos @ cov, pesos))
+    return rendimiento, volatilidad, (rendimiento - rf) / volatilidad
+
+
+def _linea_critica(mu, cov, cota_min, cota_max):
+    """Quiebres de la frontera (una fila de pesos por quiebre), del portafolio
+    de mínima varianza al de máximo rendimiento."""
+    n = len(mu)
+    w = portafolio_max_rendimiento(mu, cota_min, cota_max)
+    if n * cota_min >= 1 - 1e-12 or n * cota_max <= 1 + 1e-12:
+        return w[None, :]  # un único portafolio factible
+
+    # En t = ∞ solo queda libre el último activo que se llenó; el resto está en sus cotas
+    llenos = np.flatnonzero(w > cota_min)
+    parcial = np.flatnonzero((w > cota_min) & (w < cota_max))
+    libre = parcial[0] if len(parcial) else llenos[np.argmin(mu[llenos])]
+    en_min, en_max = w <= cota_min, w >= cota_max
+    en_min[libre] = en_max[libre] = False
+    libres = np.array([libre])
+
+    escala = 2 * np.trace(cov) / n
+    ridge = 1e-12 * escala
+    # Debajo de estas tolerancias una pendiente en t se toma como cero (activos con el mismo μ)
+    tolerancia_q = 1e-10 * max(np.abs(mu).max(), 1e-12)
+    tolerancia_b = tolerancia_q / escala
+    inversa = _invertir_libres(cov, libres, ridge)
+    actualizaciones = 0
+    bloqueados = np.zeros(n, dtype=bool)
+    quiebres = [w]
+    t, ultimo = np.inf, libre
+
+    for _ in range(10 * n + 100):
+        fijos = np.where(en_max, cota_max, np.where(en_min, cota_min, 0.0))
+        a, b, p, q = _tramo(inversa, mu, cov, libres, fijos)
+        if np.isinf(t):
+            # Con empates en μ el portafolio de máximo rendimiento se corrige mientras t = ∞
+            quiebres[-1] = np.clip(a, cota_min, cota_max)
+
+        # Al bajar t, cada peso libre avanza hacia una cota y el gradiente
+        # 2Σw - tμ - ν de cada peso en su cota (p + t·q) puede cambiar de signo
+        quiebre = np.full(n, -np.inf)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            b_libres = b[libres]
+            quiebre[libres] = np.where(b_libres > tolerancia_b, (cota_min - a[libres]) / b_libres,
+                                       np.where(b_libres < -tolerancia_b, (cota_max - a[libres]) / b_libres, -np.inf))
+            se_libera = ((en_min & (q > tolerancia_q)) | (en_max & (q < -tolerancia_q))) & ~bloqueados
+            quiebre[se_libera] = -p[se_libera] / q[se_libera]
+        # Con q ≈ 0 el gradiente no depende de t: si ya tiene el signo equivocado, se libera ahora
+        empatado = (np.abs(q) <= tolerancia_q) & ~bloqueados
+        violado = empatado & ((en_min & (p < -ridge)) | (en_max & (p > ridge)))
+        quiebre[violado] = t
+
+        # El activo que acaba de cambiar no puede volver a cambiar en el mismo t
+        validos = (quiebre > 0) & (quiebre <= t * (1 + 1e-9))
+        validos[ultimo] &= quiebre[ultimo] < t * (1 - 1e-9)
+        if not validos.any():
+            break
+        j = int(np.argmax(np.where(validos, quiebre, -np.inf)))
+        t = min(quiebre[j], t)
+        if np.isfinite(t):
+            quiebres.append(np.clip(a + t * b, cota_min, cota_max))
+        ultimo = j
+
+        if en_min[j] or en_max[j]:
+            try:
+                inversa = _inversa_agregar(inversa, cov, libres, j, ridge)
+            except np.linalg.LinAlgError:
+                # Con la covarianza singular en los libres el activo no puede entrar
+                bloqueados[j] = True
+                continue
+            en_min[j] = en_max[j] = False
+            libres = np.append(libres, j)
+        else:
+            posicion = int(np.flatnonzero(libres == j)[0])
+            en_min[j], en_max[j] = b[j] > 0, b[j] < 0
+            inversa = _inversa_quitar(inversa, posicion)
+            libres = np.delete(libres, posicion)
+        actualizaciones += 1
+        if actualizaciones >= ACTUALIZACIONES_MAX:
+            inversa = _invertir_libres(cov, libres, ridge)
+            actualizaciones = 0
+
+    # En t = 0 queda el portafolio de mínima varianza
+    quiebres.append(np.clip(a, cota_min, cota_max))
+    return np.array(quiebres[::-1])
+
+
+def _maximo_sharpe(quiebres, mu, cov, rf):
+    """Portafolio de máximo Sharpe sobre la poligonal de quiebres. En cada tramo
+    w = A + s·D y los términos en s² se cancelan al derivar el Sharpe, así que
+    su único punto crítico sale de una ecuación lineal en s."""
+    candidatos = [quiebres]
+    if len(quiebres) > 1:
+        inicio, delta = quiebres[:-1], np.diff(quiebres, axis=0)
+        exceso = inicio @ mu - rf
+        pendiente = delta @ mu
+        producto = inicio @ cov
+        var_inicio = np.einsum("ij,ij->i", producto, inicio)
+        cruzado = np.einsum("ij,ij->i", producto, delta)
+        var_delta = np.einsum("ij,ij->i", delta @ cov, delta)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            s = (exceso * cruzado - pendiente * var_inicio) / (pendiente * cruzado - exceso * var_delta)
+        s = np.clip(np.nan_to_num(s, nan=0.0, posinf=0.0, neginf=0.0), 0.0, 1.0)
+        candidatos.append(inicio + s[:, None] * delta)
+    candidatos = np.vstack(candidatos)
+    _, _, sharpe = _estadisticas(candidatos, mu, cov, rf)
+    return candidatos[np.nanargmax(sharpe)]
+
+
+# -------- Arranque en caliente --------
+# Con datos que cambian poco (rebalanceos sucesivos) casi todos los pesos siguen
+# libres o en la misma cota que en la solución anterior. Partiendo de esos
+# conjuntos, unas pocas iteraciones de conjuntos activos (mover a su cota los
+# libres que la cruzan y liberar los que tienen el gradiente con el signo
+# equivocado) dan el mismo óptimo sin recorrer la línea crítica. Si no converge
+# se recorre la línea crítica como siempre.
+
+ITERACIONES_ARRANQUE = 8
+
+
+def _t_sharpe(a, b, mu, cov, rf):
+    """t que maximiza el Sharpe de ``a + t·b``; None si no es un máximo con t >= 0."""
+    exceso, pendiente = a @ mu - rf, b @ mu
+    var_a, cruzado, var_b = a @ cov @ a, a @ cov @ b, b @ cov @ b
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = (exceso * cruzado - pendiente * var_a) / (pendiente * cruzado - exceso * var_b)
+    if not np.isfinite(t) or t < 0 or exceso + t * pendiente <= 0:
+        return None
+    return t
+
+
+def _optimo_desde(pesos, mu, cov, cota_min, cota_max, rf=None):
+    """Mínima varianza (``rf`` None) o máximo Sharpe por conjuntos activos, a
+    partir de los pesos libres y en su cota de ``pesos``; None si no converge."""
+    n = len(mu)
+    holgura = 1e-9 * (cota_max - cota_min)
+    en_min = pesos <= cota_min + holgura
+    en_max = ~en_min & (pesos >= cota_max - holgura)
+    escala = 2 * np.trace(cov) / n
+    tolerancia = 1e-10 * (escala + np.abs(mu).max())
+
+    for _ in range(ITERACIONES_ARRANQUE):
+        libres = np.flatnonzero(~en_min & ~en_max)
+        if not len(libres):
+            return None
+        fijos = np.where(en_max, cota_max, np.where(en_min, cota_min, 0.0))
+        try:
+            inversa = _invertir_libres(cov, libres, 1e-12 * escala)
+        except np.linalg.LinAlgError:
+            return None
+        a, b, p, q = _tramo(inversa, mu, cov, libres, fijos)
+        t = 0.0 if rf is None else _t_sharpe(a, b, mu, cov, rf)
+        if t is None:
+            return None
+
+        w, gradiente = a + t * b, p + t * q
+        libre = ~en_min & ~en_max
+        bajo, alto = libre & (w < cota_min - holgura), libre & (w > cota_max + holgura)
+        sale_min, sale_max = en_min & (gradiente < -tolerancia), en_max & (gradiente > tolerancia)
+        if not (bajo.any() or alto.any() or sale_min.any() or sale_max.any()):
+            return np.clip(w, cota_min, cota_max)
+        en_min = (en_min & ~sale_min) | bajo
+        en_max = (en_max & ~sale_max) | alto
+    return None
+
+
+def _max_rendimiento_sin_empates(mu, cota_min, cota_max):
+    """Portafolio de máximo rendimiento si es único; con empates en μ en el
+    margen la línea crítica elige el de menor varianza, así que devuelve None."""
+    w = portafolio_max_rendimiento(mu, cota_min, cota_max)
+    llenos = np.flatnonzero(w > cota_min)
+    margen = llenos[np.argmin(mu[llenos])]
+    empatados = np.abs(mu - mu[margen]) <= 1e-10 * max(np.abs(mu).max(), 1e-12)
+    return w if empatados.sum() == 1 else None
+
+
+def portafolios_optimos(mean_returns, cov_matrix, rf=0.03, cota_min=0.0, cota_max=1.0, inicial=None):
+    """``(mínima varianza, máximo Sharpe, máximo rendimiento)`` en un solo
+    recorrido de la línea crítica, sin armar la frontera completa.
+
+    ``inicial`` son los pesos ``(mínima varianza, máximo Sharpe)`` de una
+    solución anterior con los mismos activos: si sirven de arranque en caliente
+    no hace falta recorrer la línea crítica.
+    """
+    mu = np.asarray(mean_returns, dtype=float)
+    cov = np.asarray(cov_matrix, dtype=float)
+    _validar_cotas(len(mu), cota_min, cota_max)
+    if inicial is not None and len(mu) * cota_min < 1 - 1e-12 and len(mu) * cota_max > 1 + 1e-12:
+        minima = _optimo_desde(np.asarray(inicial[0], dtype=float), mu, cov, cota_min, cota_max)
+        sharpe = _optimo_desde(np.asarray(inicial[1], dtype=float), mu, cov, cota_min, cota_max, rf)
+        maxima = _max_rendimiento_sin_empates(mu, cota_min, cota_max)
+        if minima is not None and sharpe is not None and maxima is not None:
+            return minima, sharpe, maxima
+    quiebres = _linea_critica(mu, cov, cota_min, cota_max)
+    return quiebres[0], _maximo_sharpe(quiebres, mu, cov, rf), quiebres[-1]
+
+
+def frontera_optima(mean_returns, cov_matrix, n_puntos=100, rf=0.03, cota_min=0.0, cota_max=1.0):
+    """Frontera eficiente exacta con ``n_puntos`` repartidos en rendimiento.
+
+    Devuelve ``(df, pesos)`` con el mismo formato que ``simular_portafolios``.
+    La primera fila es el portafolio de mínima varianza, la última el de
+    máximo rendimiento, y el de máximo Sharpe se inserta en su posición.
+    """
+    mu = np.asarray(mean_returns, dtype=float)
+    cov = np.asarray(cov_matrix, dtype=float)
+    quiebres = _linea_critica(mu, cov, cota_min, cota_max)
+    rendimientos = np.maximum.accumulate(quiebres @ mu)
+
+    # Rendimientos equiespaciados: entre dos quiebres los pesos son lineales en el rendimiento
+    objetivos = np.linspace(rendimientos[0], rendimientos[-1], n_puntos)
+    if len(quiebres) == 1:
+        pesos = np.repeat(quiebres, n_puntos, axis=0)
+    else:
+        k = np.clip(np.searchsorted(rendimientos, objetivos), 1, len(quiebres) - 1)
+        tramo = rendimientos[k] - rendimientos[k - 1]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            fraccion = np.where(tramo > 0, (objetivos - rendimientos[k - 1]) / tramo, 1.0)
+        fraccion = np.clip(fraccion, 0.0, 1.0)
+        pesos = quiebres[k - 1] + fraccion[:, None] * (quiebres[k] - quiebres[k - 1])
+
+    w_sharpe = _maximo_sharpe(quiebres, mu, cov, rf)
+    posicion = int(np.searchsorted(objetivos, w_sharpe @ mu))
+    pesos = np.insert(pesos, posicion, w_sharpe, axis=0)
+
+    rendimiento, volatilidad, ratio_sharpe = _estadisticas(pesos, mu, cov, rf)
+    df = pd.DataFrame({
+        "Rendimiento": rendimiento,
+        "Volatilidad": volatilidad,
+        "Sharpe Ratio": ratio_sharpe,
+    })
+    return df, pesos.astype(np.float32)
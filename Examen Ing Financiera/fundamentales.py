@@ -0,0 +1,92 @@
+# -------- Caché de fundamentales (yf.Ticker().info) --------
+# El .info de cada ticker se pide a Yahoo como mucho una vez por TTL (un día
+# por defecto). Se guarda en memoria, compartido por todas las secciones y
+# sesiones, y en disco para que sobreviva a un reinicio del servidor.
+
+import json
+import os
+import threading
+import time
+
+from cache import CacheTTL, SolicitudesEnCurso
+from datos import DIRECTORIO_ALMACEN
+from metricas import metricas
+from proveedores import descargar_info
+
+TTL_FUNDAMENTALES = int(os.environ.get("TTL_FUNDAMENTALES", 24 * 60 * 60))
+MAX_FUNDAMENTALES = int(os.environ.get("MAX_FUNDAMENTALES", 512))
+
+DIRECTORIO_FUNDAMENTALES = DIRECTORIO_ALMACEN / "info"
+
+# Columna de la tabla de valuación -> clave en yf.Ticker().info
+MULTIPLOS = {
+    "P/E": "trailingPE",
+    "P/B": "priceToBook",
+    "EV/EBITDA": "enterpriseToEbitda",
+    "EV/Sales": "enterpriseToRevenue",
+}
+
+_cache_info = CacheTTL(TTL_FUNDAMENTALES, MAX_FUNDAMENTALES, nombre="fundamentales")
+_info_en_curso = SolicitudesEnCurso(nombre="fundamentales_en_curso")
+
+
+def _ruta_info(ticker):
+    return DIRECTORIO_FUNDAMENTALES / f"{ticker}.json"
+
+
+def _leer_disco(ticker):
+    ruta = _ruta_info(ticker)
+    if not ruta.exists():
+        return None
+    momento = ruta.stat().st_mtime
+    if time.time() - momento >= TTL_FUNDAMENTALES:
+        return None
+    try:
+        with open(ruta, encoding="utf-8") as f:
+            return momento, json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _escribir_disco(ticker, info):
+    DIRECTORIO_FUNDAMENTALES.mkdir(parents=True, exist_ok=True)
+    ruta = _ruta_info(ticker)
+    temporal = ruta.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump(info, f, default=str)
+    os.replace(temporal, ruta)
+
+
+def obtener_info(ticker):
+    """``yf.Ticker(ticker).info`` servido desde caché mientras no caduque."""
+    ticker = ticker.upper().strip()
+
+    info = _cache_info.obtener(ticker)
+    if info is not None:
+        return info
+    # Si otra sesión ya está pidiendo este ticker, se espera su respuesta
+    return _info_en_curso.ejecutar(ticker, _cargar_info, ticker)
+
+
+def _cargar_info(ticker):
+    en_disco = _leer_disco(ticker)
+    metricas.registrar_cache("fundamentales_disco", en_disco is not None)
+    if en_disco is not None:
+        momento, info = en_disco
+        _cache_info.guardar(ticker, info, momento)
+        return info
+
+    info = descargar_info(ticker)
+    _cache_info.guardar(ticker, info)
+    if info:
+        _escribir_disco(ticker, info)
+    return info
+
+
+def obtener_multiplos(ticker):
+    """Fila de la tabla de valuación: ticker y sus cuatro múltiplos."""
+    info = obtener_info(ticker)
+    fila = {"Ticker": ticker.upper().strip()}
+    for columna, clave in MULTIPLOS.items():
+        fila[columna] = info.get(clave, None)
+    return fila
@@ -0,0 +1,111 @@
+# -------- Reducción de datos para las gráficas --------
+# Lo que se manda al navegador no debe crecer con el historial: las series se
+# reducen con LTTB (Largest-Triangle-Three-Buckets, conserva picos y valles) a
+# unos pocos puntos por píxel, las trazas largas usan WebGL y las nubes de
+# portafolios muy grandes se dibujan como un mapa de calor por celdas.
+
+import os
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+# Puntos que se dibujan por serie (aprox. el ancho en píxeles de la gráfica)
+PUNTOS_PANTALLA = int(os.environ.get("PUNTOS_PANTALLA", 1500))
+# A partir de cuántos puntos una traza se dibuja con WebGL (Scattergl)
+UMBRAL_WEBGL = 5_000
+# A partir de cuántos portafolios la frontera se dibuja como mapa de calor
+UMBRAL_DENSIDAD = 20_000
+CELDAS_DENSIDAD = 200
+
+
+def lttb(x, y, puntos):
+    """Índices de los ``puntos`` elegidos por LTTB sobre ``(x, y)``.
+
+    El primer y el último punto se conservan; el resto se divide en
+    ``puntos - 2`` cubetas y de cada una se toma el punto que forma el
+    triángulo de mayor área con el elegido anterior y el promedio de la
+    cubeta siguiente.
+    """
+    n = len(y)
+    if puntos >= n or puntos < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    bordes = np.linspace(1, n - 1, puntos - 1).astype(np.int64)
+
+    # Promedio de cada cubeta con sumas acumuladas; la "siguiente" de la última es el último punto
+    suma_x = np.concatenate(([0.0], np.cumsum(x)))
+    suma_y = np.concatenate(([0.0], np.cumsum(y)))
+    tamanos = np.maximum(bordes[1:] - bordes[:-1], 1)
+    media_x = np.append((suma_x[bordes[1:]] - suma_x[bordes[:-1]]) / tamanos, x[-1])
+    media_y = np.append((suma_y[bordes[1:]] - suma_y[bordes[:-1]]) / tamanos, y[-1])
+
+    elegidos = np.empty(puntos, dtype=np.int64)
+    elegidos[0], elegidos[-1] = 0, n - 1
+    a = 0
+    for i in range(puntos - 2):
+        inicio, fin = bordes[i], max(bordes[i + 1], bordes[i] + 1)
+        cx, cy = media_x[i + 1], media_y[i + 1]
+        areas = np.abs((x[a] - cx) * (y[inicio:fin] - y[a]) - (x[a] - x[inicio:fin]) * (cy - y[a]))
+        a = inicio + int(np.argmax(areas))
+        elegidos[i + 1] = a
+    return elegidos
+
+
+def reducir(serie, puntos=PUNTOS_PANTALLA):
+    """``serie`` (Series con índice de fechas o numérico) reducida a ``puntos`` con LTTB."""
+    serie = serie.dropna()
+    if len(serie) <= puntos:
+        return serie
+    indice = serie.index
+    x = indice.asi8 if isinstance(indice, pd.DatetimeIndex) else indice.to_numpy(dtype=float)
+    return serie.iloc[lttb(x, serie.to_numpy(), puntos)]
+
+
+def linea(serie, puntos=PUNTOS_PANTALLA, **kwargs):
+    """Traza de ``serie`` lista para ``add_trace``: reducida y con WebGL si aún es larga."""
+    serie = reducir(serie, puntos)
+    traza = go.Scattergl if len(serie) > UMBRAL_WEBGL else go.Scatter
+    return traza(x=serie.index, y=serie, **kwargs)
+
+
+def mapa_densidad(df, x, y, color, titulo=None, labels=None, height=None, celdas=CELDAS_DENSIDAD):
+    """Nube de puntos resumida en ``celdas`` x ``celdas``: cada celda muestra el
+    mayor valor de ``color`` entre sus puntos y, al pasar el cursor, cuántos hay."""
+    labels = labels or {}
+    vx = df[x].to_numpy(dtype=float)
+    vy = df[y].to_numpy(dtype=float)
+    vc = df[color].to_numpy(dtype=float)
+
+    bordes_x = np.linspace(vx.min(), vx.max(), celdas + 1)
+    bordes_y = np.linspace(vy.min(), vy.max(), celdas + 1)
+    ix = np.clip(np.searchsorted(bordes_x, vx, side="right") - 1, 0, celdas - 1)
+    iy = np.clip(np.searchsorted(bordes_y, vy, side="right") - 1, 0, celdas - 1)
+    celda = iy * celdas + ix
+
+    conteo = np.bincount(celda, minlength=celdas * celdas)
+    maximo = np.full(celdas * celdas, -np.inf)
+    np.maximum.at(maximo, celda, vc)
+    maximo[conteo == 0] = np.nan
+
+    fig = go.Figure(go.Heatmap(
+        x=(bordes_x[:-1] + bordes_x[1:]) / 2,
+        y=(bordes_y[:-1] + bordes_y[1:]) / 2,
+        z=maximo.reshape(celdas, celdas),
+        customdata=conteo.reshape(celdas, celdas),
+        colorscale="Turbo",
+        colorbar=dict(title=labels.get(color, color)),
+        hovertemplate=(
+            f"{labels.get(x, x)}=%{{x:.4f}}<br>{labels.get(y, y)}=%{{y:.4f}}<br>"
+            f"{labels.get(color, color)} máx.=%{{z:.3f}}<br>Portafolios=%{{customdata}}<extra></extra>"
+        ),
+    ))
+    fig.update_layout(
+        title=titulo,
+        xaxis_title=labels.get(x, x),
+        yaxis_title=labels.get(y, y),
+        height=height,
+    )
+    return fig
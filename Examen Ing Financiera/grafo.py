@@ -0,0 +1,69 @@
+# -------- Grafo de dependencias entre secciones --------
+# Streamlit vuelve a ejecutar el script completo con cada cambio de widget.
+# Cada cálculo pesado se registra como un nodo que declara sus entradas
+# (valores de widgets) y sus dependencias (otros nodos); su resultado se guarda
+# en la sesión y solo se recalcula cuando cambia alguna entrada, cuando se
+# recalculó alguna dependencia o cuando vence su ``ttl``. Así, cambiar un
+# comparable rehace solo la tabla de múltiplos.
+
+import time
+
+from metricas import metricas
+
+
+def _congelar(valor):
+    """Versión comparable y estable de una entrada (listas -> tuplas)."""
+    if isinstance(valor, (list, tuple)):
+        return tuple(_congelar(v) for v in valor)
+    if isinstance(valor, dict):
+        return tuple(sorted((k, _congelar(v)) for k, v in valor.items()))
+    if isinstance(valor, set):
+        return tuple(sorted(valor))
+    return valor
+
+
+class GrafoSecciones:
+
+    def __init__(self, memoria):
+        # ``memoria`` persiste entre ejecuciones (por ejemplo st.session_state[...])
+        self.memoria = memoria
+        self.recalculados = []
+        self._nodos = {}
+
+    def nodo(self, entradas=(), dependencias=(), ttl=None, nombre=None):
+        """Decorador: registra la función como nodo. Recibe sus entradas y el
+        resultado de cada dependencia como argumentos con el mismo nombre."""
+        def registrar(funcion):
+            self._nodos[nombre or funcion.__name__] = (funcion, tuple(entradas), tuple(dependencias), ttl)
+            return funcion
+        return registrar
+
+    def valor(self, nombre, **valores):
+        """Resultado del nodo ``nombre``; ``valores`` debe incluir las entradas
+        de ese nodo y de todas sus dependencias."""
+        funcion, entradas, dependencias, ttl = self._nodos[nombre]
+        resultados = {dep: self.valor(dep, **valores) for dep in dependencias}
+
+        clave = (
+            tuple(_congelar(valores[e]) for e in entradas),
+            tuple(self.memoria[dep]["version"] for dep in dependencias),
+        )
+        guardado = self.memoria.get(nombre)
+        vigente = (
+            guardado is not None and guardado["clave"] == clave
+            and (ttl is None or time.time() - guardado["momento"] < ttl)
+        )
+        metricas.registrar_cache(f"nodo {nombre}", vigente)
+        if vigente:
+            return guardado["valor"]
+
+        with metricas.seccion(f"nodo {nombre}"):
+            resultado = funcion(**{e: valores[e] for e in entradas}, **resultados)
+        self.memoria[nombre] = {
+            "clave": clave,
+            "valor": resultado,
+            "momento": time.time(),
+            "version": 0 if guardado is None else guardado["version"] + 1,
+        }
+        self.recalculados.append(nombre)
+        return resultado
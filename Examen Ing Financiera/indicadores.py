@@ -0,0 +1,433 @@
+# -------- Indicadores sobre matrices de precios --------
+# Todas las funciones reciben precios de cierre como Series (un ticker) o como
+# DataFrame ancho fechas x tickers, y calculan cada indicador para todas las
+# columnas a la vez con operaciones vectorizadas de pandas/numpy.
+
+import math
+from collections import deque
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+DIAS_HABILES = 252
+
+
+def rsi(precios, ventana=14, metodo="simple"):
+    """RSI con medias de ganancias y pérdidas: móviles simples ("simple") o
+    suavizado de Wilder ("wilder", media exponencial con alfa = 1 / ventana)."""
+    delta = precios.diff()
+    ganancia = delta.where(delta > 0, 0.0)
+    perdida = -delta.where(delta < 0, 0.0)
+
+    if metodo == "wilder":
+        media_ganancia = ganancia.ewm(alpha=1 / ventana, adjust=False, min_periods=ventana).mean()
+        media_perdida = perdida.ewm(alpha=1 / ventana, adjust=False, min_periods=ventana).mean()
+    elif metodo == "simple":
+        media_ganancia = ganancia.rolling(window=ventana).mean()
+        media_perdida = perdida.rolling(window=ventana).mean()
+    else:
+        raise ValueError(f"Método de RSI no soportado: {metodo}")
+
+    rs = media_ganancia / media_perdida
+    return 100 - (100 / (1 + rs))
+
+
+def macd(precios, rapida=12, lenta=26, senal=9):
+    """Devuelve ``(macd, señal)`` con medias exponenciales (adjust=False)."""
+    ema_rapida = precios.ewm(span=rapida, adjust=False).mean()
+    ema_lenta = precios.ewm(span=lenta, adjust=False).mean()
+    linea = ema_rapida - ema_lenta
+    return linea, linea.ewm(span=senal, adjust=False).mean()
+
+
+def rendimientos_log(precios):
+    return np.log(precios / precios.shift(1))
+
+
+def volatilidad_anual(precios):
+    """Desviación estándar (poblacional) de los rendimientos log diarios, anualizada."""
+    return rendimientos_log(precios).std(ddof=0) * np.sqrt(DIAS_HABILES)
+
+
+def cagr(precios, años):
+    """CAGR en % de cada columna entre su último dato y ``años`` atrás.
+
+    La ventana empieza 365 * años días antes del último dato válido de cada
+    ticker y se exige al menos dos precios.
+    """
+    matriz = precios.to_frame() if isinstance(precios, pd.Series) else precios
+    valores = matriz.to_numpy(dtype=float)
+    validos = ~np.isnan(valores)
+    fechas = matriz.index.values
+
+    tiene_datos = validos.any(axis=0)
+    ultima_fila = len(valores) - 1 - np.argmax(validos[::-1], axis=0)
+    fecha_inicial = fechas[ultima_fila] - np.timedelta64(timedelta(days=365 * años))
+
+    en_ventana = validos & (fechas[:, None] >= fecha_inicial[None, :])
+    primera_fila = np.argmax(en_ventana, axis=0)
+    columnas = np.arange(valores.shape[1])
+
+    inicio = valores[primera_fila, columnas]
+    fin = valores[ultima_fila, columnas]
+    suficientes = tiene_datos & (en_ventana.sum(axis=0) >= 2) & (inicio != 0)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        resultado = np.where(suficientes, ((fin / inicio) ** (1 / años) - 1) * 100, np.nan)
+    resultado = pd.Series(np.round(resultado, 2), index=matriz.columns)
+    return resultado.iloc[0] if isinstance(precios, pd.Series) else resultado
+
+
+def tabla_indicadores(precios, años_cagr=(1, 3, 5)):
+    """Último valor de cada indicador por ticker (una fila por ticker)."""
+    linea_macd, linea_senal = macd(precios)
+    tabla = pd.DataFrame({
+        "RSI": rsi(precios).ffill().iloc[-1],
+        "MACD": linea_macd.ffill().iloc[-1],
+        "Señal MACD": linea_senal.ffill().iloc[-1],
+        "Volatilidad": volatilidad_anual(precios),
+    })
+    for años in años_cagr:
+        tabla[f"CAGR {años} año(s)"] = cagr(precios, años)
+    tabla.index.name = "Ticker"
+    return tabla
+
+
+# -------- Series móviles --------
+# Cada ventana se obtiene restando dos sumas acumuladas, así que el costo es
+# lineal en el largo del historial sin importar el tamaño ni la cantidad de
+# ventanas: las sumas se calculan una vez y sirven para todas. Una ventana con
+# algún dato faltante da NaN (igual que ``rolling`` con ``min_periods=ventana``).
+# Los resultados son fracciones anualizadas, no porcentajes.
+
+VENTANAS_MOVILES = (21, 63, 126, 252)  # ~1, 3, 6 y 12 meses hábiles
+
+
+def _acumular(valores):
+    """Sumas acumuladas con una fila de ceros al inicio; los NaN suman cero."""
+    ceros = np.zeros((1, valores.shape[1]))
+    return np.concatenate((ceros, np.cumsum(np.nan_to_num(valores), axis=0)))
+
+
+def _en_ventana(acumulada, ventana):
+    """Suma de las últimas ``ventana`` filas en cada fila (NaN en las primeras)."""
+    resultado = np.full((acumulada.shape[0] - 1, acumulada.shape[1]), np.nan)
+    resultado[ventana - 1:] = acumulada[ventana:] - acumulada[:-ventana]
+    return resultado
+
+
+def _momentos_moviles(r, ventanas):
+    """``{ventana: (media, varianza)}`` de los rendimientos ``r`` (varianza poblacional)."""
+    validos = ~np.isnan(r)
+    suma = _acumular(r)
+    suma_cuadrados = _acumular(r * r)
+    conteo = _acumular(validos.astype(float))
+
+    momentos = {}
+    for ventana in ventanas:
+        completa = _en_ventana(conteo, ventana) == ventana
+        media = np.where(completa, _en_ventana(suma, ventana) / ventana, np.nan)
+        varianza = np.maximum(_en_ventana(suma_cuadrados, ventana) / ventana - media ** 2, 0.0)
+        momentos[ventana] = (media, varianza)
+    return momentos
+
+
+def _matriz_rendimientos(precios):
+    matriz = precios.to_frame() if isinstance(precios, pd.Series) else precios
+    return matriz, rendimientos_log(matriz).to_numpy(dtype=float)
+
+
+def _armar(resultados, matriz, es_serie):
+    """Una columna por ventana (Series) o columnas ``(Ventana, Ticker)`` (DataFrame)."""
+    if es_serie:
+        tabla = pd.DataFrame({v: valores[:, 0] for v, valores in resultados.items()}, index=matriz.index)
+        tabla.columns.name = "Ventana"
+        return tabla
+    return pd.concat(
+        {v: pd.DataFrame(valores, index=matriz.index, columns=matriz.columns) for v, valores in resultados.items()},
+        axis=1, names=["Ventana", "Ticker"],
+    )
+
+
+def volatilidad_movil(precios, ventanas=VENTANAS_MOVILES):
+    """Volatilidad anualizada de los rendimientos log en cada ventana."""
+    matriz, r = _matriz_rendimientos(precios)
+    momentos = _momentos_moviles(r, ventanas)
+    resultados = {v: np.sqrt(var * DIAS_HABILES) for v, (_, var) in momentos.items()}
+    return _armar(resultados, matriz, isinstance(precios, pd.Series))
+
+
+def rendimiento_movil(precios, ventanas=VENTANAS_MOVILES):
+    """Rendimiento anualizado (CAGR) de cada ventana, como fracción."""
+    matriz, r = _matriz_rendimientos(precios)
+    momentos = _momentos_moviles(r, ventanas)
+    resultados = {v: np.expm1(media * DIAS_HABILES) for v, (media, _) in momentos.items()}
+    return _armar(resultados, matriz, isinstance(precios, pd.Series))
+
+
+def sharpe_movil(precios, ventanas=VENTANAS_MOVILES, rf=0.0):
+    """Sharpe anualizado de cada ventana: (media anual de rendimientos log - rf) / volatilidad."""
+    matriz, r = _matriz_rendimientos(precios)
+    momentos = _momentos_moviles(r, ventanas)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        resultados = {
+            v: (media * DIAS_HABILES - rf) / np.sqrt(var * DIAS_HABILES)
+            for v, (media, var) in momentos.items()
+        }
+    return _armar(resultados, matriz, isinstance(precios, pd.Series))
+
+
+def beta_movil(precios, referencia, ventanas=VENTANAS_MOVILES):
+    """Beta de cada columna contra la serie de precios ``referencia`` en cada ventana.
+
+    Solo cuentan los días con dato en ambas series; la ventana debe estar completa.
+    """
+    matriz, r = _matriz_rendimientos(precios)
+    r_ref = rendimientos_log(referencia.reindex(matriz.index)).to_numpy(dtype=float)[:, None]
+
+    conjuntos = ~np.isnan(r) & ~np.isnan(r_ref)
+    x = np.where(conjuntos, r, 0.0)
+    y = np.where(conjuntos, r_ref, 0.0)
+    suma_x, suma_y = _acumular(x), _acumular(y)
+    suma_xy, suma_yy = _acumular(x * y), _acumular(y * y)
+    conteo = _acumular(conjuntos.astype(float))
+
+    resultados = {}
+    for ventana in ventanas:
+        completa = _en_ventana(conteo, ventana) == ventana
+        sx, sy = _en_ventana(suma_x, ventana), _en_ventana(suma_y, ventana)
+        covarianza = _en_ventana(suma_xy, ventana) - sx * sy / ventana
+        varianza = _en_ventana(suma_yy, ventana) - sy * sy / ventana
+        with np.errstate(divide="ignore", invalid="ignore"):
+            resultados[ventana] = np.where(completa & (varianza > 0), covarianza / varianza, np.nan)
+    return _armar(resultados, matriz, isinstance(precios, pd.Series))
+
+
+# -------- Versiones incrementales (un precio a la vez) --------
+# Mantienen el estado mínimo para actualizar cada indicador en O(1) por barra
+# nueva y dan los mismos valores que las funciones de arriba sobre el mismo
+# historial. ``estado()`` devuelve un dict serializable y ``desde_estado`` lo
+# restaura, para guardar una instantánea y seguir actualizando después.
+
+class _Incremental:
+
+    def estado(self):
+        return {
+            clave: (list(valor) if isinstance(valor, deque) else
+                    valor.estado() if isinstance(valor, _Incremental) else valor)
+            for clave, valor in self.__dict__.items()
+        }
+
+    @classmethod
+    def desde_estado(cls, estado):
+        objeto = cls.__new__(cls)
+        for clave, valor in estado.items():
+            objeto.__dict__[clave] = valor
+        return objeto
+
+
+class EMAIncremental(_Incremental):
+    """Media exponencial equivalente a ``ewm(span=span, adjust=False).mean()``."""
+
+    def __init__(self, span):
+        self.alfa = 2 / (span + 1)
+        self.valor = None
+
+    def actualizar(self, precio):
+        if self.valor is None:
+            self.valor = float(precio)
+        else:
+            self.valor += self.alfa * (precio - self.valor)
+        return self.valor
+
+
+class MACDIncremental(_Incremental):
+    """MACD y su línea de señal; ``actualizar`` devuelve ``(macd, señal)``."""
+
+    def __init__(self, rapida=12, lenta=26, senal=9):
+        self.rapida = EMAIncremental(rapida)
+        self.lenta = EMAIncremental(lenta)
+        self.senal = EMAIncremental(senal)
+        self.valor = None
+
+    def actualizar(self, precio):
+        linea = self.rapida.actualizar(precio) - self.lenta.actualizar(precio)
+        self.valor = (linea, self.senal.actualizar(linea))
+        return self.valor
+
+    @classmethod
+    def desde_estado(cls, estado):
+        objeto = super().desde_estado(estado)
+        for clave in ("rapida", "lenta", "senal"):
+            objeto.__dict__[clave] = EMAIncremental.desde_estado(estado[clave])
+        objeto.valor = None if estado["valor"] is None else tuple(estado["valor"])
+        return objeto
+
+
+class RSIIncremental(_Incremental):
+    """RSI barra a barra, con el mismo ``metodo`` ("simple" o "wilder") que ``rsi``."""
+
+    def __init__(self, ventana=14, metodo="simple"):
+        if metodo not in ("simple", "wilder"):
+            raise ValueError(f"Método de RSI no soportado: {metodo}")
+        self.ventana = ventana
+        self.metodo = metodo
+        self.anterior = None
+        self.barras = 0
+        # "simple": ganancias/pérdidas de la ventana y sus sumas; "wilder": medias suavizadas
+        self.ganancias = deque(maxlen=ventana)
+        self.perdidas = deque(maxlen=ventana)
+        self.suma_ganancia = 0.0
+        self.suma_perdida = 0.0
+        self.valor = math.nan
+
+    def actualizar(self, precio):
+        precio = float(precio)
+        # La primera barra no tiene delta y cuenta como ganancia y pérdida nulas (igual que en pandas)
+        delta = 0.0 if self.anterior is None else precio - self.anterior
+        self.anterior = precio
+        ganancia, perdida = max(delta, 0.0), max(-delta, 0.0)
+        self.barras += 1
+
+        if self.metodo == "simple":
+            if len(self.ganancias) == self.ventana:
+                self.suma_ganancia -= self.ganancias[0]
+                self.suma_perdida -= self.perdidas[0]
+            self.ganancias.append(ganancia)
+            self.perdidas.append(perdida)
+            self.suma_ganancia += ganancia
+            self.suma_perdida += perdida
+            # Recalcular de vez en cuando evita que el error de redondeo se acumule
+            if self.barras % 1024 == 0:
+                self.suma_ganancia, self.suma_perdida = sum(self.ganancias), sum(self.perdidas)
+        elif self.barras == 1:
+            self.suma_ganancia, self.suma_perdida = ganancia, perdida
+        else:
+            alfa = 1 / self.ventana
+            self.suma_ganancia += alfa * (ganancia - self.suma_ganancia)
+            self.suma_perdida += alfa * (perdida - self.suma_perdida)
+
+        if self.barras < self.ventana:
+            self.valor = math.nan
+        elif self.suma_perdida <= 0:
+            self.valor = 100.0 if self.suma_ganancia > 0 else math.nan
+        else:
+            self.valor = 100 - 100 / (1 + self.suma_ganancia / self.suma_perdida)
+        return self.valor
+
+    @classmethod
+    def desde_estado(cls, estado):
+        objeto = super().desde_estado(estado)
+        objeto.ganancias = deque(estado["ganancias"], maxlen=estado["ventana"])
+        objeto.perdidas = deque(estado["perdidas"], maxlen=estado["ventana"])
+        return objeto
+
+
+class VolatilidadIncremental(_Incremental):
+    """Volatilidad anualizada de los rendimientos log con el algoritmo de Welford.
+
+    Sin ``ventana`` usa todo el historial (``expanding().std(ddof=0)``); con
+    ``ventana`` solo los últimos rendimientos (``rolling(ventana).std(ddof=0)``)."""
+
+    def __init__(self, ventana=None):
+        self.ventana = ventana
+        self.anterior = None
+        self.barras = 0
+        self.rendimientos = deque(maxlen=ventana) if ventana else None
+        self.n = 0
+        self.media = 0.0
+        self.m2 = 0.0
+        self.valor = math.nan
+
+    def _quitar(self, r):
+        self.n -= 1
+        if self.n == 0:
+            self.media = self.m2 = 0.0
+            return
+        desvio = r - self.media
+        self.media -= desvio / self.n
+        self.m2 -= desvio * (r - self.media)
+
+    def actualizar(self, precio):
+        precio = float(precio)
+        if self.anterior is not None:
+            r = math.log(precio / self.anterior)
+            self.barras += 1
+            if self.rendimientos is not None:
+                if len(self.rendimientos) == self.ventana:
+                    self._quitar(self.rendimientos[0])
+                self.rendimientos.append(r)
+            self.n += 1
+            desvio = r - self.media
+            self.media += desvio / self.n
+            self.m2 += desvio * (r - self.media)
+            # Como en el RSI simple, la ventana se recalcula de vez en cuando para no acumular redondeo
+            if self.rendimientos is not None and self.barras % 1024 == 0:
+                valores = np.array(self.rendimientos)
+                self.media, self.m2 = float(valores.mean()), float(((valores - valores.mean()) ** 2).sum())
+            completa = self.ventana is None or self.n == self.ventana
+            self.valor = math.sqrt(max(self.m2, 0.0) / self.n) * math.sqrt(DIAS_HABILES) if completa else math.nan
+        self.anterior = precio
+        return self.valor
+
+    @classmethod
+    def desde_estado(cls, estado):
+        objeto = super().desde_estado(estado)
+        if estado["ventana"]:
+            objeto.rendimientos = deque(estado["rendimientos"], maxlen=estado["ventana"])
+        return objeto
+
+
+class IndicadoresEnVivo(_Incremental):
+    """RSI, MACD y volatilidad de un ticker al último cierre diario, para la vista
+    en vivo. ``avanzar`` agrega solo las barras diarias nuevas, una a una, y
+    ``con_precio`` evalúa una cotización sobre una copia del estado (la barra de
+    hoy todavía no cerró), así que cada refresco cuesta lo mismo sin importar el
+    largo del historial."""
+
+    def __init__(self, ventana_rsi=14, rapida=12, lenta=26, senal=9, ventana_volatilidad=DIAS_HABILES):
+        self.rsi = RSIIncremental(ventana_rsi)
+        self.macd = MACDIncremental(rapida, lenta, senal)
+        self.volatilidad = VolatilidadIncremental(ventana_volatilidad)
+        self.fecha = None
+        self.cierre = None
+
+    def avanzar(self, cierres):
+        """Agrega los cierres (Series ordenada por fecha) posteriores a la última fecha vista."""
+        if self.fecha is not None:
+            cierres = cierres.iloc[cierres.index.searchsorted(self.fecha, side="right"):]
+        for fecha, precio in cierres.dropna().items():
+            self.rsi.actualizar(precio)
+            self.macd.actualizar(precio)
+            self.volatilidad.actualizar(precio)
+            self.fecha, self.cierre = fecha, float(precio)
+        return self
+
+    def sigue(self, cierres):
+        """False si ``cierres`` ya no contiene el último cierre visto con el mismo
+        valor (un dividendo o split reescribe los precios ajustados)."""
+        if self.fecha is None:
+            return True
+        posicion = cierres.index.searchsorted(self.fecha)
+        return (posicion < len(cierres) and cierres.index[posicion] == self.fecha
+                and math.isclose(cierres.iloc[posicion], self.cierre, rel_tol=1e-9))
+
+    def con_precio(self, precio):
+        """``{"RSI", "MACD", "Señal", "Volatilidad"}`` si el día cerrara a ``precio``."""
+        copia = IndicadoresEnVivo.desde_estado(self.estado())
+        linea, senal = copia.macd.actualizar(precio)
+        return {
+            "RSI": copia.rsi.actualizar(precio),
+            "MACD": linea,
+            "Señal": senal,
+            "Volatilidad": copia.volatilidad.actualizar(precio),
+        }
+
+    @classmethod
+    def desde_estado(cls, estado):
+        objeto = super().desde_estado(estado)
+        objeto.rsi = RSIIncremental.desde_estado(estado["rsi"])
+        objeto.macd = MACDIncremental.desde_estado(estado["macd"])
+        objeto.volatilidad = VolatilidadIncremental.desde_estado(estado["volatilidad"])
+        return objeto
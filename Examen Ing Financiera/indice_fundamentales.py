@@ -0,0 +1,162 @@
+# -------- Índice local de fundamentales del S&P 500 --------
+# Tabla precalculada con P/E, P/B, EV/EBITDA, EV/Sales, sector e industria de
+# todas las empresas del S&P 500. La sección de valuación elige los pares del
+# ticker (misma industria o sector) y calcula su percentil y la mediana del
+# grupo sin ninguna llamada a Yahoo. Se construye o actualiza con:
+#
+#   python indice_fundamentales.py                 # constituyentes actuales del S&P 500
+#   python indice_fundamentales.py --tickers AAPL MSFT GOOGL
+
+import argparse
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+import requests
+from bs4 import BeautifulSoup
+
+from datos import DIRECTORIO_ALMACEN, MAX_HILOS_DESCARGA
+from fundamentales import MULTIPLOS, obtener_info
+
+ARCHIVO_INDICE = Path(os.environ.get("INDICE_FUNDAMENTALES", DIRECTORIO_ALMACEN / "indice_sp500.parquet"))
+URL_CONSTITUYENTES = "https://en.wikipedia.org/wiki/List_of_S%26P_500_companies"
+
+# Si la industria tiene menos pares que esto se compara contra todo el sector
+MINIMO_PARES = 5
+
+COLUMNAS_INDICE = ["Nombre", "Sector", "Industria", *MULTIPLOS]
+
+_indice = None  # (mtime del archivo, DataFrame)
+
+
+# -------- Construcción --------
+
+def constituyentes_sp500(url=URL_CONSTITUYENTES):
+    """Tickers del S&P 500 (formato de Yahoo) con nombre, sector e industria GICS."""
+    respuesta = requests.get(url, headers={"User-Agent": "Mozilla/5.0"}, timeout=10)
+    respuesta.raise_for_status()
+    tabla = BeautifulSoup(respuesta.text, "html.parser").find("table", id="constituents")
+
+    filas = []
+    for fila in tabla.find_all("tr")[1:]:
+        celdas = [c.get_text(strip=True) for c in fila.find_all("td")]
+        if len(celdas) >= 4:
+            # Yahoo usa guion en las clases de acciones (BRK.B -> BRK-B)
+            filas.append({"Ticker": celdas[0].replace(".", "-"), "Nombre": celdas[1],
+                          "Sector": celdas[2], "Industria": celdas[3]})
+    return pd.DataFrame(filas)
+
+
+def fila_indice(ticker, info, respaldo=None):
+    """Fila del índice a partir del ``.info`` de Yahoo; ``respaldo`` completa nombre, sector e industria."""
+    respaldo = respaldo or {}
+    fila = {
+        "Ticker": ticker,
+        "Nombre": info.get("longName") or respaldo.get("Nombre"),
+        "Sector": info.get("sector") or respaldo.get("Sector"),
+        "Industria": info.get("industry") or respaldo.get("Industria"),
+    }
+    for columna, clave in MULTIPLOS.items():
+        valor = info.get(clave)
+        fila[columna] = float(valor) if isinstance(valor, (int, float)) else None
+    return fila
+
+
+def construir_indice(tickers=None, max_hilos=MAX_HILOS_DESCARGA, archivo=ARCHIVO_INDICE):
+    """Descarga el ``.info`` de cada ticker (por defecto, todo el S&P 500) y guarda el índice."""
+    if tickers is None:
+        base = constituyentes_sp500().set_index("Ticker")
+    else:
+        base = pd.DataFrame(index=pd.Index([t.upper().strip() for t in tickers], name="Ticker"))
+    respaldos = base.to_dict(orient="index")
+
+    def fila(ticker):
+        try:
+            info = obtener_info(ticker)
+        except Exception:
+            info = {}
+        return fila_indice(ticker, info, respaldos.get(ticker))
+
+    with ThreadPoolExecutor(max_workers=max_hilos) as ejecutor:
+        filas = list(ejecutor.map(fila, base.index))
+
+    indice = pd.DataFrame(filas).set_index("Ticker")[COLUMNAS_INDICE]
+    archivo.parent.mkdir(parents=True, exist_ok=True)
+    temporal = archivo.with_suffix(f".{os.getpid()}.tmp")
+    indice.to_parquet(temporal)
+    os.replace(temporal, archivo)
+    return indice
+
+
+# -------- Consulta --------
+
+def version_indice(archivo=ARCHIVO_INDICE):
+    """Momento de la última construcción del índice (None si no existe)."""
+    return archivo.stat().st_mtime if archivo.exists() else None
+
+
+def cargar_indice(archivo=ARCHIVO_INDICE):
+    """Índice guardado (índice por ticker), o None si todavía no se construyó."""
+    global _indice
+    version = version_indice(archivo)
+    if version is None:
+        return None
+    if _indice is None or _indice[0] != version:
+        _indice = (version, pd.read_parquet(archivo))
+    return _indice[1]
+
+
+def fila_ticker(indice, ticker):
+    """Fila de ``ticker`` en el índice; si no está, se arma con su ``.info`` (caché de fundamentales)."""
+    if ticker in indice.index:
+        return indice.loc[ticker]
+    return pd.Series(fila_indice(ticker, obtener_info(ticker))).drop("Ticker").rename(ticker)
+
+
+def elegir_pares(indice, fila, criterio="Industria", minimo=MINIMO_PARES):
+    """Tickers del mismo grupo que ``fila`` y el criterio usado; si la industria
+    tiene menos de ``minimo`` pares se pasa al sector."""
+    for columna in ((criterio, "Sector") if criterio == "Industria" else (criterio,)):
+        if pd.isna(fila[columna]):
+            continue
+        pares = indice.index[(indice[columna] == fila[columna]) & (indice.index != fila.name)]
+        if len(pares) >= minimo or columna == "Sector":
+            return list(pares), columna
+    return [], criterio
+
+
+def posicion_en_grupo(fila, pares):
+    """Valor de cada múltiplo, mediana del grupo ``pares`` y percentil del ticker dentro del grupo."""
+    tabla = {}
+    for columna in MULTIPLOS:
+        valores = pares[columna].dropna()
+        valor = fila[columna]
+        if pd.isna(valor) or valores.empty:
+            percentil = None
+        else:
+            percentil = ((valores < valor).sum() + 0.5 * (valores == valor).sum()) / len(valores) * 100
+        tabla[columna] = {
+            "Valor": valor,
+            "Mediana del grupo": valores.median() if not valores.empty else None,
+            "Percentil": percentil,
+            "Pares con dato": len(valores),
+        }
+    return pd.DataFrame(tabla).T
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Construye el índice local de fundamentales del S&P 500.")
+    parser.add_argument("--tickers", nargs="+", help="tickers a incluir (por defecto, el S&P 500 actual)")
+    parser.add_argument("--archivo", type=Path, default=ARCHIVO_INDICE)
+    args = parser.parse_args(argv)
+
+    indice = construir_indice(args.tickers, archivo=args.archivo)
+    completos = indice[list(MULTIPLOS)].notna().all(axis=1).sum()
+    print(f"Índice guardado en {args.archivo}: {len(indice)} tickers ({completos} con los cuatro múltiplos).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
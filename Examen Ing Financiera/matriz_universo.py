@@ -0,0 +1,220 @@
+# -------- Matriz compacta de precios del universo --------
+# Cierres y volumen de todos los tickers del universo en dos archivos binarios
+# (fechas x tickers, float32, por columnas) más un índice JSON pequeño con los
+# símbolos y las fechas. Los archivos se abren con ``np.memmap`` en solo
+# lectura: todas las sesiones y los procesos que la abren comparten las mismas
+# páginas del sistema operativo, y cada uno arma un DataFrame solo con los
+# tickers y el periodo que pide (la tabla completa del universo es una vista,
+# sin copia). Así los análisis de corte transversal cargan al instante y una
+# sesión ya no guarda el OHLCV completo en float64 de cada ticker.
+#
+# La matriz se arma desde el almacén local de historiales y se renueva con:
+#
+#   python matriz_universo.py                        # universo local de tickers
+#   python matriz_universo.py --tickers AAPL MSFT NVDA
+#
+# Cada versión se escribe en archivos nuevos y el índice se reemplaza al final;
+# los archivos de la versión anterior se conservan hasta la publicación
+# siguiente, así que quien ya leyó el índice viejo todavía puede abrirlos.
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from datos import DIRECTORIO_ALMACEN, PERIODOS_DIAS, PERIODOS_FECHA, matriz_cierres, obtener_historiales
+
+DIRECTORIO_MATRIZ = Path(os.environ.get("MATRIZ_UNIVERSO", DIRECTORIO_ALMACEN / "matriz"))
+ARCHIVO_INDICE = "indice.json"
+# Con una matriz más vieja que esto la app vuelve a leer cada historial
+TTL_MATRIZ = int(os.environ.get("TTL_MATRIZ", 24 * 60 * 60))
+
+COLUMNAS = {"Close": "cierres", "Volume": "volumen"}
+
+_lock = threading.Lock()
+_matriz = None        # (versión del índice, MatrizUniverso)
+
+
+class MatrizUniverso:
+    """Vista de una versión de la matriz: ``cierres`` y ``volumen`` son ``np.memmap``."""
+
+    def __init__(self, directorio, indice):
+        self.directorio = Path(directorio)
+        self.version = indice["version"]
+        self.creado = indice["creado"]
+        self.tickers = pd.Index(indice["tickers"])
+        fechas = pd.to_datetime(np.asarray(indice["fechas"], dtype=np.int64), utc=indice["zona"] is not None)
+        self.fechas = fechas.tz_convert(indice["zona"]) if indice["zona"] is not None else fechas
+        self._posiciones = {ticker: i for i, ticker in enumerate(indice["tickers"])}
+
+        forma = tuple(indice["forma"])
+        self.datos = {
+            columna: np.memmap(self._ruta(nombre), dtype=np.float32, mode="r", shape=forma, order="F")
+            for columna, nombre in COLUMNAS.items()
+        }
+
+    def _ruta(self, nombre):
+        return self.directorio / f"{nombre}.{self.version}.f32"
+
+    def __contains__(self, ticker):
+        return ticker.upper().strip() in self._posiciones
+
+    def __len__(self):
+        return len(self.tickers)
+
+    @property
+    def vigente(self):
+        return time.time() - self.creado < TTL_MATRIZ
+
+    def _filas(self, periodo):
+        # Mismo recorte que ``recortar_periodo``, contado desde la última fecha de la matriz
+        if periodo == "max":
+            return slice(None)
+        if periodo in PERIODOS_DIAS:
+            return slice(max(len(self.fechas) - PERIODOS_DIAS[periodo], 0), None)
+        if periodo not in PERIODOS_FECHA:
+            raise ValueError(f"Periodo no soportado: {periodo}")
+        return slice(self.fechas.searchsorted(self.fechas[-1] - PERIODOS_FECHA[periodo]), None)
+
+    def tabla(self, tickers=None, periodo="max", columna="Close"):
+        """DataFrame float32 fechas x ``tickers`` (todos por defecto) del ``periodo``.
+
+        Con todos los tickers es una vista del archivo mapeado; con una lista se
+        copian solo esas columnas y se descartan las fechas sin ningún dato."""
+        filas = self._filas(periodo)
+        if tickers is None:
+            return pd.DataFrame(self.datos[columna][filas], index=self.fechas[filas], columns=self.tickers, copy=False)
+
+        tickers = [t.upper().strip() for t in tickers]
+        columnas = [self._posiciones[t] for t in tickers]
+        tabla = pd.DataFrame(self.datos[columna][filas][:, columnas], index=self.fechas[filas], columns=tickers)
+        return tabla.dropna(how="all")
+
+
+# -------- Construcción --------
+
+def escribir_matriz(historiales, directorio=DIRECTORIO_MATRIZ):
+    """Escribe una versión nueva con los historiales (ticker -> OHLCV) y la publica."""
+    cierres = matriz_cierres(historiales, "max")
+    if cierres.empty:
+        raise ValueError("No hay historiales con precios para armar la matriz.")
+    volumen = matriz_cierres(historiales, "max", "Volume").reindex(index=cierres.index, columns=cierres.columns)
+
+    directorio = Path(directorio)
+    directorio.mkdir(parents=True, exist_ok=True)
+    version = f"{time.time_ns()}-{os.getpid()}"
+    try:
+        anterior = json.loads((directorio / ARCHIVO_INDICE).read_text(encoding="utf-8"))["version"]
+    except (OSError, ValueError, KeyError):
+        anterior = None
+    for nombre, tabla in (("cierres", cierres), ("volumen", volumen)):
+        destino = np.memmap(directorio / f"{nombre}.{version}.f32", dtype=np.float32, mode="w+",
+                            shape=tabla.shape, order="F")
+        destino[:] = tabla.to_numpy(dtype=np.float32)
+        destino.flush()
+        del destino
+
+    zona = cierres.index.tz
+    indice = {
+        "version": version,
+        "creado": time.time(),
+        "tickers": list(cierres.columns),
+        "fechas": cierres.index.as_unit("ns").asi8.tolist(),
+        "zona": str(zona) if zona is not None else None,
+        "forma": list(cierres.shape),
+    }
+    temporal = directorio / f"{ARCHIVO_INDICE}.{os.getpid()}.tmp"
+    temporal.write_text(json.dumps(indice), encoding="utf-8")
+    os.replace(temporal, directorio / ARCHIVO_INDICE)
+
+    # Se conservan la versión nueva y la anterior; las demás se borran (en Windows
+    # un archivo aún mapeado no se puede borrar y queda para la próxima vez)
+    conservar = {version, anterior}
+    for archivo in directorio.glob("*.f32"):
+        if archivo.name.split(".")[1] not in conservar:
+            try:
+                archivo.unlink()
+            except OSError:
+                pass
+    return MatrizUniverso(directorio, indice)
+
+
+def construir_matriz(tickers, directorio=DIRECTORIO_MATRIZ):
+    """Actualiza los historiales de ``tickers`` y escribe la matriz. Devuelve ``(matriz, errores)``."""
+    historiales, errores = obtener_historiales(tickers)
+    return escribir_matriz(historiales, directorio), errores
+
+
+# -------- Lectura --------
+
+def abrir_matriz(directorio=DIRECTORIO_MATRIZ):
+    """Versión publicada de la matriz, abierta una vez por proceso; None si no existe."""
+    global _matriz
+    ruta = Path(directorio) / ARCHIVO_INDICE
+    with _lock:
+        try:
+            version = (str(ruta), ruta.stat().st_mtime_ns)
+        except FileNotFoundError:
+            return None
+        if _matriz is None or _matriz[0] != version:
+            _matriz = (version, MatrizUniverso(directorio, json.loads(ruta.read_text(encoding="utf-8"))))
+        return _matriz[1]
+
+
+def leer_cierres(tickers, matriz=None):
+    """``(cierres, errores)``: cierres float32 fechas x ``tickers`` de todo el historial.
+
+    Los tickers que están en la matriz (si sigue vigente) salen de ella sin
+    leer ni descargar nada; el resto se obtiene como antes, ticker por ticker.
+    Si se mezclan las dos fuentes, la tabla termina en la última fecha que
+    tienen ambas: la matriz puede tener hasta ``TTL_MATRIZ`` de antigüedad y
+    los análisis no deben comparar tickers con colas de fechas distintas."""
+    unicos = list(dict.fromkeys(t.upper().strip() for t in tickers))
+    if matriz is None:
+        matriz = abrir_matriz()
+    en_matriz = [t for t in unicos if t in matriz] if matriz is not None and matriz.vigente else []
+
+    partes = [matriz.tabla(en_matriz)] if en_matriz else []
+    historiales, errores = obtener_historiales([t for t in unicos if t not in en_matriz])
+    if historiales:
+        partes.append(matriz_cierres(historiales, "max").astype(np.float32))
+    partes = [parte for parte in partes if not parte.empty]
+    if not partes:
+        return pd.DataFrame(dtype=np.float32), errores
+
+    cierres = pd.concat(partes, axis=1).sort_index()
+    if len(partes) > 1:
+        cierres = cierres.loc[:min(parte.index[-1] for parte in partes)]
+    return cierres[[t for t in unicos if t in cierres.columns]], errores
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Arma la matriz compacta de precios del universo.")
+    parser.add_argument("--tickers", nargs="+", help="tickers a incluir (por defecto, el universo local)")
+    parser.add_argument("--directorio", type=Path, default=DIRECTORIO_MATRIZ)
+    args = parser.parse_args(argv)
+
+    tickers = args.tickers
+    if tickers is None:
+        from universo import cargar_universo
+        universo = cargar_universo()
+        if universo is None:
+            parser.error("no hay universo local de tickers; use --tickers o python universo.py")
+        tickers = universo.opciones
+
+    matriz, errores = construir_matriz([t.upper() for t in tickers], args.directorio)
+    for ticker, error in errores.items():
+        print(f"Sin datos para {ticker}: {error}", file=sys.stderr)
+    tamano = sum(datos.nbytes for datos in matriz.datos.values()) / 2 ** 20
+    print(f"Matriz guardada en {args.directorio}: {len(matriz.fechas)} fechas x {len(matriz)} tickers ({tamano:.1f} MB).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
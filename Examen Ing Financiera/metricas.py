@@ -0,0 +1,220 @@
+# -------- Métricas de rendimiento --------
+# Registro por proceso (compartido por todas las sesiones) de:
+#   - tiempo de cada sección del script y de cada nodo del grafo,
+#   - solicitudes de datos al proveedor: cantidad, errores, latencia y tamaño,
+#     además de la latencia por ticker para encontrar los más lentos,
+#   - aciertos y fallos de cada caché.
+# Se exporta como JSON y como texto de Prometheus; con PUERTO_METRICAS se sirve
+# además en http://<host>:<puerto>/metrics (y /metrics.json) para recolectarlas.
+# Por defecto solo escucha en 127.0.0.1 (las métricas incluyen tickers y
+# tiempos); HOST_METRICAS=0.0.0.0 lo abre a otras máquinas.
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+
+# Puerto del servidor de métricas (0 = no se levanta)
+PUERTO_METRICAS = int(os.environ.get("PUERTO_METRICAS", 0))
+# Interfaz en la que escucha el servidor de métricas
+HOST_METRICAS = os.environ.get("HOST_METRICAS", "127.0.0.1")
+
+PREFIJO_PROMETHEUS = "analisis_financiero"
+
+
+def tamano_respuesta(valor):
+    """Bytes aproximados de una respuesta: tamaño en memoria de un DataFrame o del JSON de un dict."""
+    if isinstance(valor, pd.DataFrame):
+        return int(valor.memory_usage(deep=True).sum())
+    if isinstance(valor, dict):
+        return len(json.dumps(valor, default=str).encode("utf-8"))
+    return 0
+
+
+class Metricas:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reiniciar()
+
+    def reiniciar(self):
+        with self._lock:
+            self.desde = time.time()
+            self.secciones = {}     # nombre -> {"llamadas", "segundos", "maximo"}
+            self.solicitudes = {}   # (proveedor, endpoint) -> {"llamadas", "errores", "segundos", "bytes"}
+            self.tickers = {}       # ticker -> {"llamadas", "segundos", "maximo"}
+            self.caches = {}        # nombre -> {"aciertos", "fallos"}
+
+    # -------- Registro --------
+
+    def registrar_seccion(self, nombre, segundos):
+        with self._lock:
+            s = self.secciones.setdefault(nombre, {"llamadas": 0, "segundos": 0.0, "maximo": 0.0})
+            s["llamadas"] += 1
+            s["segundos"] += segundos
+            s["maximo"] = max(s["maximo"], segundos)
+
+    def registrar_solicitud(self, proveedor, endpoint, ticker, segundos, bytes_=0, error=False):
+        with self._lock:
+            s = self.solicitudes.setdefault(
+                (proveedor, endpoint), {"llamadas": 0, "errores": 0, "segundos": 0.0, "bytes": 0}
+            )
+            s["llamadas"] += 1
+            s["errores"] += int(error)
+            s["segundos"] += segundos
+            s["bytes"] += bytes_
+
+            t = self.tickers.setdefault(ticker, {"llamadas": 0, "segundos": 0.0, "maximo": 0.0})
+            t["llamadas"] += 1
+            t["segundos"] += segundos
+            t["maximo"] = max(t["maximo"], segundos)
+
+    def registrar_cache(self, nombre, acierto):
+        with self._lock:
+            c = self.caches.setdefault(nombre, {"aciertos": 0, "fallos": 0})
+            c["aciertos" if acierto else "fallos"] += 1
+
+    @contextmanager
+    def seccion(self, nombre):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.registrar_seccion(nombre, time.perf_counter() - inicio)
+
+    def medido(self, nombre=None):
+        """Decorador: registra el tiempo de cada llamada como la sección ``nombre``."""
+        def decorar(funcion):
+            @wraps(funcion)
+            def envoltura(*args, **kwargs):
+                with self.seccion(nombre or funcion.__name__):
+                    return funcion(*args, **kwargs)
+            return envoltura
+        return decorar
+
+    # -------- Exportación --------
+
+    def como_dict(self):
+        with self._lock:
+            return {
+                "desde": self.desde,
+                "secciones": {n: dict(s) for n, s in self.secciones.items()},
+                "solicitudes": [
+                    {"proveedor": p, "endpoint": e, **s} for (p, e), s in self.solicitudes.items()
+                ],
+                "tickers": {t: dict(s) for t, s in self.tickers.items()},
+                "caches": {
+                    n: {**c, "tasa_aciertos": c["aciertos"] / max(c["aciertos"] + c["fallos"], 1)}
+                    for n, c in self.caches.items()
+                },
+            }
+
+    def como_json(self):
+        return json.dumps(self.como_dict(), indent=2, ensure_ascii=False)
+
+    def como_prometheus(self):
+        datos = self.como_dict()
+        lineas = []
+
+        def metrica(nombre, tipo, ayuda, muestras):
+            nombre = f"{PREFIJO_PROMETHEUS}_{nombre}"
+            lineas.append(f"# HELP {nombre} {ayuda}")
+            lineas.append(f"# TYPE {nombre} {tipo}")
+            for etiquetas, valor in muestras:
+                texto = ",".join(f'{k}="{_escapar(v)}"' for k, v in etiquetas.items())
+                lineas.append(f"{nombre}{{{texto}}} {valor}" if texto else f"{nombre} {valor}")
+
+        secciones = datos["secciones"].items()
+        metrica("seccion_llamadas_total", "counter", "Ejecuciones de cada sección.",
+                [({"seccion": n}, s["llamadas"]) for n, s in secciones])
+        metrica("seccion_segundos_total", "counter", "Tiempo acumulado de cada sección.",
+                [({"seccion": n}, s["segundos"]) for n, s in secciones])
+        metrica("seccion_segundos_max", "gauge", "Ejecución más lenta de cada sección.",
+                [({"seccion": n}, s["maximo"]) for n, s in secciones])
+
+        solicitudes = [({"proveedor": s["proveedor"], "endpoint": s["endpoint"]}, s) for s in datos["solicitudes"]]
+        metrica("solicitudes_total", "counter", "Solicitudes de datos al proveedor.",
+                [(e, s["llamadas"]) for e, s in solicitudes])
+        metrica("solicitudes_errores_total", "counter", "Solicitudes que terminaron en error.",
+                [(e, s["errores"]) for e, s in solicitudes])
+        metrica("solicitudes_segundos_total", "counter", "Latencia acumulada de las solicitudes.",
+                [(e, s["segundos"]) for e, s in solicitudes])
+        metrica("solicitudes_bytes_total", "counter", "Tamaño acumulado de las respuestas.",
+                [(e, s["bytes"]) for e, s in solicitudes])
+        metrica("ticker_segundos_max", "gauge", "Solicitud más lenta de cada ticker.",
+                [({"ticker": t}, s["maximo"]) for t, s in datos["tickers"].items()])
+
+        caches = datos["caches"].items()
+        metrica("cache_aciertos_total", "counter", "Lecturas servidas desde la caché.",
+                [({"cache": n}, c["aciertos"]) for n, c in caches])
+        metrica("cache_fallos_total", "counter", "Lecturas que no estaban en la caché.",
+                [({"cache": n}, c["fallos"]) for n, c in caches])
+        return "\n".join(lineas) + "\n"
+
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+class Cronometro:
+    """Tiempos de las secciones de una ejecución del script: cada ``marca``
+    asigna a la sección nombrada el tiempo transcurrido desde la marca anterior."""
+
+    def __init__(self, metricas):
+        self.metricas = metricas
+        self.tiempos = []
+        self._ultimo = time.perf_counter()
+
+    def marca(self, nombre):
+        ahora = time.perf_counter()
+        segundos = ahora - self._ultimo
+        self._ultimo = ahora
+        self.tiempos.append((nombre, segundos))
+        self.metricas.registrar_seccion(nombre, segundos)
+
+
+# Registro compartido por todo el proceso
+metricas = Metricas()
+
+
+# -------- Servidor para Prometheus --------
+
+class _Manejador(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.path == "/metrics":
+            cuerpo, tipo = metricas.como_prometheus(), "text/plain; version=0.0.4; charset=utf-8"
+        elif self.path == "/metrics.json":
+            cuerpo, tipo = metricas.como_json(), "application/json; charset=utf-8"
+        else:
+            self.send_error(404)
+            return
+        cuerpo = cuerpo.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", tipo)
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, *args):
+        pass
+
+
+_servidor = None
+_lock_servidor = threading.Lock()
+
+
+def iniciar_servidor(puerto=PUERTO_METRICAS, host=HOST_METRICAS):
+    """Levanta (una sola vez por proceso) el servidor HTTP de métricas."""
+    global _servidor
+    with _lock_servidor:
+        if _servidor is not None or not puerto:
+            return _servidor
+        _servidor = ThreadingHTTPServer((host, puerto), _Manejador)
+        threading.Thread(target=_servidor.serve_forever, name="servidor-metricas", daemon=True).start()
+        return _servidor
@@ -0,0 +1,117 @@
+# -------- Planificador de solicitudes a Yahoo Finance --------
+# Todas las llamadas de red pasan por aquí: un cubo de tokens limita la tasa
+# global, un semáforo por endpoint limita las llamadas simultáneas y los
+# errores 429 se reintentan con espera exponencial con jitter hasta agotar un
+# presupuesto de reintentos. Con muchos usuarios a la vez las solicitudes
+# quedan en cola en lugar de bloquear el script o provocar un bloqueo de IP.
+
+import os
+import random
+import threading
+import time
+
+import requests
+import yfinance as yf
+
+# Solicitudes por segundo sostenidas y ráfaga máxima
+TASA_SOLICITUDES = float(os.environ.get("TASA_SOLICITUDES", 2.0))
+RAFAGA_SOLICITUDES = int(os.environ.get("RAFAGA_SOLICITUDES", 5))
+
+MAX_REINTENTOS = int(os.environ.get("MAX_REINTENTOS", 4))
+ESPERA_BASE = 1.0   # segundos antes del primer reintento
+ESPERA_MAXIMA = 30.0
+
+# Llamadas simultáneas permitidas por endpoint
+LIMITES_ENDPOINT = {
+    "historial": 4,
+    "info": 2,
+    "cotizacion": 2,
+}
+LIMITE_POR_DEFECTO = 2
+
+
+class SolicitudesAgotadasError(RuntimeError):
+    """Yahoo siguió respondiendo 429 después de todos los reintentos."""
+
+
+def es_limite_de_tasa(error):
+    if isinstance(error, yf.exceptions.YFRateLimitError):
+        return True
+    if isinstance(error, requests.exceptions.HTTPError) and error.response is not None:
+        return error.response.status_code == 429
+    return False
+
+
+class CuboTokens:
+    """Cubo de tokens: ``tasa`` tokens por segundo con capacidad ``capacidad``."""
+
+    def __init__(self, tasa, capacidad):
+        self.tasa = tasa
+        self.capacidad = capacidad
+        self._tokens = float(capacidad)
+        self._ultimo = time.monotonic()
+        self._lock = threading.Lock()
+
+    def tomar(self):
+        """Bloquea hasta que haya un token disponible y lo consume."""
+        while True:
+            with self._lock:
+                ahora = time.monotonic()
+                self._tokens = min(self.capacidad, self._tokens + (ahora - self._ultimo) * self.tasa)
+                self._ultimo = ahora
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                espera = (1 - self._tokens) / self.tasa
+            time.sleep(espera)
+
+
+class Planificador:
+
+    def __init__(self, tasa=TASA_SOLICITUDES, rafaga=RAFAGA_SOLICITUDES, max_reintentos=MAX_REINTENTOS,
+                 espera_base=ESPERA_BASE, espera_maxima=ESPERA_MAXIMA, limites=None):
+        self.cubo = CuboTokens(tasa, rafaga)
+        self.max_reintentos = max_reintentos
+        self.espera_base = espera_base
+        self.espera_maxima = espera_maxima
+        self.limites = dict(LIMITES_ENDPOINT if limites is None else limites)
+        self._semaforos = {}
+        self._lock = threading.Lock()
+
+    def _semaforo(self, endpoint):
+        with self._lock:
+            if endpoint not in self._semaforos:
+                limite = self.limites.get(endpoint, LIMITE_POR_DEFECTO)
+                self._semaforos[endpoint] = threading.BoundedSemaphore(limite)
+            return self._semaforos[endpoint]
+
+    def espera_reintento(self, intento):
+        """Espera exponencial con "full jitter" para el reintento número ``intento``."""
+        return random.uniform(0, min(self.espera_maxima, self.espera_base * 2 ** intento))
+
+    def ejecutar(self, endpoint, funcion, *args, **kwargs):
+        """Ejecuta ``funcion(*args, **kwargs)`` respetando tasa, concurrencia y reintentos."""
+        semaforo = self._semaforo(endpoint)
+        for intento in range(self.max_reintentos + 1):
+            with semaforo:
+                self.cubo.tomar()
+                try:
+                    return funcion(*args, **kwargs)
+                except Exception as e:
+                    if not es_limite_de_tasa(e):
+                        raise
+                    ultimo_error = e
+            if intento < self.max_reintentos:
+                time.sleep(self.espera_reintento(intento))
+
+        raise SolicitudesAgotadasError(
+            f"Demasiadas solicitudes a Yahoo Finance ({endpoint}) tras {self.max_reintentos} reintentos."
+        ) from ultimo_error
+
+
+# Instancia compartida por todo el proceso (todas las sesiones de Streamlit)
+planificador = Planificador()
+
+
+def ejecutar(endpoint, funcion, *args, **kwargs):
+    return planificador.ejecutar(endpoint, funcion, *args, **kwargs)
@@ -0,0 +1,206 @@
+# -------- Proveedores de datos de mercado --------
+# Toda la información externa (historial diario, .info y cotización) se pide a
+# través del proveedor activo, elegido con la variable PROVEEDOR_DATOS:
+#
+#   yahoo         Yahoo Finance vía yfinance y el planificador de solicitudes (por defecto)
+#   reproduccion  sirve desde DIRECTORIO_GRABACION lo grabado antes, sin red
+#   grabar        consulta Yahoo y guarda cada respuesta en DIRECTORIO_GRABACION
+#
+# Así la app puede correr sin Yahoo (pruebas de carga, demos) y medir el costo
+# de cómputo aparte de la latencia de red. Los historiales siguen pasando por
+# el almacén de ``datos``; para reproducir desde cero conviene apuntar
+# ALMACEN_PRECIOS a una carpeta vacía.
+#
+# Formato de la grabación:
+#   historial/<TICKER>.parquet   barras diarias sin ajustar, con Adj Close, Dividends y Stock Splits
+#   info/<TICKER>.json           el dict de yf.Ticker().info
+#   cotizacion/<TICKER>.json     la última cotización (precio, apertura, maximo, minimo, cierre_anterior)
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+import pandas as pd
+import yfinance as yf
+
+from metricas import metricas, tamano_respuesta
+from planificador import ejecutar
+
+PROVEEDOR_DATOS = os.environ.get("PROVEEDOR_DATOS", "yahoo")
+DIRECTORIO_GRABACION = Path(os.environ.get("DIRECTORIO_GRABACION", Path(__file__).parent / "grabacion"))
+
+
+def _escribir_atomico(ruta, escribir):
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    temporal = ruta.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+    escribir(temporal)
+    os.replace(temporal, ruta)
+
+
+class ProveedorYahoo:
+    nombre = "yahoo"
+
+    def historial(self, ticker, inicio=None):
+        """Historial diario sin ajustar desde ``inicio`` (o completo), con índice sin zona horaria."""
+        rango = {"period": "max"} if inicio is None else {"start": inicio}
+        data = ejecutar("historial", yf.Ticker(ticker).history, interval="1d", auto_adjust=False, actions=True, **rango)
+        if not data.empty:
+            data.index = data.index.tz_localize(None)
+        return data
+
+    def info(self, ticker):
+        return ejecutar("info", lambda: yf.Ticker(ticker).info) or {}
+
+    def cotizacion(self, ticker):
+        def consultar():
+            info = yf.Ticker(ticker).fast_info
+            return {
+                "precio": float(info.last_price),
+                "apertura": float(info.open),
+                "maximo": float(info.day_high),
+                "minimo": float(info.day_low),
+                "cierre_anterior": float(info.previous_close),
+                "momento": time.time(),
+            }
+        return ejecutar("cotizacion", consultar)
+
+
+class ProveedorReproduccion:
+    """Sirve las respuestas grabadas en ``directorio``. Un ticker sin grabación
+    se comporta como uno inexistente en Yahoo: historial vacío e info vacía."""
+
+    nombre = "reproduccion"
+
+    def __init__(self, directorio=DIRECTORIO_GRABACION):
+        self.directorio = Path(directorio)
+
+    def _ruta(self, tipo, ticker, extension):
+        return self.directorio / tipo / f"{ticker.upper().strip()}.{extension}"
+
+    def historial(self, ticker, inicio=None):
+        ruta = self._ruta("historial", ticker, "parquet")
+        if not ruta.exists():
+            return pd.DataFrame()
+        data = pd.read_parquet(ruta)
+        if inicio is not None:
+            data = data.loc[data.index >= pd.Timestamp(inicio)]
+        return data
+
+    def info(self, ticker):
+        ruta = self._ruta("info", ticker, "json")
+        if not ruta.exists():
+            return {}
+        with open(ruta, encoding="utf-8") as f:
+            return json.load(f)
+
+    def cotizacion(self, ticker):
+        ruta = self._ruta("cotizacion", ticker, "json")
+        if ruta.exists():
+            with open(ruta, encoding="utf-8") as f:
+                cotizacion = json.load(f)
+        else:
+            # Sin cotización grabada se usa la última barra del historial
+            data = self.historial(ticker)
+            if len(data) < 2:
+                raise LookupError(f"No hay cotización grabada para {ticker}")
+            ultima, anterior = data.iloc[-1], data.iloc[-2]
+            cotizacion = {
+                "precio": float(ultima["Close"]),
+                "apertura": float(ultima["Open"]),
+                "maximo": float(ultima["High"]),
+                "minimo": float(ultima["Low"]),
+                "cierre_anterior": float(anterior["Close"]),
+            }
+        cotizacion["momento"] = time.time()
+        return cotizacion
+
+
+class ProveedorGrabador:
+    """Consulta a ``base`` y guarda cada respuesta en ``directorio`` con el
+    formato que lee ``ProveedorReproduccion``."""
+
+    nombre = "grabar"
+
+    def __init__(self, base=None, directorio=DIRECTORIO_GRABACION):
+        self.base = ProveedorYahoo() if base is None else base
+        self.grabacion = ProveedorReproduccion(directorio)
+
+    def historial(self, ticker, inicio=None):
+        data = self.base.historial(ticker, inicio)
+        if data.empty:
+            return data
+        grabado = self.grabacion.historial(ticker)
+        if inicio is not None and not grabado.empty:
+            # Pedido incremental: se completa la grabación con las barras nuevas
+            completo = pd.concat([grabado.loc[grabado.index < data.index[0]], data])
+        else:
+            completo = data
+        _escribir_atomico(self.grabacion._ruta("historial", ticker, "parquet"), completo.to_parquet)
+        return data
+
+    def info(self, ticker):
+        info = self.base.info(ticker)
+        if info:
+            self._grabar_json("info", ticker, info)
+        return info
+
+    def cotizacion(self, ticker):
+        cotizacion = self.base.cotizacion(ticker)
+        self._grabar_json("cotizacion", ticker, cotizacion)
+        return cotizacion
+
+    def _grabar_json(self, tipo, ticker, valor):
+        def escribir(temporal):
+            with open(temporal, "w", encoding="utf-8") as f:
+                json.dump(valor, f, default=str)
+        _escribir_atomico(self.grabacion._ruta(tipo, ticker, "json"), escribir)
+
+
+PROVEEDORES = {
+    "yahoo": ProveedorYahoo,
+    "reproduccion": ProveedorReproduccion,
+    "grabar": ProveedorGrabador,
+}
+
+
+def crear_proveedor(nombre, **kwargs):
+    if nombre not in PROVEEDORES:
+        raise ValueError(f"Proveedor de datos no soportado: {nombre} (opciones: {', '.join(PROVEEDORES)})")
+    return PROVEEDORES[nombre](**kwargs)
+
+
+# Proveedor compartido por todo el proceso
+proveedor = crear_proveedor(PROVEEDOR_DATOS)
+
+
+def usar_proveedor(nuevo):
+    """Reemplaza el proveedor activo (por ejemplo, una reproducción en una prueba de carga)."""
+    global proveedor
+    proveedor = nuevo
+
+
+def _medir(endpoint, ticker, funcion, *args):
+    """Llama al proveedor y registra la solicitud (latencia, tamaño o error) en las métricas."""
+    nombre = proveedor.nombre
+    inicio = time.perf_counter()
+    try:
+        resultado = funcion(ticker, *args)
+    except Exception:
+        metricas.registrar_solicitud(nombre, endpoint, ticker, time.perf_counter() - inicio, error=True)
+        raise
+    metricas.registrar_solicitud(nombre, endpoint, ticker, time.perf_counter() - inicio, tamano_respuesta(resultado))
+    return resultado
+
+
+def descargar_historial(ticker, inicio=None):
+    return _medir("historial", ticker, proveedor.historial, inicio)
+
+
+def descargar_info(ticker):
+    return _medir("info", ticker, proveedor.info)
+
+
+def descargar_cotizacion(ticker):
+    return _medir("cotizacion", ticker, proveedor.cotizacion)
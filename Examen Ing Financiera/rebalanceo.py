@@ -0,0 +1,118 @@
+# -------- Rebalanceo walk-forward de los portafolios óptimos --------
+# En cada fecha de rebalanceo (primer día hábil de cada mes o trimestre) se
+# estiman rendimientos medios y covarianza con los ``ventana`` rendimientos
+# diarios anteriores, se eligen los portafolios de máximo Sharpe, mínima
+# volatilidad y máximo rendimiento (arrancando de los del rebalanceo anterior,
+# sin armar la frontera completa), y se mantienen
+# hasta el rebalanceo siguiente mientras sus pesos derivan con los precios.
+# Cada periodo usa solo datos conocidos al cierre de su fecha de inicio, así
+# que el resultado es fuera de muestra. Las sumas de la ventana se actualizan
+# con las filas que entran y salen (``CovarianzaMovil``) y cada rebalanceo paga
+# ``costo`` por unidad de valor operada.
+
+import numpy as np
+import pandas as pd
+
+from covarianza import MINIMO_OBSERVACIONES, CovarianzaMovil
+from frontera import portafolios_optimos
+from indicadores import DIAS_HABILES
+
+FRECUENCIAS = {"mensual": "M", "trimestral": "Q"}
+VENTANA_ESTIMACION = 3 * DIAS_HABILES
+COSTO_REBALANCEO = 0.001  # 10 pb por unidad operada
+
+CARTERAS = ["Máximo Sharpe", "Mínima Volatilidad", "Máximo Rendimiento", "Pesos iguales"]
+
+
+def fechas_rebalanceo(fechas, frecuencia="mensual"):
+    """Posiciones del primer día hábil de cada mes o trimestre en ``fechas``."""
+    periodos = pd.DatetimeIndex(fechas).to_period(FRECUENCIAS[frecuencia])
+    return np.flatnonzero(np.r_[True, periodos[1:] != periodos[:-1]])
+
+
+def _pesos_objetivo(ventana, disponibles, metodo, rf, cota_max, anteriores=None):
+    """Pesos (carteras x activos disponibles) elegidos con la ventana actual;
+    ``anteriores`` son los del rebalanceo previo, para el arranque en caliente."""
+    n = len(disponibles)
+    if n == 1:
+        return np.ones((len(CARTERAS), 1))
+    media, cov = ventana.estimar(metodo, disponibles)
+    inicial = None if anteriores is None else (anteriores[1], anteriores[0])
+    minima, sharpe, maxima = portafolios_optimos(media * DIAS_HABILES, cov * DIAS_HABILES, rf=rf,
+                                                 cota_max=max(cota_max, 1 / n), inicial=inicial)
+    return np.vstack([sharpe, minima, maxima, np.full(n, 1 / n)])
+
+
+def walk_forward(precios, ventana=VENTANA_ESTIMACION, frecuencia="mensual", metodo="ledoit_wolf", rf=0.03,
+                 cota_max=1.0, costo=COSTO_REBALANCEO, minimo_observaciones=MINIMO_OBSERVACIONES):
+    """Simula las carteras rebalanceadas sobre ``precios`` (fechas x tickers).
+
+    Devuelve ``(valores, pesos, rotacion)``: el valor diario de cada cartera
+    (1 al cierre del primer rebalanceo, antes de costos), los pesos elegidos en cada rebalanceo
+    (dict cartera -> DataFrame fechas x tickers) y lo operado en cada uno.
+    """
+    rendimientos = precios.pct_change(fill_method=None).to_numpy(dtype=float)
+    cotiza = precios.notna().to_numpy()
+    n_filas, n_activos = rendimientos.shape
+
+    inicios = [d for d in fechas_rebalanceo(precios.index, frecuencia) if d >= ventana]
+    if not inicios:
+        raise ValueError(f"Hace falta más de {ventana} días de historial para el primer rebalanceo.")
+
+    estadisticas = CovarianzaMovil(n_activos)
+    desde = hasta = 0  # la ventana contiene los rendimientos de las filas (desde, hasta]
+    actuales = np.zeros((len(CARTERAS), n_activos))
+    valor = np.ones(len(CARTERAS))
+    valores, pesos, rotacion = [], [], []
+
+    for k, d in enumerate(inicios):
+        # Mover la ventana a (d - ventana, d]: quitar lo que sale y agregar lo que entra
+        nuevo_desde = d - ventana
+        estadisticas.quitar(rendimientos[desde + 1:min(nuevo_desde, hasta) + 1])
+        estadisticas.agregar(rendimientos[max(hasta, nuevo_desde) + 1:d + 1])
+        desde, hasta = nuevo_desde, d
+
+        disponibles = np.flatnonzero((estadisticas.observaciones >= minimo_observaciones) & cotiza[d])
+        anteriores = pesos[-1][:, disponibles] if pesos else None
+        objetivo = np.zeros_like(actuales)
+        if len(disponibles):
+            objetivo[:, disponibles] = _pesos_objetivo(estadisticas, disponibles, metodo, rf, cota_max, anteriores)
+
+        operado = np.abs(objetivo - actuales).sum(axis=1)
+        valor = valor * (1 - costo * operado)
+        rotacion.append(operado)
+        pesos.append(objetivo)
+
+        # Comprar y mantener hasta el próximo rebalanceo (o el final del historial)
+        fin = inicios[k + 1] if k + 1 < len(inicios) else n_filas - 1
+        crecimiento = np.cumprod(1 + np.nan_to_num(rendimientos[d + 1:fin + 1]), axis=0)
+        tramo = valor * (crecimiento @ objetivo.T + (1 - objetivo.sum(axis=1)))
+        valores.append(np.vstack([np.ones(len(CARTERAS)), tramo]) if k == 0 else tramo)
+        if len(tramo):
+            ultimo = objetivo * crecimiento[-1]
+            valor = tramo[-1]
+            actuales = ultimo / np.maximum(ultimo.sum(axis=1, keepdims=True), np.finfo(float).tiny)
+        else:
+            actuales = objetivo
+
+    fechas_inicio = precios.index[inicios]
+    valores = pd.DataFrame(np.vstack(valores), index=precios.index[inicios[0]:], columns=CARTERAS)
+    pesos = np.array(pesos)
+    pesos = {c: pd.DataFrame(pesos[:, i], index=fechas_inicio, columns=precios.columns) for i, c in enumerate(CARTERAS)}
+    return valores, pesos, pd.DataFrame(rotacion, index=fechas_inicio, columns=CARTERAS)
+
+
+def resumen_walk_forward(valores, rotacion, rf=0.03, costo=COSTO_REBALANCEO):
+    """Rendimiento anual, volatilidad, Sharpe, máximo drawdown y rotación de cada cartera."""
+    diarios = valores.pct_change().iloc[1:]
+    años = len(diarios) / DIAS_HABILES
+    rendimiento = (valores.iloc[-1] / valores.iloc[0]) ** (1 / años) - 1
+    volatilidad = diarios.std() * np.sqrt(DIAS_HABILES)
+    return pd.DataFrame({
+        "Rendimiento anual": rendimiento,
+        "Volatilidad anual": volatilidad,
+        "Sharpe Ratio": (rendimiento - rf) / volatilidad,
+        "Máximo drawdown": (valores / valores.cummax() - 1).min(),
+        "Rotación anual": rotacion.sum() / años,
+        "Costo anual": rotacion.sum() * costo / años,
+    })
@@ -0,0 +1,407 @@
+# -------- Reportes por lote --------
+# Arma el análisis de la página (información de la empresa, precio, CAGR,
+# volatilidad, RSI/MACD y múltiplos) para una lista de tickers y lo exporta a
+# HTML, PDF y XLSX. Los tickers se analizan en un grupo de hilos de fondo
+# compartido por todas las sesiones del proceso, así que la sesión que pide el
+# reporte sigue respondiendo: solo consulta el avance y descarga los archivos
+# cuando están listos. También desde la consola:
+#
+#   python reportes.py AAPL MSFT NVDA --formatos html pdf --salida reportes/
+
+import argparse
+import html
+import importlib.util
+import io
+import os
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+import plotly.graph_objects as go
+from matplotlib.backends.backend_pdf import PdfPages
+from matplotlib.figure import Figure
+
+from datos import historial_periodo
+from fundamentales import MULTIPLOS, obtener_info, obtener_multiplos
+from graficas import linea
+from indicadores import cagr, macd, rsi, volatilidad_anual
+from indice_fundamentales import cargar_indice, elegir_pares, fila_ticker, posicion_en_grupo
+from metricas import metricas
+
+# Hilos del grupo de fondo: el trabajo es sobre todo esperar al proveedor de datos
+MAX_HILOS_REPORTE = int(os.environ.get("MAX_HILOS_REPORTE", 4))
+# Un reporte se descarta si nadie consulta su avance en este tiempo
+TTL_REPORTE = 60 * 60
+
+FORMATOS = {
+    "html": "text/html",
+    "pdf": "application/pdf",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+# openpyxl está en requirements.txt, pero sin él los demás formatos siguen funcionando
+XLSX_DISPONIBLE = importlib.util.find_spec("openpyxl") is not None
+
+_lock = threading.Lock()
+_reportes = {}        # id -> Reporte
+_ejecutor = None
+
+
+# -------- Análisis de un ticker --------
+
+@metricas.medido("reporte por ticker")
+def analizar_ticker(ticker, periodo="5y", criterio_pares="Industria"):
+    """Los mismos cálculos que la página para ``ticker``: un dict con ``resumen``
+    (Series de valores sueltos), ``descripcion``, ``series`` (cierre, RSI y MACD
+    del ``periodo``) y ``multiplos`` (con su posición entre pares si hay índice)."""
+    ticker = ticker.upper().strip()
+    info = obtener_info(ticker)
+    actual = historial_periodo(ticker, "2d")
+    if actual.empty:
+        raise ValueError(f"No hay historial de precios para {ticker}.")
+
+    # CAGR y volatilidad sobre cierres sin ajustar, como la sección de rendimientos
+    cierres_5y = historial_periodo(ticker, "5y", ajustado=False)["Close"]
+    cierres_1y = historial_periodo(ticker, "1y", ajustado=False)["Close"]
+
+    series = historial_periodo(ticker, periodo)[["Close"]]
+    series["RSI"] = rsi(series["Close"], ventana=14)
+    series["MACD"], series["Signal"] = macd(series["Close"], rapida=12, lenta=26, senal=9)
+
+    precio = float(actual["Close"].iloc[-1])
+    anterior = float(actual["Close"].iloc[-2]) if len(actual) > 1 else precio
+    resumen = {
+        "Nombre": info.get("longName", "Nombre no disponible"),
+        "Sector": info.get("sector", "Sector no disponible"),
+        "Fecha": actual.index[-1].strftime("%Y-%m-%d"),
+        "Precio": precio,
+        "Cambio diario (%)": (precio / anterior - 1) * 100,
+        "Apertura": float(actual["Open"].iloc[-1]),
+        "Máximo": float(actual["High"].iloc[-1]),
+        "Mínimo": float(actual["Low"].iloc[-1]),
+    }
+    for años in (1, 3, 5):
+        resumen[f"CAGR {años} año(s) (%)"] = cagr(cierres_5y, años)
+    resumen["Volatilidad anual (%)"] = volatilidad_anual(cierres_1y) * 100
+    ultimos = series[["RSI", "MACD", "Signal"]].ffill().iloc[-1]
+    resumen.update({"RSI (14)": ultimos["RSI"], "MACD": ultimos["MACD"], "Señal MACD": ultimos["Signal"]})
+
+    # Con el índice local los múltiplos se comparan con los pares, como en la página
+    indice = cargar_indice()
+    if indice is not None:
+        fila = fila_ticker(indice, ticker)
+        pares, criterio = elegir_pares(indice, fila, criterio_pares)
+        multiplos = posicion_en_grupo(fila, indice.loc[pares]).astype(float)
+        grupo = f"{criterio}: {fila[criterio]} ({len(pares)} pares)"
+    else:
+        multiplos = pd.DataFrame({"Valor": pd.Series(obtener_multiplos(ticker)).drop("Ticker")}).astype(float)
+        grupo = None
+    for columna in MULTIPLOS:
+        resumen[columna] = multiplos.loc[columna, "Valor"]
+
+    return {
+        "ticker": ticker,
+        "resumen": pd.Series(resumen, name=ticker),
+        "descripcion": info.get("longBusinessSummary", "Descripción no disponible"),
+        "series": series,
+        "multiplos": multiplos,
+        "grupo": grupo,
+    }
+
+
+def tabla_resumen(analisis):
+    """Una fila por ticker con los valores sueltos del análisis."""
+    tabla = pd.DataFrame([a["resumen"] for a in analisis])
+    tabla.index.name = "Ticker"
+    return tabla
+
+
+# -------- Formatos de salida --------
+
+def _numero(valor, formato=",.2f"):
+    return "N/D" if pd.isna(valor) else format(valor, formato)
+
+
+def _formatear(tabla):
+    return tabla.map(lambda v: _numero(v) if isinstance(v, float) or pd.isna(v) else v)
+
+
+def _graficas_html(analisis):
+    series = analisis["series"]
+    graficas = []
+    for columnas, titulo in ((("Close",), "Precio de cierre"), (("RSI",), "RSI (14 días)"), (("MACD", "Signal"), "MACD")):
+        fig = go.Figure()
+        for columna in columnas:
+            fig.add_trace(linea(series[columna].dropna(), mode="lines", name=columna))
+        fig.update_layout(title=f"{titulo}: {analisis['ticker']}", template="plotly_white", height=350)
+        graficas.append(fig)
+    return graficas
+
+
+def reporte_html(analisis, errores=None):
+    """Documento HTML con la tabla resumen y una sección (gráficas interactivas) por ticker."""
+    partes = [
+        "<!DOCTYPE html><html><head><meta charset='utf-8'><title>Reporte de análisis financiero</title>",
+        "<style>body{font-family:Arial,sans-serif;margin:30px;color:#333}table{border-collapse:collapse;font-size:13px}"
+        "th,td{border:1px solid #ddd;padding:4px 8px;text-align:right}th{background:#F4F6F7}</style></head><body>",
+        f"<h1>Reporte de análisis financiero</h1><p>Generado el {datetime.now():%Y-%m-%d %H:%M}.</p>",
+        "<h2>Resumen</h2>", _formatear(tabla_resumen(analisis)).to_html(),
+    ]
+    if errores:
+        partes.append("<h3>Tickers sin reporte</h3><ul>" + "".join(
+            f"<li><b>{html.escape(t)}</b>: {html.escape(e)}</li>" for t, e in errores.items()) + "</ul>")
+
+    incluir_plotly = "cdn"
+    for a in analisis:
+        r = a["resumen"]
+        partes.append(f"<hr><h2>{html.escape(a['ticker'])} · {html.escape(str(r['Nombre']))}</h2>"
+                      f"<p><b>Sector:</b> {html.escape(str(r['Sector']))}</p><p>{html.escape(a['descripcion'])}</p>")
+        partes.append(_formatear(r.drop(["Nombre", "Sector"]).to_frame("Valor")).to_html())
+        partes.append(f"<h3>Múltiplos{' · ' + html.escape(a['grupo']) if a['grupo'] else ''}</h3>")
+        partes.append(_formatear(a["multiplos"]).to_html())
+        for fig in _graficas_html(a):
+            partes.append(fig.to_html(full_html=False, include_plotlyjs=incluir_plotly))
+            incluir_plotly = False
+    partes.append("</body></html>")
+    return "".join(partes).encode("utf-8")
+
+
+def _pagina_tabla(pdf, titulo, tabla):
+    fig = Figure(figsize=(11.69, 8.27))
+    ax = fig.add_subplot()
+    ax.axis("off")
+    ax.set_title(titulo, fontsize=14, loc="left")
+    tabla = tabla.reset_index()
+    celdas = ax.table(cellText=tabla.to_numpy(), colLabels=list(tabla.columns), loc="upper center", cellLoc="right")
+    celdas.auto_set_font_size(False)
+    celdas.set_fontsize(7)
+    celdas.auto_set_column_width(range(len(tabla.columns)))
+    pdf.savefig(fig)
+
+
+# Encabezados cortos para que la tabla resumen quepa en una página apaisada
+COLUMNAS_PDF = {
+    "Cambio diario (%)": "Cambio %", "CAGR 1 año(s) (%)": "CAGR 1a %", "CAGR 3 año(s) (%)": "CAGR 3a %",
+    "CAGR 5 año(s) (%)": "CAGR 5a %", "Volatilidad anual (%)": "Volat. %", "RSI (14)": "RSI", "Señal MACD": "Señal",
+}
+
+
+def reporte_pdf(analisis, errores=None, filas_por_pagina=25):
+    """PDF con la tabla resumen y una página por ticker (datos, múltiplos y gráficas)."""
+    resumen = tabla_resumen(analisis).drop(columns=["Nombre", "Fecha", "Apertura", "Máximo", "Mínimo"])
+    resumen = _formatear(resumen.rename(columns=COLUMNAS_PDF))
+    resumen["Sector"] = resumen["Sector"].str.slice(0, 22)
+    salida = io.BytesIO()
+    with PdfPages(salida) as pdf:
+        for inicio in range(0, max(len(resumen), 1), filas_por_pagina):
+            _pagina_tabla(pdf, "Resumen", resumen.iloc[inicio:inicio + filas_por_pagina])
+
+        for a in analisis:
+            r, series = a["resumen"], a["series"]
+            fig = Figure(figsize=(8.27, 11.69))
+            fig.text(0.06, 0.97, f"{a['ticker']} · {r['Nombre']}", fontsize=15, weight="bold", va="top")
+            datos = [f"Sector: {r['Sector']}   Fecha: {r['Fecha']}"]
+            datos.append(f"Precio: {r['Precio']:.2f} USD ({_numero(r['Cambio diario (%)'], '+.2f')}%)   "
+                         f"Volatilidad anual: {_numero(r['Volatilidad anual (%)'])}%")
+            datos.append("   ".join(f"CAGR {años}a: {_numero(r[f'CAGR {años} año(s) (%)'])}%" for años in (1, 3, 5)))
+            datos.append(f"RSI (14): {_numero(r['RSI (14)'])}   MACD: {_numero(r['MACD'], '.3f')}   "
+                         f"Señal: {_numero(r['Señal MACD'], '.3f')}")
+            datos.append("   ".join(f"{m}: {_numero(a['multiplos'].loc[m, 'Valor'])}" for m in MULTIPLOS)
+                         + (f"   ({a['grupo']})" if a["grupo"] else ""))
+            fig.text(0.06, 0.935, "\n".join(datos), fontsize=9, va="top", linespacing=1.6)
+
+            ejes = fig.subplots(3, 1, sharex=True, gridspec_kw={"height_ratios": [2, 1, 1], "top": 0.8, "bottom": 0.06})
+            ejes[0].plot(series.index, series["Close"], color="green", linewidth=1)
+            ejes[0].set_title("Precio de cierre", fontsize=10)
+            ejes[1].plot(series.index, series["RSI"], color="orange", linewidth=1)
+            ejes[1].axhline(70, color="red", linewidth=0.8, linestyle="--")
+            ejes[1].axhline(30, color="green", linewidth=0.8, linestyle="--")
+            ejes[1].set_title("RSI (14 días)", fontsize=10)
+            ejes[2].plot(series.index, series["MACD"], color="blue", linewidth=1, label="MACD")
+            ejes[2].plot(series.index, series["Signal"], color="orange", linewidth=1, linestyle=":", label="Señal")
+            ejes[2].set_title("MACD", fontsize=10)
+            ejes[2].legend(fontsize=8)
+            for eje in ejes:
+                eje.grid(linestyle="--", alpha=0.3)
+                eje.tick_params(labelsize=8)
+            pdf.savefig(fig)
+
+        if errores:
+            _pagina_tabla(pdf, "Tickers sin reporte", pd.DataFrame({"Error": pd.Series(errores)}))
+    return salida.getvalue()
+
+
+def _hoja_series(series):
+    """Series de un ticker para Excel, que no admite fechas con zona horaria:
+    las fechas de Yahoo quedan en hora de la bolsa y las que no tienen zona, igual."""
+    series = series.rename(columns={"Close": "Cierre", "Signal": "Señal MACD"})
+    return series.tz_localize(None) if series.index.tz is not None else series
+
+
+def reporte_xlsx(analisis, errores=None):
+    """Libro con la hoja Resumen, los múltiplos de todos los tickers y una hoja de series por ticker."""
+    if not XLSX_DISPONIBLE:
+        raise RuntimeError("Exportar a XLSX requiere openpyxl (pip install -r requirements.txt).")
+    salida = io.BytesIO()
+    with pd.ExcelWriter(salida, engine="openpyxl") as libro:
+        tabla_resumen(analisis).to_excel(libro, sheet_name="Resumen")
+        if analisis:
+            pd.concat({a["ticker"]: a["multiplos"] for a in analisis}, names=["Ticker", "Múltiplo"]).to_excel(
+                libro, sheet_name="Múltiplos")
+        for a in analisis:
+            _hoja_series(a["series"]).to_excel(libro, sheet_name=a["ticker"][:31])
+        if errores:
+            pd.DataFrame({"Error": pd.Series(errores)}).to_excel(libro, sheet_name="Errores")
+    return salida.getvalue()
+
+
+GENERADORES = {"html": reporte_html, "pdf": reporte_pdf, "xlsx": reporte_xlsx}
+
+
+# -------- Cola de reportes --------
+
+class Reporte:
+    """Un pedido de reporte: avance por ticker y archivos generados."""
+
+    def __init__(self, tickers, formatos, periodo, criterio_pares):
+        self.id = uuid.uuid4().hex
+        self.tickers = tickers
+        self.formatos = formatos
+        self.periodo = periodo
+        self.criterio_pares = criterio_pares
+        self.estado = "En cola"
+        self.analisis = {}          # ticker -> dict de analizar_ticker
+        self.errores = {}           # ticker -> mensaje
+        self.archivos = {}          # formato -> bytes
+        self.errores_formato = {}   # formato -> mensaje
+        self.creado = self.consultado = time.time()
+
+    def avance(self):
+        """Copia del estado para mostrar en la interfaz."""
+        with _lock:
+            self.consultado = time.time()
+            return {
+                "estado": self.estado,
+                "tickers": list(self.tickers),
+                "completados": len(self.analisis) + len(self.errores),
+                "total": len(self.tickers),
+                "errores": dict(self.errores),
+                "archivos": dict(self.archivos),
+                "errores_formato": dict(self.errores_formato),
+                "creado": self.creado,
+            }
+
+
+def _asegurar_ejecutor():
+    global _ejecutor
+    with _lock:
+        if _ejecutor is None:
+            _ejecutor = ThreadPoolExecutor(max_workers=MAX_HILOS_REPORTE, thread_name_prefix="reportes")
+        return _ejecutor
+
+
+def _analizar(reporte, ticker):
+    try:
+        resultado, error = analizar_ticker(ticker, reporte.periodo, reporte.criterio_pares), None
+    except Exception as e:
+        resultado, error = None, str(e) or type(e).__name__
+    with _lock:
+        if error is None:
+            reporte.analisis[ticker] = resultado
+        else:
+            reporte.errores[ticker] = error
+        reporte.estado = "Analizando"
+        ultimo = len(reporte.analisis) + len(reporte.errores) == len(reporte.tickers)
+        if ultimo:
+            reporte.estado = "Generando archivos"
+    # El hilo que termina el último ticker arma los archivos
+    if ultimo:
+        _generar(reporte)
+
+
+def _generar(reporte):
+    analisis = [reporte.analisis[t] for t in reporte.tickers if t in reporte.analisis]
+    for formato in reporte.formatos:
+        try:
+            with metricas.seccion(f"reporte {formato}"):
+                contenido, error = GENERADORES[formato](analisis, reporte.errores), None
+        except Exception as e:
+            contenido, error = None, str(e) or type(e).__name__
+        with _lock:
+            if error is None:
+                reporte.archivos[formato] = contenido
+            else:
+                reporte.errores_formato[formato] = error
+    with _lock:
+        reporte.estado = "Listo"
+
+
+def _descartar_vencidos(ahora):
+    with _lock:
+        for id_, reporte in list(_reportes.items()):
+            if reporte.estado == "Listo" and ahora - reporte.consultado > TTL_REPORTE:
+                del _reportes[id_]
+
+
+def encolar_reporte(tickers, formatos=tuple(FORMATOS), periodo="5y", criterio_pares="Industria"):
+    """Agrega un reporte a la cola de fondo y devuelve su id sin esperar el resultado."""
+    tickers = list(dict.fromkeys(t.upper().strip() for t in tickers if t.strip()))
+    if not tickers:
+        raise ValueError("Ingrese al menos un ticker.")
+    desconocidos = [f for f in formatos if f not in FORMATOS]
+    if desconocidos or not formatos:
+        raise ValueError(f"Formatos no soportados: {', '.join(desconocidos) or '(ninguno)'} (opciones: {', '.join(FORMATOS)})")
+
+    _descartar_vencidos(time.time())
+    reporte = Reporte(tickers, list(formatos), periodo, criterio_pares)
+    with _lock:
+        _reportes[reporte.id] = reporte
+    ejecutor = _asegurar_ejecutor()
+    for ticker in tickers:
+        ejecutor.submit(_analizar, reporte, ticker)
+    return reporte.id
+
+
+def avance_reporte(id_):
+    """Estado del reporte ``id_`` (ver ``Reporte.avance``), o None si ya no existe."""
+    with _lock:
+        reporte = _reportes.get(id_)
+    return reporte.avance() if reporte is not None else None
+
+
+def esperar_reporte(id_, intervalo=0.5):
+    while True:
+        avance = avance_reporte(id_)
+        if avance is None or avance["estado"] == "Listo":
+            return avance
+        time.sleep(intervalo)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Genera el reporte de análisis de varios tickers.")
+    parser.add_argument("tickers", nargs="+")
+    parser.add_argument("--formatos", nargs="+", choices=list(FORMATOS), default=list(FORMATOS))
+    parser.add_argument("--periodo", default="5y", help="Periodo de las gráficas (1y, 5y, max, ...)")
+    parser.add_argument("--salida", type=Path, default=Path("."))
+    args = parser.parse_args(argv)
+
+    avance = esperar_reporte(encolar_reporte(args.tickers, args.formatos, args.periodo))
+    for ticker, error in avance["errores"].items():
+        print(f"{ticker}: {error}")
+    args.salida.mkdir(parents=True, exist_ok=True)
+    for formato, contenido in avance["archivos"].items():
+        ruta = args.salida / f"reporte.{formato}"
+        ruta.write_bytes(contenido)
+        print(f"Reporte guardado en {ruta}")
+    for formato, error in avance["errores_formato"].items():
+        print(f"No se pudo generar {formato}: {error}")
+    return 0 if avance["archivos"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,164 @@
+# -------- Valor en riesgo (VaR) y pérdida esperada (CVaR) --------
+# Pérdida de una posición (un ticker o un portafolio con pesos fijos, comprado
+# y mantenido) en un horizonte de días hábiles, con tres métodos:
+#
+#   histórico      rendimientos observados a ``horizonte`` días (ventanas solapadas)
+#   paramétrico    rendimiento normal con la media y la covarianza anualizadas
+#   Monte Carlo    rendimientos simulados con movimiento browniano geométrico
+#                  correlacionado (desde ``cov_matrix``) o remuestreando días
+#                  históricos completos (bootstrap)
+#
+# La simulación se hace por bloques de tamaño fijo: la memoria depende del
+# bloque, no de la cantidad de trayectorias, y cada bloque tiene su propia
+# semilla derivada, así que el resultado es el mismo en serie o repartido en
+# PROCESOS_RIESGO procesos (iniciados con "spawn", nunca copiando el servidor
+# con sus hilos). Los bloques se calculan en float32 (la precisión sobra para
+# un cuantil de 100k muestras y rinde casi el doble). VaR y CVaR se expresan
+# como fracción positiva del valor invertido.
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+from covarianza import estimar_covarianza
+from indicadores import DIAS_HABILES
+
+NIVEL_CONFIANZA = 0.95
+TRAYECTORIAS = 100_000
+# Trayectorias por bloque: acota la memoria temporal (bloque x activos)
+TAMANO_BLOQUE = 10_000
+# Procesos para la simulación (0 = en el proceso actual)
+PROCESOS_RIESGO = int(os.environ.get("PROCESOS_RIESGO", 0))
+
+METODOS_SIMULACION = ("gbm", "bootstrap")
+
+
+def var_cvar(rendimientos, nivel=NIVEL_CONFIANZA):
+    """``(VaR, CVaR)`` de una muestra de rendimientos: el cuantil ``1 - nivel``
+    de la pérdida y la pérdida media más allá de él."""
+    rendimientos = np.asarray(rendimientos, dtype=float)
+    rendimientos = rendimientos[~np.isnan(rendimientos)]
+    if rendimientos.size == 0:
+        return np.nan, np.nan
+    corte = np.quantile(rendimientos, 1 - nivel)
+    return -corte, -rendimientos[rendimientos <= corte].mean()
+
+
+# -------- Histórico y paramétrico --------
+
+def rendimientos_horizonte(precios, pesos, horizonte=1):
+    """Rendimiento a ``horizonte`` días de la posición comprada cada día del
+    historial (ventanas solapadas); solo fechas con precio para todos los tickers."""
+    precios = precios.dropna()
+    relativos = precios.shift(-horizonte) / precios - 1
+    return relativos.dropna() @ np.asarray(pesos, dtype=float)
+
+
+def var_historico(precios, pesos, nivel=NIVEL_CONFIANZA, horizonte=1):
+    return var_cvar(rendimientos_horizonte(precios, pesos, horizonte), nivel)
+
+
+def var_parametrico(mean_returns, cov_matrix, pesos, nivel=NIVEL_CONFIANZA, horizonte=1):
+    """VaR y CVaR con rendimiento normal; media y covarianza anualizadas."""
+    pesos = np.asarray(pesos, dtype=float)
+    fraccion = horizonte / DIAS_HABILES
+    media = float(pesos @ np.asarray(mean_returns, dtype=float)) * fraccion
+    desvio = float(np.sqrt(pesos @ np.asarray(cov_matrix, dtype=float) @ pesos * fraccion))
+
+    normal = NormalDist()
+    z = normal.inv_cdf(1 - nivel)
+    return -(media + z * desvio), -(media - desvio * normal.pdf(z) / (1 - nivel))
+
+
+# -------- Monte Carlo --------
+
+def _raiz(cov):
+    """Factor ``L`` con ``L @ L.T == cov``; si no es definida positiva, vía autovalores."""
+    try:
+        return np.linalg.cholesky(cov)
+    except np.linalg.LinAlgError:
+        autovalores, autovectores = np.linalg.eigh(cov)
+        return autovectores * np.sqrt(np.maximum(autovalores, 0))
+
+
+def _bloque_gbm(semilla, n, pesos, deriva, raiz):
+    # Con GBM el logaritmo del rendimiento en el horizonte es normal: alcanza con un paso
+    rng = np.random.default_rng(semilla)
+    logaritmos = deriva + rng.standard_normal((n, len(pesos)), dtype=np.float32) @ raiz.T
+    return np.expm1(logaritmos) @ pesos
+
+
+def _bloque_bootstrap(semilla, n, pesos, logaritmos_diarios, horizonte):
+    # Se remuestrean días completos (todos los tickers juntos) para conservar la correlación
+    rng = np.random.default_rng(semilla)
+    dias = rng.integers(0, len(logaritmos_diarios), size=(n, horizonte))
+    acumulado = np.zeros((n, len(pesos)), dtype=np.float32)
+    for d in range(horizonte):
+        acumulado += logaritmos_diarios[dias[:, d]]
+    return np.expm1(acumulado) @ pesos
+
+
+def simular_rendimientos(pesos, mean_returns=None, cov_matrix=None, precios=None, horizonte=1,
+                         n_trayectorias=TRAYECTORIAS, metodo="gbm", semilla=None,
+                         tamano_bloque=TAMANO_BLOQUE, procesos=PROCESOS_RIESGO):
+    """Rendimientos simulados de la posición a ``horizonte`` días.
+
+    ``metodo="gbm"`` usa ``mean_returns`` y ``cov_matrix`` (anualizados);
+    ``metodo="bootstrap"`` remuestrea los rendimientos diarios de ``precios``
+    (fechas x tickers, en el orden de ``pesos``).
+    """
+    pesos = np.asarray(pesos, dtype=np.float32)
+    if metodo == "gbm":
+        fraccion = horizonte / DIAS_HABILES
+        cov = np.asarray(cov_matrix, dtype=float) * fraccion
+        deriva = np.asarray(mean_returns, dtype=float) * fraccion - np.diag(cov) / 2
+        funcion, argumentos = _bloque_gbm, (pesos, deriva.astype(np.float32), _raiz(cov).astype(np.float32))
+    elif metodo == "bootstrap":
+        logaritmos = np.log(precios.dropna()).diff().dropna().to_numpy(dtype=np.float32)
+        funcion, argumentos = _bloque_bootstrap, (pesos, logaritmos, horizonte)
+    else:
+        raise ValueError(f"Método de simulación no soportado: {metodo}")
+
+    tamanos = [min(tamano_bloque, n_trayectorias - inicio) for inicio in range(0, n_trayectorias, tamano_bloque)]
+    semillas = np.random.SeedSequence(semilla).spawn(len(tamanos))
+
+    if procesos and len(tamanos) > 1:
+        contexto = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=min(procesos, len(tamanos)), mp_context=contexto) as ejecutor:
+            bloques = list(ejecutor.map(funcion, semillas, tamanos, *([a] * len(tamanos) for a in argumentos)))
+    else:
+        bloques = [funcion(s, n, *argumentos) for s, n in zip(semillas, tamanos)]
+    return np.concatenate(bloques)
+
+
+def var_montecarlo(pesos, mean_returns=None, cov_matrix=None, precios=None, nivel=NIVEL_CONFIANZA, horizonte=1,
+                   n_trayectorias=TRAYECTORIAS, metodo="gbm", semilla=None, procesos=PROCESOS_RIESGO):
+    simulados = simular_rendimientos(pesos, mean_returns, cov_matrix, precios, horizonte, n_trayectorias,
+                                     metodo, semilla, procesos=procesos)
+    return var_cvar(simulados, nivel)
+
+
+def tabla_riesgo(precios, pesos, mean_returns, cov_matrix, nivel=NIVEL_CONFIANZA, horizonte=1,
+                 n_trayectorias=TRAYECTORIAS, semilla=None, procesos=PROCESOS_RIESGO):
+    """VaR y CVaR de la posición con los cuatro métodos (filas) como fracciones."""
+    filas = {
+        "Histórico": var_historico(precios, pesos, nivel, horizonte),
+        "Paramétrico (normal)": var_parametrico(mean_returns, cov_matrix, pesos, nivel, horizonte),
+    }
+    for metodo, nombre in (("gbm", "Monte Carlo (GBM)"), ("bootstrap", "Monte Carlo (bootstrap)")):
+        filas[nombre] = var_montecarlo(pesos, mean_returns, cov_matrix, precios, nivel, horizonte,
+                                       n_trayectorias, metodo, semilla, procesos)
+    return pd.DataFrame(filas, index=["VaR", "CVaR"]).T
+
+
+def tabla_riesgo_activo(cierres, nivel=NIVEL_CONFIANZA, horizonte=1, n_trayectorias=TRAYECTORIAS, semilla=None,
+                        procesos=PROCESOS_RIESGO):
+    """``tabla_riesgo`` de un solo ticker. ``cierres`` es su serie de precios y
+    su nombre (el ticker) identifica la estimación en la caché de covarianzas."""
+    precios = cierres.to_frame()
+    mean_returns, cov_matrix = estimar_covarianza(precios, "muestral")
+    return tabla_riesgo(precios, [1.0], mean_returns, cov_matrix, nivel, horizonte, n_trayectorias, semilla, procesos)
@@ -0,0 +1,22 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Los módulos de la app se importan por nombre, como desde la carpeta del examen
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def precios_aleatorios(tickers, dias=800, semilla=0, inicio="2020-01-01"):
+    """Cierres sintéticos (fechas hábiles x tickers) de un paseo log-normal."""
+    rng = np.random.default_rng(semilla)
+    rendimientos = rng.normal(0.0004, 0.015, size=(dias, len(tickers))) + rng.normal(0, 0.008, size=(dias, 1))
+    fechas = pd.bdate_range(inicio, periods=dias)
+    return pd.DataFrame(100 * np.exp(np.cumsum(rendimientos, axis=0)), index=fechas, columns=list(tickers))
+
+
+@pytest.fixture
+def precios():
+    return precios_aleatorios(["AAA", "BBB", "CCC", "DDD"])
@@ -0,0 +1,101 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest import METRICAS, backtest, comprar_y_mantener, evaluar, posiciones_macd, posiciones_rsi
+from conftest import precios_aleatorios
+from indicadores import DIAS_HABILES, macd, rsi
+
+
+def evaluar_con_bucle(posiciones, precios, costo):
+    """Métricas de un ticker (sin huecos) recorriendo día por día."""
+    valor = maximo = 1.0
+    caida = 0.0
+    operaciones, actual = [], None
+    cambios = expuesto = 0.0
+    for t in range(1, len(precios)):
+        previa, hoy = posiciones[t - 1], posiciones[t]
+        neto = previa * (precios[t] / precios[t - 1] - 1) - costo * abs(hoy - previa)
+        cambios += abs(hoy - previa)
+        expuesto += previa
+        if previa > 0:
+            actual = (actual or 0.0) + math.log1p(neto)
+        if previa > 0 and hoy == 0:
+            operaciones.append(actual)
+            actual = None
+        valor *= 1 + neto
+        maximo = max(maximo, valor)
+        caida = min(caida, valor / maximo - 1)
+    if actual is not None:
+        operaciones.append(actual)
+    años = (len(precios) - 1) / DIAS_HABILES
+    return {
+        "Rendimiento total": valor - 1,
+        "Rendimiento anual": valor ** (1 / años) - 1,
+        "Tasa de acierto": sum(o > 0 for o in operaciones) / len(operaciones) if operaciones else np.nan,
+        "Máximo drawdown": caida,
+        "Rotación anual": cambios / años,
+        "Exposición": expuesto / (len(precios) - 1),
+        "Operaciones": len(operaciones),
+    }
+
+
+def posiciones_rsi_con_bucle(valores, inferior, superior):
+    estado, posiciones = 0.0, []
+    for v in valores:
+        if v < inferior:
+            estado = 1.0
+        elif v > superior:
+            estado = 0.0
+        posiciones.append(estado)
+    return np.array(posiciones)
+
+
+@pytest.fixture
+def precios():
+    return precios_aleatorios(["AAA", "BBB", "CCC"], dias=600, semilla=3)
+
+
+def test_posiciones_rsi_con_bucle(precios):
+    valores = rsi(precios, 14).to_numpy()
+    obtenido = posiciones_rsi(valores, 30, 70)
+    for i in range(precios.shape[1]):
+        np.testing.assert_array_equal(obtenido[:, i], posiciones_rsi_con_bucle(valores[:, i], 30, 70))
+
+
+def test_evaluar_con_bucle(precios):
+    linea, senal = macd(precios)
+    posiciones = posiciones_macd(linea.to_numpy(), senal.to_numpy())
+    matriz = precios.to_numpy()
+    metricas = evaluar(posiciones, matriz, costo=0.002)
+    for i in range(matriz.shape[1]):
+        esperado = evaluar_con_bucle(posiciones[:, i], matriz[:, i], 0.002)
+        for nombre in METRICAS:
+            assert metricas[nombre][i] == pytest.approx(esperado[nombre], rel=1e-9, abs=1e-12), nombre
+
+
+def test_backtest_rsi_con_bucle(precios):
+    rejilla = {"ventana": (7, 14), "inferior": (25, 30), "superior": (70,)}
+    resultados = backtest(precios, "rsi", rejilla, costo=0.001, procesos=1)
+    assert len(resultados) == 4 * precios.shape[1]
+    for _, fila in resultados.iterrows():
+        valores = rsi(precios[fila["Ticker"]], fila["ventana"]).to_numpy()
+        posiciones = posiciones_rsi_con_bucle(valores, fila["inferior"], fila["superior"])
+        esperado = evaluar_con_bucle(posiciones, precios[fila["Ticker"]].to_numpy(), 0.001)
+        assert fila["Rendimiento total"] == pytest.approx(esperado["Rendimiento total"], rel=1e-9, abs=1e-12)
+        assert fila["Operaciones"] == esperado["Operaciones"]
+
+
+def test_comprar_y_mantener(precios):
+    referencia = comprar_y_mantener(precios)
+    np.testing.assert_allclose(referencia["Rendimiento total"], precios.iloc[-1] / precios.iloc[0] - 1)
+    assert (referencia["Exposición"] == 1).all()
+
+
+def test_procesos_dan_lo_mismo_que_en_serie(precios):
+    rejilla = {"rapida": (8, 12), "lenta": (26,), "senal": (9,)}
+    serie = backtest(precios, "macd", rejilla, procesos=1, bloque_tickers=2)
+    repartido = backtest(precios, "macd", rejilla, procesos=2, bloque_tickers=2)
+    pd.testing.assert_frame_equal(serie, repartido)
@@ -0,0 +1,136 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import cache
+from cache import CacheTTL, SolicitudesEnCurso
+from metricas import Metricas
+
+
+@pytest.fixture
+def reloj(monkeypatch):
+    ahora = [1000.0]
+    monkeypatch.setattr(cache, "time", SimpleNamespace(time=lambda: ahora[0]))
+    return ahora
+
+
+@pytest.fixture
+def registro(monkeypatch):
+    nuevo = Metricas()
+    monkeypatch.setattr(cache, "metricas", nuevo)
+    return nuevo
+
+
+def test_caduca_a_los_ttl_segundos(reloj):
+    datos = CacheTTL(ttl=60)
+    datos.guardar("AAA", 1)
+    reloj[0] += 59
+    assert datos.obtener("AAA") == 1
+    reloj[0] += 1
+    assert datos.obtener("AAA") is None
+    assert len(datos) == 0
+
+
+def test_momento_explicito(reloj):
+    # Un valor leído de disco conserva la antigüedad de su archivo
+    datos = CacheTTL(ttl=60)
+    datos.guardar("AAA", 1, momento=reloj[0] - 50)
+    reloj[0] += 10
+    assert datos.obtener("AAA") is None
+
+
+def test_desaloja_el_usado_hace_mas_tiempo(reloj):
+    datos = CacheTTL(ttl=60, max_elementos=2)
+    datos.guardar("AAA", 1)
+    datos.guardar("BBB", 2)
+    assert datos.obtener("AAA") == 1  # AAA pasa a ser el más reciente
+    datos.guardar("CCC", 3)
+    assert len(datos) == 2
+    assert datos.obtener("BBB") is None
+    assert datos.obtener("AAA") == 1
+    assert datos.obtener("CCC") == 3
+
+
+def test_volver_a_guardar_renueva_el_valor(reloj):
+    datos = CacheTTL(ttl=60, max_elementos=2)
+    datos.guardar("AAA", 1)
+    reloj[0] += 50
+    datos.guardar("AAA", 2)
+    reloj[0] += 50
+    assert datos.obtener("AAA") == 2
+    assert len(datos) == 1
+
+
+def test_aciertos_y_fallos(reloj, registro):
+    datos = CacheTTL(ttl=60, nombre="prueba")
+    datos.obtener("AAA")
+    datos.guardar("AAA", 1)
+    datos.obtener("AAA")
+    datos.obtener("AAA")
+    reloj[0] += 60
+    datos.obtener("AAA")
+    assert registro.caches == {"prueba": {"aciertos": 2, "fallos": 2}}
+
+
+def test_sin_nombre_no_registra(reloj, registro):
+    CacheTTL(ttl=60).obtener("AAA")
+    assert registro.caches == {}
+
+
+def llamadas_simultaneas(solicitudes, registro, funcion, n=8):
+    """Lanza ``n`` hilos con la misma clave y suelta la carga solo cuando los
+    ``n - 1`` que llegaron después ya están esperando su resultado."""
+    soltar = threading.Event()
+    resultados = [None] * n
+
+    def cargar():
+        soltar.wait(5)
+        return funcion()
+
+    def llamar(i):
+        try:
+            resultados[i] = solicitudes.ejecutar("AAA", cargar)
+        except Exception as e:
+            resultados[i] = e
+
+    hilos = [threading.Thread(target=llamar, args=(i,)) for i in range(n)]
+    for hilo in hilos:
+        hilo.start()
+    limite = time.monotonic() + 5
+    while registro.caches.get("en_curso", {}).get("aciertos", 0) < n - 1 and time.monotonic() < limite:
+        time.sleep(0.001)
+    soltar.set()
+    for hilo in hilos:
+        hilo.join()
+    return resultados
+
+
+def test_llamadas_simultaneas_cargan_una_vez(registro):
+    solicitudes = SolicitudesEnCurso(nombre="en_curso")
+    llamadas = []
+
+    def funcion():
+        llamadas.append(1)
+        return {"precios": [1, 2, 3]}
+
+    resultados = llamadas_simultaneas(solicitudes, registro, funcion)
+    assert len(llamadas) == 1
+    assert all(r is resultados[0] for r in resultados)
+    assert registro.caches == {"en_curso": {"aciertos": 7, "fallos": 1}}
+
+
+def test_excepcion_llega_a_todos_y_no_envenena_la_clave(registro):
+    solicitudes = SolicitudesEnCurso(nombre="en_curso")
+    llamadas = []
+
+    def funcion():
+        llamadas.append(1)
+        raise ConnectionError("sin red")
+
+    resultados = llamadas_simultaneas(solicitudes, registro, funcion)
+    assert len(llamadas) == 1
+    assert all(isinstance(r, ConnectionError) for r in resultados)
+    # La clave queda libre: la siguiente llamada vuelve a ejecutar la función
+    assert solicitudes.ejecutar("AAA", lambda: "ok") == "ok"
@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.covariance import LedoitWolf
+
+from conftest import precios_aleatorios
+from covarianza import CovarianzaMovil, estimar_covarianza, rendimientos_diarios
+
+
+def test_muestral_coincide_con_pandas(precios):
+    media, cov = estimar_covarianza(precios, "muestral", usar_cache=False)
+    rendimientos = precios.pct_change().iloc[1:]
+    np.testing.assert_allclose(media, rendimientos.mean() * 252)
+    np.testing.assert_allclose(cov, rendimientos.cov() * 252)
+
+
+def test_ledoit_wolf_coincide_con_sklearn(precios):
+    _, cov = estimar_covarianza(precios, "ledoit_wolf", usar_cache=False)
+    referencia = LedoitWolf().fit(precios.pct_change().iloc[1:].to_numpy()).covariance_
+    np.testing.assert_allclose(cov, referencia * 252, rtol=1e-10)
+
+
+def test_muestral_por_pares_con_huecos(precios):
+    precios = precios.copy()
+    precios.iloc[:100, 0] = np.nan
+    _, cov = estimar_covarianza(precios, "muestral", usar_cache=False)
+    rendimientos = precios.pct_change(fill_method=None)
+    np.testing.assert_allclose(cov, rendimientos.cov() * 252, rtol=1e-10)
+
+
+def test_cache_distingue_precios_con_mismas_fechas():
+    # Dos series distintas con el mismo nombre de columna y las mismas fechas
+    a = precios_aleatorios(["Close"], semilla=1)
+    b = precios_aleatorios(["Close"], semilla=2)
+    media_a, cov_a = estimar_covarianza(a, "muestral")
+    media_b, cov_b = estimar_covarianza(b, "muestral")
+    sin_cache = estimar_covarianza(b, "muestral", usar_cache=False)
+    assert media_a.iloc[0] != pytest.approx(media_b.iloc[0])
+    np.testing.assert_allclose(media_b, sin_cache[0])
+    np.testing.assert_allclose(cov_b, sin_cache[1])
+
+
+@pytest.mark.parametrize("metodo", CovarianzaMovil.METODOS)
+def test_covarianza_movil_coincide_con_estimacion(precios, metodo):
+    rendimientos = rendimientos_diarios(precios)
+    movil = CovarianzaMovil(precios.shape[1])
+    valores = rendimientos.to_numpy()
+    # Ventana de 300 filas que se desplaza 50 filas
+    movil.agregar(valores[:300])
+    movil.agregar(valores[300:350])
+    movil.quitar(valores[:50])
+    media, cov = movil.estimar(metodo)
+
+    ventana = precios.iloc[50:351]
+    media_ref, cov_ref = estimar_covarianza(ventana, metodo, usar_cache=False, dias=1)
+    np.testing.assert_allclose(media, media_ref, atol=1e-12)
+    np.testing.assert_allclose(cov, cov_ref, rtol=1e-8, atol=1e-12)
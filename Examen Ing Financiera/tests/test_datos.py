@@ -0,0 +1,103 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import datos
+from cache import CacheTTL
+
+
+def historial(fechas, dividendos=None):
+    cierres = np.linspace(100, 110, len(fechas))
+    data = pd.DataFrame({"Open": cierres, "High": cierres, "Low": cierres, "Close": cierres,
+                         "Adj Close": cierres * 0.99, "Volume": 1e6, "Dividends": 0.0, "Stock Splits": 0.0},
+                        index=fechas)
+    for fecha, monto in (dividendos or {}).items():
+        data.loc[fecha, "Dividends"] = monto
+    return data
+
+
+@pytest.fixture
+def almacen(tmp_path, monkeypatch):
+    monkeypatch.setattr(datos, "DIRECTORIO_ALMACEN", tmp_path)
+    pedidos = []
+
+    def guardar_vencido(ticker, data):
+        datos._guardar(ticker, data)
+        vencido = os.path.getmtime(datos._ruta_almacen(ticker)) - 2 * datos.TTL_HISTORIAL
+        os.utime(datos._ruta_almacen(ticker), (vencido, vencido))
+
+    return pedidos, guardar_vencido
+
+
+def test_dividendo_en_la_ultima_barra_guardada_no_recarga(almacen, monkeypatch):
+    pedidos, guardar_vencido = almacen
+    fechas = pd.bdate_range("2024-01-01", periods=30)
+    completo = historial(fechas, {fechas[19]: 0.5})
+    guardar_vencido("AAA", completo.iloc[:20])
+
+    def descargar(ticker, inicio=None):
+        pedidos.append(inicio)
+        return completo.loc[completo.index >= inicio] if inicio is not None else completo
+
+    monkeypatch.setattr(datos, "_descargar", descargar)
+    data = datos.actualizar_almacen("AAA")
+    assert pedidos == [fechas[19]]
+    pd.testing.assert_frame_equal(data, completo, check_freq=False)
+
+
+def test_dividendo_en_una_barra_nueva_recarga_todo(almacen, monkeypatch):
+    pedidos, guardar_vencido = almacen
+    fechas = pd.bdate_range("2024-01-01", periods=30)
+    completo = historial(fechas, {fechas[25]: 0.5})
+    guardar_vencido("AAA", completo.iloc[:20])
+
+    def descargar(ticker, inicio=None):
+        pedidos.append(inicio)
+        return completo.loc[completo.index >= inicio] if inicio is not None else completo
+
+    monkeypatch.setattr(datos, "_descargar", descargar)
+    datos.actualizar_almacen("AAA")
+    assert pedidos == [fechas[19], None]
+
+
+def test_historiales_en_memoria_acotados(almacen, monkeypatch):
+    pedidos, _ = almacen
+    completo = historial(pd.bdate_range("2024-01-01", periods=30))
+
+    def descargar(ticker, inicio=None):
+        pedidos.append(ticker)
+        return completo
+
+    monkeypatch.setattr(datos, "_descargar", descargar)
+    monkeypatch.setattr(datos, "_historiales", CacheTTL(datos.TTL_HISTORIAL, 2))
+    for ticker in ["AAA", "BBB", "CCC"]:
+        datos.obtener_historial(ticker)
+    assert len(datos._historiales) == 2
+
+    # El desalojado se relee del almacén en disco, sin volver a descargarlo
+    data = datos.obtener_historial("AAA", ajustado=False)
+    assert pedidos == ["AAA", "BBB", "CCC"]
+    pd.testing.assert_frame_equal(data, completo.drop(columns=["Adj Close"]), check_freq=False)
+    assert len(datos._historiales) == 2
+
+
+def test_cierres_desde_es_una_vista(almacen, monkeypatch):
+    fechas = pd.bdate_range("2024-01-01", periods=30)
+    monkeypatch.setattr(datos, "_descargar", lambda ticker, inicio=None: historial(fechas))
+    monkeypatch.setattr(datos, "_historiales", CacheTTL(datos.TTL_HISTORIAL, 2))
+
+    cola = datos.cierres_desde("AAA", fechas[27])
+    assert list(cola.index) == list(fechas[27:])
+    completo = datos.cierres_desde("AAA")
+    assert len(completo) == 30
+    assert np.shares_memory(cola.to_numpy(), completo.to_numpy())
+
+
+def test_recortar_periodo():
+    data = historial(pd.bdate_range("2020-01-01", "2024-12-31"))
+    assert len(datos.recortar_periodo(data, "5d")) == 5
+    recorte = datos.recortar_periodo(data, "1y")
+    assert recorte.index[0] >= data.index[-1] - pd.DateOffset(years=1)
+    assert data.index[data.index < recorte.index[0]][-1] < data.index[-1] - pd.DateOffset(years=1)
@@ -0,0 +1,124 @@
+import numpy as np
+import pytest
+from scipy.optimize import minimize
+
+import frontera
+from frontera import frontera_optima, portafolio_max_rendimiento, portafolios_optimos, simular_portafolios
+
+
+@pytest.fixture
+def mercado():
+    rng = np.random.default_rng(4)
+    factores = rng.normal(size=(6, 3)) * 0.1
+    cov = factores @ factores.T + np.diag(rng.uniform(0.01, 0.04, 6))
+    mu = rng.uniform(0.02, 0.20, 6)
+    return mu, cov
+
+
+def slsqp(objetivo, n, cota_max, restricciones=(), cota_min=0.0):
+    """Referencia con el optimizador genérico de scipy."""
+    resultado = minimize(
+        objetivo, np.full(n, 1 / n), method="SLSQP", bounds=[(cota_min, cota_max)] * n,
+        constraints=[{"type": "eq", "fun": lambda w: w.sum() - 1}, *restricciones],
+        options={"ftol": 1e-14, "maxiter": 1000},
+    )
+    assert resultado.success
+    return resultado.x
+
+
+@pytest.mark.parametrize("cota_min,cota_max", [(0.0, 1.0), (0.0, 0.4), (0.05, 0.3)])
+def test_minima_varianza_y_maximo_sharpe_con_slsqp(mercado, cota_min, cota_max):
+    mu, cov = mercado
+    df, pesos = frontera_optima(mu, cov, n_puntos=50, rf=0.03, cota_min=cota_min, cota_max=cota_max)
+
+    w_min = slsqp(lambda w: w @ cov @ w, len(mu), cota_max, cota_min=cota_min)
+    assert df["Volatilidad"].iloc[0] == pytest.approx(np.sqrt(w_min @ cov @ w_min), rel=1e-6)
+
+    w_sharpe = slsqp(lambda w: -(w @ mu - 0.03) / np.sqrt(w @ cov @ w), len(mu), cota_max, cota_min=cota_min)
+    assert df["Sharpe Ratio"].max() == pytest.approx((w_sharpe @ mu - 0.03) / np.sqrt(w_sharpe @ cov @ w_sharpe),
+                                                     rel=1e-5)
+    assert (pesos >= cota_min - 1e-7).all() and (pesos <= cota_max + 1e-6).all()
+    np.testing.assert_allclose(pesos.sum(axis=1), 1, atol=1e-6)
+
+
+def test_cada_punto_sobre_la_frontera_de_slsqp(mercado):
+    mu, cov = mercado
+    df, _ = frontera_optima(mu, cov, n_puntos=12, cota_max=0.5)
+    for rendimiento, volatilidad in zip(df["Rendimiento"].iloc[1:-1], df["Volatilidad"].iloc[1:-1]):
+        objetivo = {"type": "eq", "fun": lambda w, r=rendimiento: w @ mu - r}
+        w = slsqp(lambda w: w @ cov @ w, len(mu), 0.5, [objetivo])
+        assert volatilidad == pytest.approx(np.sqrt(w @ cov @ w), rel=1e-6)
+
+
+def test_portafolios_optimos_coinciden_con_la_frontera(mercado):
+    mu, cov = mercado
+    df, pesos = frontera_optima(mu, cov, rf=0.03, cota_max=0.4)
+    minima, sharpe, maximo = portafolios_optimos(mu, cov, rf=0.03, cota_max=0.4)
+    np.testing.assert_allclose(minima, pesos[0], atol=1e-6)
+    np.testing.assert_allclose(sharpe, pesos[df["Sharpe Ratio"].idxmax()], atol=1e-6)
+    np.testing.assert_allclose(maximo, pesos[-1], atol=1e-6)
+
+
+def mercado_movido(mu, cov, semilla):
+    """El mismo mercado un rebalanceo después: μ y Σ cambian un poco."""
+    rng = np.random.default_rng(semilla)
+    ruido = rng.normal(size=cov.shape) * 0.002
+    return mu + rng.normal(size=len(mu)) * 0.002, cov + ruido @ ruido.T
+
+
+@pytest.mark.parametrize("cota_min,cota_max", [(0.0, 1.0), (0.0, 0.4), (0.05, 0.3)])
+def test_arranque_en_caliente(mercado, monkeypatch, cota_min, cota_max):
+    mu, cov = mercado
+    minima, sharpe, _ = portafolios_optimos(mu, cov, rf=0.03, cota_min=cota_min, cota_max=cota_max)
+    mu, cov = mercado_movido(mu, cov, 1)
+    esperado = portafolios_optimos(mu, cov, rf=0.03, cota_min=cota_min, cota_max=cota_max)
+
+    def sin_linea_critica(*args):
+        raise AssertionError("el arranque en caliente no debía recorrer la línea crítica")
+
+    monkeypatch.setattr(frontera, "_linea_critica", sin_linea_critica)
+    obtenido = portafolios_optimos(mu, cov, rf=0.03, cota_min=cota_min, cota_max=cota_max, inicial=(minima, sharpe))
+    for w, w_esperado in zip(obtenido, esperado):
+        np.testing.assert_allclose(w, w_esperado, atol=1e-10)
+
+
+@pytest.mark.parametrize("semilla", range(5))
+def test_arranque_malo_da_el_mismo_optimo(mercado, semilla):
+    # Con pesos iniciales cualesquiera el resultado no cambia: converge o se recorre la línea crítica
+    mu, cov = mercado_movido(*mercado, semilla)
+    rng = np.random.default_rng(semilla)
+    inicial = rng.dirichlet(np.full(len(mu), 0.3), size=2)
+    esperado = portafolios_optimos(mu, cov, rf=0.03, cota_max=0.4)
+    obtenido = portafolios_optimos(mu, cov, rf=0.03, cota_max=0.4, inicial=inicial)
+    for w, w_esperado in zip(obtenido, esperado):
+        np.testing.assert_allclose(w, w_esperado, atol=1e-10)
+
+
+def test_empates_en_rendimiento():
+    # Con μ repetido el portafolio de máximo rendimiento reparte entre los empatados
+    mu = np.array([0.10, 0.10, 0.05, 0.02])
+    varianzas = np.array([0.04, 0.01, 0.02, 0.03])
+    minima, sharpe, maximo = portafolios_optimos(mu, np.diag(varianzas), rf=0.0)
+    np.testing.assert_allclose(minima, (1 / varianzas) / (1 / varianzas).sum())
+    np.testing.assert_allclose(sharpe, (mu / varianzas) / (mu / varianzas).sum())
+    np.testing.assert_allclose(maximo, [0.2, 0.8, 0, 0])
+    # El arranque en caliente no elige al azar entre los empatados
+    _, _, maximo = portafolios_optimos(mu, np.diag(varianzas), rf=0.0, inicial=(minima, sharpe))
+    np.testing.assert_allclose(maximo, [0.2, 0.8, 0, 0])
+
+
+def test_maximo_rendimiento(mercado):
+    mu, _ = mercado
+    pesos = portafolio_max_rendimiento(mu, cota_max=0.3)
+    mejores = np.argsort(-mu)
+    np.testing.assert_allclose(pesos[mejores], [0.3, 0.3, 0.3, 0.1, 0, 0])
+
+
+def test_monte_carlo_con_un_bucle(mercado):
+    mu, cov = mercado
+    df, pesos = simular_portafolios(mu, cov, 1_000, rf=0.03, semilla=0, tamano_bloque=300)
+    for i in range(0, 1_000, 97):
+        w = pesos[i].astype(float)
+        assert df["Rendimiento"].iloc[i] == pytest.approx(w @ mu, rel=1e-6)
+        assert df["Volatilidad"].iloc[i] == pytest.approx(np.sqrt(w @ cov @ w), rel=1e-6)
+    np.testing.assert_allclose(pesos.sum(axis=1), 1, rtol=1e-6)
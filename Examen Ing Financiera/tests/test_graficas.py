@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import precios_aleatorios
+from graficas import lttb, reducir
+
+
+def lttb_en_bucle(x, y, puntos):
+    """LTTB tal como lo publicó Steinarsson, punto por punto."""
+    n = len(y)
+    cada = (n - 2) / (puntos - 2)
+    elegidos = [0]
+    a = 0
+    for i in range(puntos - 2):
+        inicio_sig, fin_sig = int((i + 1) * cada) + 1, min(int((i + 2) * cada) + 1, n)
+        if inicio_sig >= n - 1:
+            cx, cy = x[-1], y[-1]
+        else:
+            cx, cy = np.mean(x[inicio_sig:fin_sig]), np.mean(y[inicio_sig:fin_sig])
+        inicio, fin = int(i * cada) + 1, int((i + 1) * cada) + 1
+        mejor, area_mejor = inicio, -1.0
+        for j in range(inicio, fin):
+            area = abs((x[a] - cx) * (y[j] - y[a]) - (x[a] - x[j]) * (cy - y[a]))
+            if area > area_mejor:
+                mejor, area_mejor = j, area
+        elegidos.append(mejor)
+        a = mejor
+    elegidos.append(n - 1)
+    return np.array(elegidos)
+
+
+@pytest.mark.parametrize("n,puntos", [(1000, 50), (5000, 1500), (997, 13)])
+def test_coincide_con_bucle(n, puntos):
+    rng = np.random.default_rng(n)
+    x = np.arange(n, dtype=float)
+    y = np.cumsum(rng.normal(size=n))
+    np.testing.assert_array_equal(lttb(x, y, puntos), lttb_en_bucle(x, y, puntos))
+
+
+def test_conserva_extremos_y_cantidad():
+    y = np.cumsum(np.random.default_rng(0).normal(size=10_000))
+    elegidos = lttb(np.arange(10_000), y, 300)
+    assert len(elegidos) == 300
+    assert elegidos[0] == 0 and elegidos[-1] == 9_999
+    assert (np.diff(elegidos) > 0).all()
+
+
+def test_serie_corta_no_cambia():
+    serie = precios_aleatorios(["AAA"], dias=200)["AAA"]
+    np.testing.assert_array_equal(lttb(np.arange(200), serie.to_numpy(), 500), np.arange(200))
+    pd.testing.assert_series_equal(reducir(serie, 500), serie)
+
+
+@pytest.mark.parametrize("signo", [1, -1])
+def test_pico_sobrevive(signo):
+    serie = precios_aleatorios(["AAA"], dias=20_000)["AAA"]
+    posicion = 12_345
+    serie.iloc[posicion] += signo * 50 * serie.std()
+    reducida = reducir(serie, 500)
+    assert len(reducida) == 500
+    assert serie.index[posicion] in reducida.index
+    assert reducida.index[0] == serie.index[0] and reducida.index[-1] == serie.index[-1]
+
+
+def test_reducir_descarta_huecos():
+    serie = precios_aleatorios(["AAA"], dias=3_000)["AAA"]
+    serie.iloc[::7] = np.nan
+    reducida = reducir(serie, 400)
+    assert len(reducida) == 400
+    assert reducida.notna().all()
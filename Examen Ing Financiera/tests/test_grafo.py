@@ -0,0 +1,87 @@
+import grafo
+from grafo import GrafoSecciones
+
+
+def armar_grafo(memoria, llamadas, ttl=None):
+    """Mismo esquema que la página: historial -> rendimientos, y múltiplos aparte."""
+    secciones = GrafoSecciones(memoria)
+
+    @secciones.nodo(entradas=("ticker",), ttl=ttl)
+    def historial(ticker):
+        llamadas.append("historial")
+        return f"precios {ticker}"
+
+    @secciones.nodo(entradas=("periodo",), dependencias=("historial",))
+    def rendimientos(periodo, historial):
+        llamadas.append("rendimientos")
+        return f"{historial} {periodo}"
+
+    @secciones.nodo(entradas=("ticker", "comparables"))
+    def multiplos(ticker, comparables):
+        llamadas.append("multiplos")
+        return (ticker, *comparables)
+
+    return secciones
+
+
+def ejecutar(memoria, llamadas, ticker="AAPL", periodo="1y", comparables=("MSFT", "GOOG"), ttl=None):
+    # Cada ejecución del script crea un grafo nuevo sobre la misma memoria de sesión
+    secciones = armar_grafo(memoria, llamadas, ttl)
+    valores = dict(ticker=ticker, periodo=periodo, comparables=comparables)
+    return (secciones.valor("rendimientos", **valores), secciones.valor("multiplos", **valores)), secciones.recalculados
+
+
+def test_sin_cambios_no_recalcula():
+    memoria, llamadas = {}, []
+    primero, _ = ejecutar(memoria, llamadas)
+    segundo, recalculados = ejecutar(memoria, llamadas)
+    assert segundo == primero == ("precios AAPL 1y", ("AAPL", "MSFT", "GOOG"))
+    assert recalculados == []
+    assert llamadas == ["historial", "rendimientos", "multiplos"]
+
+
+def test_cambiar_comparable_rehace_solo_multiplos():
+    memoria, llamadas = {}, []
+    ejecutar(memoria, llamadas)
+    (_, multiplos), recalculados = ejecutar(memoria, llamadas, comparables=["MSFT", "AMZN"])
+    assert recalculados == ["multiplos"]
+    assert multiplos == ("AAPL", "MSFT", "AMZN")
+
+
+def test_listas_y_tuplas_son_la_misma_entrada():
+    memoria, llamadas = {}, []
+    ejecutar(memoria, llamadas, comparables=("MSFT", "GOOG"))
+    _, recalculados = ejecutar(memoria, llamadas, comparables=["MSFT", "GOOG"])
+    assert recalculados == []
+
+
+def test_cambiar_entrada_propia_no_toca_la_dependencia():
+    memoria, llamadas = {}, []
+    ejecutar(memoria, llamadas)
+    (rendimientos, _), recalculados = ejecutar(memoria, llamadas, periodo="5y")
+    assert recalculados == ["rendimientos"]
+    assert rendimientos == "precios AAPL 5y"
+
+
+def test_dependencia_recalculada_arrastra_a_sus_dependientes():
+    memoria, llamadas = {}, []
+    ejecutar(memoria, llamadas)
+    (rendimientos, multiplos), recalculados = ejecutar(memoria, llamadas, ticker="MSFT")
+    assert recalculados == ["historial", "rendimientos", "multiplos"]
+    assert rendimientos == "precios MSFT 1y"
+    assert multiplos == ("MSFT", "MSFT", "GOOG")
+
+
+def test_ttl_vencido_recalcula_el_nodo_y_sus_dependientes(monkeypatch):
+    memoria, llamadas = {}, []
+    reloj = [1000.0]
+    monkeypatch.setattr(grafo.time, "time", lambda: reloj[0])
+    ejecutar(memoria, llamadas, ttl=60)
+
+    reloj[0] += 59
+    _, recalculados = ejecutar(memoria, llamadas, ttl=60)
+    assert recalculados == []
+
+    reloj[0] += 2
+    _, recalculados = ejecutar(memoria, llamadas, ttl=60)
+    assert recalculados == ["historial", "rendimientos"]
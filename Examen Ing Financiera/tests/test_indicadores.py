@@ -0,0 +1,177 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import precios_aleatorios
+from indicadores import (DIAS_HABILES, EMAIncremental, IndicadoresEnVivo, MACDIncremental, RSIIncremental,
+                         VolatilidadIncremental, beta_movil, cagr, macd, rendimiento_movil, rendimientos_log, rsi,
+                         sharpe_movil, tabla_indicadores, volatilidad_movil)
+
+
+@pytest.fixture
+def cierres():
+    return precios_aleatorios(["AAA"], dias=1500)["AAA"]
+
+
+@pytest.fixture
+def matriz():
+    # Tickers que empiezan a cotizar en fechas distintas
+    precios = precios_aleatorios(["AAA", "BBB", "CCC"], dias=1500, semilla=3)
+    precios.iloc[:200, 1] = np.nan
+    precios.iloc[:900, 2] = np.nan
+    return precios
+
+
+def rsi_simple_en_bucle(cierres, ventana=14):
+    # Como en la app original, el primer día cuenta como cambio cero dentro de la ventana
+    cambios = np.diff(cierres.to_numpy(), prepend=cierres.iloc[0])
+    resultado = np.full(len(cambios), np.nan)
+    for i in range(ventana - 1, len(cambios)):
+        ventana_cambios = cambios[i - ventana + 1:i + 1]
+        ganancia = ventana_cambios[ventana_cambios > 0].sum()
+        perdida = -ventana_cambios[ventana_cambios < 0].sum()
+        with np.errstate(divide="ignore"):
+            resultado[i] = 100 - 100 / (1 + ganancia / perdida)
+    return resultado
+
+
+def test_rsi_coincide_con_bucle(cierres):
+    np.testing.assert_allclose(rsi(cierres), rsi_simple_en_bucle(cierres), rtol=1e-9)
+
+
+def test_tabla_indicadores_coincide_por_ticker(matriz):
+    tabla = tabla_indicadores(matriz)
+    for ticker in matriz.columns:
+        cierres = matriz[ticker].dropna()
+        linea, senal = macd(cierres)
+        fila = tabla.loc[ticker]
+        assert fila["RSI"] == pytest.approx(rsi_simple_en_bucle(cierres)[-1])
+        assert fila["MACD"] == pytest.approx(linea.iloc[-1])
+        assert fila["Señal MACD"] == pytest.approx(senal.iloc[-1])
+        assert fila["Volatilidad"] == pytest.approx(np.log(cierres).diff().std(ddof=0) * np.sqrt(252))
+        for años in (1, 3, 5):
+            inicio = cierres.loc[cierres.index[-1] - pd.Timedelta(days=365 * años):]
+            esperado = round(((inicio.iloc[-1] / inicio.iloc[0]) ** (1 / años) - 1) * 100, 2)
+            assert fila[f"CAGR {años} año(s)"] == pytest.approx(esperado)
+
+
+def test_cagr_sin_datos_suficientes(matriz):
+    matriz = matriz.copy()
+    matriz.iloc[:-1, 2] = np.nan
+    assert np.isnan(cagr(matriz, 1)["CCC"])
+    assert cagr(matriz["AAA"], 1) == cagr(matriz, 1)["AAA"]
+
+
+@pytest.fixture
+def con_huecos(matriz):
+    matriz = matriz.copy()
+    matriz.iloc[400:405, 0] = np.nan
+    return matriz
+
+
+def test_volatilidad_y_rendimiento_movil_coinciden_con_rolling(con_huecos):
+    r = np.log(con_huecos / con_huecos.shift(1))
+    volatilidad = volatilidad_movil(con_huecos, (21, 252))
+    rendimiento = rendimiento_movil(con_huecos, (21, 252))
+    for ventana in (21, 252):
+        movil = r.rolling(ventana, min_periods=ventana)
+        np.testing.assert_allclose(volatilidad[ventana], movil.std(ddof=0) * np.sqrt(252), atol=1e-10)
+        np.testing.assert_allclose(rendimiento[ventana], np.expm1(movil.mean() * 252), atol=1e-10)
+
+
+def test_sharpe_movil_coincide_con_rolling(con_huecos):
+    r = np.log(con_huecos["AAA"] / con_huecos["AAA"].shift(1))
+    sharpe = sharpe_movil(con_huecos["AAA"], (63,), rf=0.02)
+    movil = r.rolling(63, min_periods=63)
+    esperado = (movil.mean() * 252 - 0.02) / (movil.std(ddof=0) * np.sqrt(252))
+    np.testing.assert_allclose(sharpe[63], esperado, rtol=1e-7)
+
+
+def test_beta_movil_coincide_con_rolling(con_huecos):
+    referencia = precios_aleatorios(["REF"], dias=1500, semilla=4)["REF"]
+    beta = beta_movil(con_huecos, referencia, (126,))
+    r_ref = np.log(referencia / referencia.shift(1))
+    for ticker in con_huecos.columns:
+        r = np.log(con_huecos[ticker] / con_huecos[ticker].shift(1))
+        esperado = r.rolling(126, min_periods=126).cov(r_ref) / r_ref.where(r.notna()).rolling(126).var()
+        np.testing.assert_allclose(beta[126][ticker], esperado, rtol=1e-7)
+
+
+def serie_incremental(indicador, cierres):
+    return np.array([indicador.actualizar(p) for p in cierres], dtype=float)
+
+
+def test_ema_incremental(cierres):
+    esperado = cierres.ewm(span=20, adjust=False).mean()
+    np.testing.assert_allclose(serie_incremental(EMAIncremental(20), cierres), esperado, rtol=1e-12)
+
+
+def test_macd_incremental(cierres):
+    linea, senal = macd(cierres)
+    indicador = MACDIncremental()
+    valores = np.array([indicador.actualizar(p) for p in cierres])
+    np.testing.assert_allclose(valores[:, 0], linea, atol=1e-10)
+    np.testing.assert_allclose(valores[:, 1], senal, atol=1e-10)
+
+
+@pytest.mark.parametrize("metodo", ["simple", "wilder"])
+def test_rsi_incremental(cierres, metodo):
+    esperado = rsi(cierres, 14, metodo)
+    np.testing.assert_allclose(serie_incremental(RSIIncremental(14, metodo), cierres), esperado, atol=1e-8)
+
+
+@pytest.mark.parametrize("ventana", [None, 63])
+def test_volatilidad_incremental(cierres, ventana):
+    rendimientos = rendimientos_log(cierres)
+    movil = rendimientos.expanding() if ventana is None else rendimientos.rolling(ventana)
+    esperado = movil.std(ddof=0) * np.sqrt(DIAS_HABILES)
+    obtenido = serie_incremental(VolatilidadIncremental(ventana), cierres)
+    np.testing.assert_allclose(obtenido[1:], esperado[1:], rtol=1e-9)
+
+
+def test_estado_se_restaura_y_sigue(cierres):
+    indicador = RSIIncremental(14)
+    for p in cierres.iloc[:700]:
+        indicador.actualizar(p)
+    restaurado = RSIIncremental.desde_estado(indicador.estado())
+    for p in cierres.iloc[700:]:
+        indicador.actualizar(p)
+        assert restaurado.actualizar(p) == indicador.valor
+
+
+def test_indicadores_en_vivo_avanzan_por_barra(cierres):
+    # Instantánea al cierre de ayer, barras nuevas una a una y la cotización de hoy
+    indicadores = IndicadoresEnVivo().avanzar(cierres.iloc[:1000])
+    for fin in range(1001, 1010):
+        indicadores = IndicadoresEnVivo.desde_estado(indicadores.estado()).avanzar(cierres.iloc[:fin])
+    assert indicadores.fecha == cierres.index[1008]
+
+    precio = cierres.iloc[1008] * 1.02
+    con_hoy = pd.concat([cierres.iloc[:1009], pd.Series([precio], index=[cierres.index[1009]])])
+    linea, senal = macd(con_hoy)
+    vivos = indicadores.con_precio(precio)
+    assert vivos["RSI"] == pytest.approx(rsi(con_hoy).iloc[-1])
+    assert vivos["MACD"] == pytest.approx(linea.iloc[-1])
+    assert vivos["Señal"] == pytest.approx(senal.iloc[-1])
+    esperado = rendimientos_log(con_hoy).rolling(DIAS_HABILES).std(ddof=0).iloc[-1] * np.sqrt(DIAS_HABILES)
+    assert vivos["Volatilidad"] == pytest.approx(esperado)
+    # Evaluar una cotización no cambia el estado guardado
+    assert indicadores.fecha == cierres.index[1008]
+
+
+def test_indicadores_en_vivo_solo_con_las_barras_nuevas(cierres):
+    # Como en la página: cada refresco recibe solo los cierres desde el último visto
+    completo = IndicadoresEnVivo().avanzar(cierres)
+    indicadores = IndicadoresEnVivo().avanzar(cierres.iloc[:1000])
+    for fin in [*range(1003, len(cierres), 3), len(cierres)]:
+        cola = cierres.iloc[cierres.index.searchsorted(indicadores.fecha):fin]
+        assert indicadores.sigue(cola)
+        indicadores = IndicadoresEnVivo.desde_estado(indicadores.estado()).avanzar(cola)
+    assert indicadores.fecha == completo.fecha
+    assert indicadores.con_precio(101.0) == pytest.approx(completo.con_precio(101.0))
+
+
+def test_indicadores_en_vivo_detectan_ajuste(cierres):
+    indicadores = IndicadoresEnVivo().avanzar(cierres.iloc[:500])
+    assert indicadores.sigue(cierres)
+    assert not indicadores.sigue(cierres * 0.98)
@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import matriz_universo
+from conftest import precios_aleatorios
+from datos import matriz_cierres
+from matriz_universo import MatrizUniverso, abrir_matriz, escribir_matriz, leer_cierres
+
+
+def historiales_aleatorios(tickers, dias=900, semilla=0):
+    precios = precios_aleatorios(tickers, dias, semilla)
+    # Fechas de Yahoo: en nanosegundos y con la zona de la bolsa
+    precios.index = precios.index.tz_localize("America/New_York").as_unit("ns")
+    # Un ticker que empieza a cotizar más tarde
+    precios.iloc[:300, -1] = np.nan
+    volumen = np.random.default_rng(semilla).integers(1_000, 1_000_000, size=precios.shape)
+    return {
+        t: pd.DataFrame({"Close": precios[t], "Volume": volumen[:, i].astype(float)}).dropna()
+        for i, t in enumerate(tickers)
+    }
+
+
+@pytest.fixture
+def historiales():
+    return historiales_aleatorios(["AAA", "BBB", "CCC"])
+
+
+@pytest.mark.parametrize("periodo", ["max", "5d", "1y", "3y"])
+def test_tabla_coincide_con_matriz_cierres(tmp_path, historiales, periodo):
+    matriz = escribir_matriz(historiales, tmp_path)
+    for columna in ("Close", "Volume"):
+        esperado = matriz_cierres(historiales, periodo, columna).astype(np.float32)
+        pd.testing.assert_frame_equal(matriz.tabla(periodo=periodo, columna=columna), esperado, check_freq=False)
+    pd.testing.assert_frame_equal(
+        matriz.tabla(["ccc", "AAA"], periodo),
+        matriz_cierres(historiales, periodo)[["CCC", "AAA"]].astype(np.float32).dropna(how="all"),
+        check_freq=False,
+    )
+
+
+def test_tabla_completa_es_una_vista(tmp_path, historiales):
+    matriz = escribir_matriz(historiales, tmp_path)
+    assert np.shares_memory(matriz.tabla().to_numpy(), matriz.datos["Close"])
+
+
+def test_version_anterior_se_conserva_hasta_la_siguiente(tmp_path, historiales):
+    primera = escribir_matriz(historiales, tmp_path)
+    segunda = escribir_matriz(historiales_aleatorios(["AAA", "BBB"], semilla=1), tmp_path)
+    # Quien leyó el índice viejo todavía puede abrir sus archivos
+    indice_viejo = {"version": primera.version, "creado": primera.creado, "tickers": list(primera.tickers),
+                    "fechas": primera.fechas.as_unit("ns").asi8.tolist(), "zona": "America/New_York",
+                    "forma": [len(primera.fechas), len(primera)]}
+    reabierta = MatrizUniverso(tmp_path, indice_viejo)
+    pd.testing.assert_frame_equal(reabierta.tabla(), primera.tabla())
+    assert abrir_matriz(tmp_path).version == segunda.version
+
+    escribir_matriz(historiales, tmp_path)
+    assert not list(tmp_path.glob(f"*.{primera.version}.f32"))
+    assert len(list(tmp_path.glob(f"*.{segunda.version}.f32"))) == 2
+
+
+def test_leer_cierres_mezcla_fuentes_hasta_la_fecha_comun(tmp_path, monkeypatch, historiales):
+    matriz = escribir_matriz({t: h.iloc[:-5] for t, h in historiales.items() if t != "CCC"}, tmp_path)
+    pedidos = []
+
+    def obtener_historiales(tickers):
+        pedidos.append(list(tickers))
+        return {t: historiales[t] for t in tickers}, {}
+
+    monkeypatch.setattr(matriz_universo, "obtener_historiales", obtener_historiales)
+    cierres, errores = leer_cierres(["aaa", "CCC", "BBB"], matriz)
+
+    assert pedidos == [["CCC"]] and errores == {}
+    assert list(cierres.columns) == ["AAA", "CCC", "BBB"]
+    assert cierres.dtypes.eq(np.float32).all()
+    # La matriz termina 5 días antes que el historial de CCC: nadie queda con una cola más larga
+    assert cierres.index[-1] == matriz.fechas[-1]
+    esperado = matriz_cierres(historiales, "max").loc[:matriz.fechas[-1], ["AAA", "CCC", "BBB"]].astype(np.float32)
+    pd.testing.assert_frame_equal(cierres, esperado, check_freq=False)
+
+
+def test_leer_cierres_ignora_una_matriz_vencida(tmp_path, monkeypatch, historiales):
+    matriz = escribir_matriz(historiales, tmp_path)
+    monkeypatch.setattr(matriz_universo, "TTL_MATRIZ", 0)
+    monkeypatch.setattr(matriz_universo, "obtener_historiales", lambda tickers: ({t: historiales[t] for t in tickers}, {}))
+    cierres, _ = leer_cierres(["AAA", "BBB"], matriz)
+    pd.testing.assert_frame_equal(cierres, matriz_cierres(historiales, "max")[["AAA", "BBB"]].astype(np.float32),
+                                  check_freq=False)
@@ -0,0 +1,53 @@
+import json
+import socket
+from urllib.request import urlopen
+
+import pytest
+
+import metricas
+from metricas import Metricas
+
+
+def _puerto_libre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def servidor(monkeypatch):
+    monkeypatch.setattr(metricas, "_servidor", None)
+    creados = []
+
+    def iniciar(**kwargs):
+        creados.append(metricas.iniciar_servidor(puerto=_puerto_libre(), **kwargs))
+        return creados[-1]
+
+    yield iniciar
+    for creado in creados:
+        creado.shutdown()
+        creado.server_close()
+
+
+def test_sin_puerto_no_hay_servidor(monkeypatch):
+    monkeypatch.setattr(metricas, "_servidor", None)
+    assert metricas.iniciar_servidor(puerto=0) is None
+
+
+def test_servidor_escucha_solo_en_localhost(servidor):
+    host, puerto = servidor().server_address
+    assert host == "127.0.0.1"
+    datos = json.loads(urlopen(f"http://127.0.0.1:{puerto}/metrics.json", timeout=5).read())
+    assert set(datos) >= {"solicitudes", "caches", "secciones"}
+
+
+def test_host_configurable(servidor):
+    assert servidor(host="0.0.0.0").server_address[0] == "0.0.0.0"
+
+
+def test_registro_de_solicitudes():
+    registro = Metricas()
+    registro.registrar_solicitud("yahoo", "historial", "AAA", 0.2, 100)
+    registro.registrar_solicitud("yahoo", "historial", "BBB", 0.4, error=True)
+    assert "analisis_financiero" in registro.como_prometheus()
+    assert json.loads(registro.como_json())["tickers"]["BBB"]
@@ -0,0 +1,141 @@
+import threading
+import time
+
+import pytest
+import requests
+import yfinance as yf
+
+import planificador
+from planificador import CuboTokens, Planificador, SolicitudesAgotadasError
+
+
+class Reloj:
+    """Reloj falso: ``sleep`` no bloquea, solo adelanta ``monotonic``."""
+
+    def __init__(self):
+        self.ahora = 0.0
+        self.esperas = []
+
+    def monotonic(self):
+        return self.ahora
+
+    def sleep(self, segundos):
+        self.esperas.append(segundos)
+        self.ahora += segundos
+
+
+@pytest.fixture
+def reloj(monkeypatch):
+    falso = Reloj()
+    monkeypatch.setattr(planificador, "time", falso)
+    return falso
+
+
+def error_429():
+    respuesta = requests.Response()
+    respuesta.status_code = 429
+    return requests.exceptions.HTTPError("429 Too Many Requests", response=respuesta)
+
+
+def falla_veces(n, error=error_429):
+    llamadas = []
+
+    def funcion():
+        llamadas.append(1)
+        if len(llamadas) <= n:
+            raise error()
+        return "ok"
+    return funcion, llamadas
+
+
+def test_reintenta_429_con_espera_acotada(reloj):
+    cola = Planificador(tasa=100, rafaga=100, max_reintentos=4, espera_base=1.0, espera_maxima=30.0)
+    funcion, llamadas = falla_veces(2)
+    assert cola.ejecutar("historial", funcion) == "ok"
+    assert len(llamadas) == 3
+    assert len(reloj.esperas) == 2
+    assert 0 <= reloj.esperas[0] <= 1.0 and 0 <= reloj.esperas[1] <= 2.0
+
+
+def test_limite_de_yfinance_tambien_se_reintenta(reloj):
+    cola = Planificador(tasa=100, rafaga=100, max_reintentos=2)
+    funcion, llamadas = falla_veces(1, yf.exceptions.YFRateLimitError)
+    assert cola.ejecutar("info", funcion) == "ok"
+    assert len(llamadas) == 2
+
+
+def test_otros_errores_no_se_reintentan(reloj):
+    cola = Planificador(tasa=100, rafaga=100)
+    funcion, llamadas = falla_veces(1, lambda: ValueError("ticker inválido"))
+    with pytest.raises(ValueError):
+        cola.ejecutar("historial", funcion)
+    assert len(llamadas) == 1
+    assert reloj.esperas == []
+
+
+def test_presupuesto_agotado(reloj):
+    cola = Planificador(tasa=100, rafaga=100, max_reintentos=3)
+    funcion, llamadas = falla_veces(10)
+    with pytest.raises(SolicitudesAgotadasError) as error:
+        cola.ejecutar("historial", funcion)
+    assert len(llamadas) == 4
+    assert len(reloj.esperas) == 3
+    assert isinstance(error.value.__cause__, requests.exceptions.HTTPError)
+
+
+def test_espera_con_jitter_completo():
+    cola = Planificador(espera_base=1.0, espera_maxima=30.0)
+    for intento in range(10):
+        tope = min(30.0, 2.0 ** intento)
+        esperas = [cola.espera_reintento(intento) for _ in range(200)]
+        assert all(0 <= e <= tope for e in esperas)
+        assert max(esperas) > tope / 2
+
+
+def test_cubo_de_tokens(reloj):
+    cubo = CuboTokens(tasa=2.0, capacidad=3)
+    for _ in range(3):
+        cubo.tomar()
+    assert reloj.esperas == []
+    # Sin ráfaga disponible, cada token espera 1 / tasa
+    for _ in range(4):
+        cubo.tomar()
+    assert reloj.ahora == pytest.approx(2.0)
+    # Tras un rato sin pedir, la ráfaga vuelve, pero solo hasta la capacidad
+    reloj.ahora += 60
+    esperas = len(reloj.esperas)
+    for _ in range(3):
+        cubo.tomar()
+    assert len(reloj.esperas) == esperas
+    cubo.tomar()
+    assert len(reloj.esperas) == esperas + 1
+
+
+def test_concurrencia_por_endpoint():
+    cola = Planificador(tasa=1000, rafaga=1000, limites={"historial": 2, "info": 1})
+    activas = {"historial": 0, "info": 0}
+    maximas = {"historial": 0, "info": 0}
+    lock = threading.Lock()
+
+    def funcion(endpoint):
+        with lock:
+            activas[endpoint] += 1
+            maximas[endpoint] = max(maximas[endpoint], activas[endpoint])
+        time.sleep(0.02)
+        with lock:
+            activas[endpoint] -= 1
+
+    hilos = [threading.Thread(target=cola.ejecutar, args=(e, funcion, e)) for e in ["historial", "info"] * 6]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    assert maximas == {"historial": 2, "info": 1}
+
+
+def test_error_libera_el_semaforo(reloj):
+    cola = Planificador(tasa=100, rafaga=100, max_reintentos=1, limites={"info": 1})
+    with pytest.raises(SolicitudesAgotadasError):
+        cola.ejecutar("info", falla_veces(10)[0])
+    # Si el semáforo hubiera quedado tomado, esta llamada no terminaría
+    assert cola.ejecutar("info", lambda: "ok") == "ok"
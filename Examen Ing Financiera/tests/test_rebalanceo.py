@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import precios_aleatorios
+from covarianza import estimar_covarianza
+from frontera import frontera_optima
+from rebalanceo import CARTERAS, fechas_rebalanceo, walk_forward
+
+VENTANA = 126
+PUNTOS_FRONTERA = 10
+PERIODOS = {"mensual": "M", "trimestral": "Q"}
+
+
+@pytest.fixture
+def precios():
+    return precios_aleatorios(["AAA", "BBB", "CCC", "DDD"], dias=600, semilla=5)
+
+
+def walk_forward_en_bucle(precios, frecuencia, rf, cota_max, costo):
+    """Referencia directa: estima desde cero en cada rebalanceo, toma los tres
+    portafolios de la frontera completa y valúa día por día."""
+    primeros = precios.index.to_series().groupby(precios.index.to_period(PERIODOS[frecuencia])).first()
+    inicios = [precios.index.get_loc(fecha) for fecha in primeros if precios.index.get_loc(fecha) >= VENTANA]
+
+    tenencias = np.zeros((len(CARTERAS), precios.shape[1]))
+    valor = np.ones(len(CARTERAS))
+    valores = {}
+    for d in range(inicios[0], len(precios)):
+        if d > inicios[0]:
+            tenencias = tenencias * (precios.iloc[d] / precios.iloc[d - 1]).to_numpy()
+            valor = tenencias.sum(axis=1)
+        valores[precios.index[d]] = valor
+        if d in inicios:
+            media, cov = estimar_covarianza(precios.iloc[d - VENTANA:d + 1], "muestral", usar_cache=False)
+            df, pesos = frontera_optima(media, cov, n_puntos=PUNTOS_FRONTERA, rf=rf, cota_max=cota_max)
+            objetivo = np.vstack([pesos[df["Sharpe Ratio"].idxmax()], pesos[df["Volatilidad"].idxmin()],
+                                  pesos[df["Rendimiento"].idxmax()], np.full(precios.shape[1], 0.25)])
+            actuales = tenencias / np.maximum(valor[:, None], 1e-300)
+            valor = valor * (1 - costo * np.abs(objetivo - actuales).sum(axis=1))
+            tenencias = objetivo * valor[:, None]
+    return pd.DataFrame(valores, index=CARTERAS).T
+
+
+@pytest.mark.parametrize("frecuencia", ["mensual", "trimestral"])
+def test_fechas_rebalanceo_son_el_primer_dia_de_cada_periodo(precios, frecuencia):
+    periodo = precios.index.to_period(PERIODOS[frecuencia])
+    esperado = [i for i in range(len(precios)) if i == 0 or periodo[i] != periodo[i - 1]]
+    assert list(fechas_rebalanceo(precios.index, frecuencia)) == esperado
+
+
+@pytest.mark.parametrize("frecuencia,cota_max", [("mensual", 1.0), ("trimestral", 0.4)])
+def test_coincide_con_bucle_directo(precios, frecuencia, cota_max):
+    valores, pesos, rotacion = walk_forward(precios, ventana=VENTANA, frecuencia=frecuencia, metodo="muestral",
+                                            rf=0.02, cota_max=cota_max, costo=0.002)
+    esperado = walk_forward_en_bucle(precios, frecuencia, rf=0.02, cota_max=cota_max, costo=0.002)
+    pd.testing.assert_frame_equal(valores, esperado, check_freq=False, check_names=False, rtol=1e-6)
+    np.testing.assert_allclose(rotacion.iloc[0], 1)
+    for cartera in CARTERAS:
+        np.testing.assert_allclose(pesos[cartera].sum(axis=1), 1, rtol=1e-6)
+        assert (pesos[cartera] <= cota_max + 1e-6).all().all()
+
+
+def test_no_mira_al_futuro(precios):
+    corte = 400
+    alterados = precios.copy()
+    alterados.iloc[corte + 1:] *= np.linspace(1, 3, len(precios) - corte - 1)[:, None] ** np.arange(1, 5)
+    originales = walk_forward(precios, ventana=VENTANA, metodo="muestral")
+    cambiados = walk_forward(alterados, ventana=VENTANA, metodo="muestral")
+
+    fecha_corte = precios.index[corte]
+    pd.testing.assert_frame_equal(originales[0].loc[:fecha_corte], cambiados[0].loc[:fecha_corte])
+    for cartera in CARTERAS:
+        pd.testing.assert_frame_equal(originales[1][cartera].loc[:fecha_corte],
+                                      cambiados[1][cartera].loc[:fecha_corte])
+
+
+def test_activo_sin_historial_suficiente_queda_fuera(precios):
+    precios = precios.copy()
+    precios.iloc[:300, 3] = np.nan
+    _, pesos, _ = walk_forward(precios, ventana=VENTANA, metodo="muestral")
+    # Sus primeros 60 rendimientos llegan en la fila 360
+    for cartera in CARTERAS:
+        assert (pesos[cartera]["DDD"].loc[:precios.index[359]] == 0).all()
+    assert pesos["Pesos iguales"]["DDD"].loc[precios.index[360]:].eq(0.25).all()
@@ -0,0 +1,103 @@
+import io
+import re
+
+import numpy as np
+import pandas as pd
+import pytest
+from bs4 import BeautifulSoup
+
+import reportes
+from conftest import precios_aleatorios
+from datos import recortar_periodo
+from reportes import _hoja_series, avance_reporte, encolar_reporte, esperar_reporte
+
+
+def historial_falso(ticker, semilla, zona=None):
+    cierres = precios_aleatorios([ticker], dias=1600, semilla=semilla, inicio="2019-01-01")[ticker]
+    historial = pd.DataFrame({"Open": cierres * 0.99, "High": cierres * 1.01, "Low": cierres * 0.98,
+                              "Close": cierres, "Volume": 1e6})
+    # Yahoo entrega las fechas con la zona de la bolsa
+    return historial.tz_localize(zona) if zona else historial
+
+
+@pytest.fixture(autouse=True)
+def proveedor_falso(monkeypatch):
+    """Sin red: dos tickers con historial (uno con zona horaria) y uno que falla."""
+    historiales = {"AAA": historial_falso("AAA", 1, "America/New_York"), "BBB": historial_falso("BBB", 2)}
+
+    def historial_periodo(ticker, periodo, ajustado=True):
+        if ticker not in historiales:
+            raise ValueError(f"No hay historial de precios para {ticker}.")
+        return recortar_periodo(historiales[ticker], periodo)
+
+    def obtener_info(ticker):
+        return {"longName": f"Empresa {ticker}", "sector": "Technology", "trailingPE": 20.5,
+                "priceToBook": 3.1, "enterpriseToEbitda": 12.0, "longBusinessSummary": "Hace <cosas> & más."}
+
+    monkeypatch.setattr(reportes, "historial_periodo", historial_periodo)
+    monkeypatch.setattr(reportes, "obtener_info", obtener_info)
+    monkeypatch.setattr(reportes, "obtener_multiplos", lambda t: {"Ticker": t, **{
+        m: obtener_info(t).get(c) for m, c in reportes.MULTIPLOS.items()}})
+    monkeypatch.setattr(reportes, "cargar_indice", lambda: None)
+
+
+def generar(formatos):
+    id_ = encolar_reporte(["aaa", "BBB ", "ZZZ", "AAA"], formatos, periodo="1y")
+    avance = esperar_reporte(id_, intervalo=0.01)
+    assert avance["estado"] == "Listo"
+    assert avance["tickers"] == ["AAA", "BBB", "ZZZ"]
+    assert avance["completados"] == avance["total"] == 3
+    assert list(avance["errores"]) == ["ZZZ"]
+    return avance
+
+
+def test_html():
+    avance = generar(["html"])
+    pagina = BeautifulSoup(avance["archivos"]["html"].decode("utf-8"), "html.parser")
+    filas = pagina.find("table").find("tbody").find_all("tr")
+    assert [fila.th.get_text() for fila in filas] == ["AAA", "BBB"]
+    assert filas[0].td.get_text() == "Empresa AAA"
+    assert "ZZZ" in pagina.get_text()
+    # El texto del proveedor se escapa
+    assert "Hace <cosas> & más." in pagina.get_text()
+    assert not pagina.find("cosas")
+
+
+def test_pdf():
+    contenido = generar(["pdf"])["archivos"]["pdf"]
+    assert contenido.startswith(b"%PDF-") and contenido.rstrip().endswith(b"%%EOF")
+    # Resumen, una página por ticker y la de errores
+    assert len(re.findall(rb"/Type\s*/Page\b", contenido)) == 4
+
+
+def test_xlsx():
+    pytest.importorskip("openpyxl")
+    libro = pd.read_excel(io.BytesIO(generar(["xlsx"])["archivos"]["xlsx"]), sheet_name=None, index_col=0)
+    assert list(libro) == ["Resumen", "Múltiplos", "AAA", "BBB", "Errores"]
+    assert list(libro["Resumen"].index) == ["AAA", "BBB"]
+    assert {"Cierre", "RSI", "MACD", "Señal MACD"} <= set(libro["AAA"].columns)
+    assert len(libro["AAA"]) > 200
+
+
+def test_sin_openpyxl_los_demas_formatos_siguen(monkeypatch):
+    monkeypatch.setattr(reportes, "XLSX_DISPONIBLE", False)
+    avance = generar(["html", "xlsx"])
+    assert list(avance["archivos"]) == ["html"]
+    assert "openpyxl" in avance["errores_formato"]["xlsx"]
+
+
+@pytest.mark.parametrize("zona", [None, "America/New_York"])
+def test_hoja_series_sin_zona_horaria(zona):
+    series = historial_falso("AAA", 1, zona)[["Close"]].iloc[:5]
+    hoja = _hoja_series(series)
+    assert hoja.index.tz is None
+    assert list(hoja.columns) == ["Cierre"]
+    np.testing.assert_array_equal(hoja.index, series.index.tz_localize(None))
+
+
+def test_formatos_y_tickers_invalidos():
+    with pytest.raises(ValueError):
+        encolar_reporte([" ", ""])
+    with pytest.raises(ValueError):
+        encolar_reporte(["AAA"], ["docx"])
+    assert avance_reporte("no-existe") is None
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+from scipy.stats import norm
+
+from conftest import precios_aleatorios
+from covarianza import estimar_covarianza
+from riesgo import simular_rendimientos, tabla_riesgo, tabla_riesgo_activo, var_cvar, var_historico, var_parametrico
+
+
+def test_var_cvar_de_una_muestra_ordenada():
+    rendimientos = np.linspace(-0.10, 0.09, 20)  # -10%, -9%, ..., 9%
+    var, cvar = var_cvar(rendimientos, nivel=0.90)
+    corte = np.quantile(rendimientos, 0.10)
+    assert var == pytest.approx(-corte)
+    assert cvar == pytest.approx(-np.mean([r for r in rendimientos if r <= corte]))
+
+
+def test_historico_con_un_bucle(precios):
+    pesos = np.array([0.4, 0.3, 0.2, 0.1])
+    horizonte = 5
+    valores = precios.to_numpy()
+    rendimientos = [(valores[i + horizonte] / valores[i] - 1) @ pesos for i in range(len(valores) - horizonte)]
+    assert var_historico(precios, pesos, 0.95, horizonte) == pytest.approx(var_cvar(rendimientos, 0.95))
+
+
+def test_parametrico_con_scipy(precios):
+    pesos = np.array([0.25, 0.25, 0.25, 0.25])
+    media, cov = estimar_covarianza(precios, "muestral", usar_cache=False)
+    mu = pesos @ media * 10 / 252
+    sigma = np.sqrt(pesos @ cov @ pesos * 10 / 252)
+    var, cvar = var_parametrico(media, cov, pesos, 0.99, 10)
+    assert var == pytest.approx(-norm.ppf(0.01, mu, sigma))
+    assert cvar == pytest.approx(-(mu - sigma * norm.pdf(norm.ppf(0.01)) / 0.01))
+
+
+def test_gbm_se_acerca_al_parametrico(precios):
+    pesos = np.array([0.25, 0.25, 0.25, 0.25])
+    media, cov = estimar_covarianza(precios, "muestral", usar_cache=False)
+    simulado = var_cvar(simular_rendimientos(pesos, media, cov, horizonte=1, n_trayectorias=200_000, semilla=0))
+    np.testing.assert_allclose(simulado, var_parametrico(media, cov, pesos), rtol=0.03)
+
+
+def test_simulacion_igual_en_serie_y_en_procesos(precios):
+    pesos = np.array([0.25, 0.25, 0.25, 0.25])
+    serie = simular_rendimientos(pesos, precios=precios, horizonte=5, n_trayectorias=30_000, metodo="bootstrap",
+                                 semilla=7, procesos=0)
+    repartido = simular_rendimientos(pesos, precios=precios, horizonte=5, n_trayectorias=30_000, metodo="bootstrap",
+                                     semilla=7, procesos=2)
+    np.testing.assert_array_equal(serie, repartido)
+
+
+def test_riesgo_activo_distinto_por_ticker():
+    # Cada ticker con su propia serie: la caché de covarianzas no debe mezclar sus estimaciones
+    fechas = precios_aleatorios(["X"]).index
+    tablas = {}
+    for semilla, ticker in enumerate(["AAA", "BBB"], start=1):
+        cierres = precios_aleatorios([ticker], semilla=semilla)[ticker]
+        assert cierres.index.equals(fechas)
+        tablas[ticker] = tabla_riesgo_activo(cierres, 0.95, 1, 10_000, semilla=0)
+
+        precios = cierres.to_frame()
+        media, cov = estimar_covarianza(precios, "muestral", usar_cache=False)
+        referencia = tabla_riesgo(precios, [1.0], media, cov, 0.95, 1, 10_000, semilla=0)
+        np.testing.assert_allclose(tablas[ticker], referencia)
+
+    assert not np.allclose(tablas["AAA"].loc["Paramétrico (normal)"], tablas["BBB"].loc["Paramétrico (normal)"])
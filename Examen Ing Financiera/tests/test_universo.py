@@ -0,0 +1,82 @@
+import threading
+
+import pandas as pd
+import pytest
+
+import universo
+from universo import ARCHIVO_INCLUIDO, cargar_universo
+
+
+@pytest.fixture(autouse=True)
+def estado_limpio(monkeypatch):
+    monkeypatch.setattr(universo, "_universo", None)
+    monkeypatch.setattr(universo, "_renovacion", None)
+    monkeypatch.setattr(universo, "_ultimo_intento", 0.0)
+
+
+def tabla(*tickers):
+    return pd.DataFrame({"Nombre": [f"Empresa {t}" for t in tickers], "Sector": "Energy"},
+                        index=pd.Index(tickers, name="Ticker"))
+
+
+def test_copia_incluida():
+    incluido = pd.read_parquet(ARCHIVO_INCLUIDO)
+    assert list(incluido.columns) == ["Nombre", "Sector"]
+    assert incluido.index.is_unique and incluido.index.is_monotonic_increasing
+    assert len(incluido) > 490
+    assert {"AAPL", "MSFT", "BRK-B"} <= set(incluido.index)
+
+
+def test_renovacion_no_bloquea_la_carga(tmp_path, monkeypatch):
+    archivo = tmp_path / "universo.parquet"
+    soltar, llamadas = threading.Event(), []
+
+    def actualizar(destino):
+        llamadas.append(destino)
+        assert soltar.wait(5)
+        tabla("AAA", "SPY").to_parquet(destino)
+
+    monkeypatch.setattr(universo, "actualizar_universo", actualizar)
+    # Mientras la descarga sigue en curso, cada carga responde al instante con la copia incluida
+    for _ in range(3):
+        assert "AAPL" in cargar_universo(archivo)
+    assert llamadas == [archivo]
+
+    hilo = universo._renovacion
+    soltar.set()
+    hilo.join(5)
+    nuevo = cargar_universo(archivo)
+    assert "SPY" in nuevo and "AAPL" not in nuevo
+    assert llamadas == [archivo]
+
+
+def test_fallo_espera_antes_de_reintentar(tmp_path, monkeypatch):
+    llamadas = []
+
+    def actualizar(destino):
+        llamadas.append(destino)
+        raise ConnectionError("sin red")
+
+    monkeypatch.setattr(universo, "actualizar_universo", actualizar)
+    reloj = [1000.0]
+    monkeypatch.setattr(universo.time, "time", lambda: reloj[0])
+    archivo = tmp_path / "universo.parquet"
+
+    cargar_universo(archivo)
+    universo._renovacion.join(5)
+    reloj[0] += universo.ESPERA_REINTENTO - 1
+    assert "AAPL" in cargar_universo(archivo)
+    assert len(llamadas) == 1
+
+    reloj[0] += 1
+    cargar_universo(archivo)
+    universo._renovacion.join(5)
+    assert len(llamadas) == 2
+
+
+def test_copia_local_vigente_no_se_renueva(tmp_path, monkeypatch):
+    archivo = tmp_path / "universo.parquet"
+    tabla("AAA").to_parquet(archivo)
+    monkeypatch.setattr(universo, "actualizar_universo", lambda destino: pytest.fail("no debía renovarse"))
+    assert list(cargar_universo(archivo).opciones) == ["AAA"]
+    assert universo._renovacion is None
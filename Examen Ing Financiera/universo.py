@@ -0,0 +1,162 @@
+# -------- Universo local de tickers --------
+# Tabla de símbolos del S&P 500 (y opcionalmente otros, desde un CSV propio)
+# con nombre y sector. Validar un ticker pasa a ser una búsqueda en un conjunto
+# en memoria y la barra lateral autocompleta sobre símbolos y nombres, así que
+# un error de tipeo no llega nunca a Yahoo. El repositorio incluye una copia
+# de la tabla (universo.parquet) para arrancar sin red; la copia local se
+# renueva cada TTL_UNIVERSO en un hilo aparte, nunca en el hilo del script.
+# También desde la consola:
+#
+#   python universo.py                              # S&P 500 actual
+#   python universo.py --extra mis_tickers.csv      # + columnas Ticker, Nombre, Sector
+#   python universo.py --archivo universo.parquet   # regenera la copia incluida
+
+import argparse
+import difflib
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from datos import DIRECTORIO_ALMACEN
+from indice_fundamentales import cargar_indice, constituyentes_sp500, version_indice
+
+ARCHIVO_UNIVERSO = Path(os.environ.get("UNIVERSO_TICKERS", DIRECTORIO_ALMACEN / "universo.parquet"))
+# Copia incluida en el repositorio, usada hasta que exista la local
+ARCHIVO_INCLUIDO = Path(__file__).parent / "universo.parquet"
+# CSV opcional con más símbolos (columnas Ticker, Nombre, Sector)
+ARCHIVO_EXTRA = os.environ.get("UNIVERSO_EXTRA")
+
+TTL_UNIVERSO = int(os.environ.get("TTL_UNIVERSO", 7 * 24 * 60 * 60))
+# Tras un intento fallido de renovación no se vuelve a intentar antes de esto
+ESPERA_REINTENTO = 10 * 60
+
+_lock = threading.Lock()
+_universo = None          # (versión de la tabla de origen, Universo)
+_renovacion = None        # hilo de la renovación en curso
+_ultimo_intento = 0.0
+
+
+class Universo:
+
+    def __init__(self, tabla):
+        self.tabla = tabla
+        self.simbolos = frozenset(tabla.index)
+        self.opciones = list(tabla.index)
+        self._etiquetas = {
+            ticker: f"{ticker} · {nombre}" if pd.notna(nombre) else ticker
+            for ticker, nombre in tabla["Nombre"].items()
+        }
+        self._nombres = {ticker: str(nombre).upper() for ticker, nombre in tabla["Nombre"].dropna().items()}
+
+    def __contains__(self, ticker):
+        return ticker.upper().strip() in self.simbolos
+
+    def __len__(self):
+        return len(self.simbolos)
+
+    def etiqueta(self, ticker):
+        """Texto de la opción en el autocompletado: símbolo y nombre de la empresa."""
+        return self._etiquetas.get(ticker, ticker)
+
+    def buscar(self, texto, limite=8):
+        """Símbolos que mejor coinciden con ``texto``: primero por prefijo del
+        símbolo, luego por el nombre de la empresa y por último por parecido."""
+        texto = texto.upper().strip()
+        if not texto:
+            return []
+
+        encontrados = [t for t in self.opciones if t.startswith(texto)]
+        encontrados += [t for t, nombre in self._nombres.items() if texto in nombre]
+        encontrados += difflib.get_close_matches(texto, self.opciones, n=limite, cutoff=0.6)
+        nombres_parecidos = difflib.get_close_matches(texto, list(self._nombres.values()), n=limite, cutoff=0.6)
+        encontrados += [t for t, nombre in self._nombres.items() if nombre in nombres_parecidos]
+        return list(dict.fromkeys(encontrados))[:limite]
+
+
+def _leer_extra(archivo):
+    extra = pd.read_csv(archivo)
+    extra["Ticker"] = extra["Ticker"].str.upper().str.strip()
+    return extra.reindex(columns=["Ticker", "Nombre", "Sector"])
+
+
+def actualizar_universo(archivo=ARCHIVO_UNIVERSO, extra=ARCHIVO_EXTRA):
+    """Vuelve a armar la tabla con los constituyentes actuales del S&P 500 (y el CSV ``extra``)."""
+    tablas = [constituyentes_sp500()[["Ticker", "Nombre", "Sector"]]]
+    if extra:
+        tablas.append(_leer_extra(extra))
+    tabla = pd.concat(tablas).drop_duplicates("Ticker").set_index("Ticker").sort_index()
+
+    archivo.parent.mkdir(parents=True, exist_ok=True)
+    temporal = archivo.with_suffix(f".{os.getpid()}.tmp")
+    tabla.to_parquet(temporal)
+    os.replace(temporal, archivo)
+    return Universo(tabla)
+
+
+def _renovar(archivo):
+    try:
+        actualizar_universo(archivo)
+    except Exception:
+        pass
+
+
+def renovar_en_segundo_plano(archivo=ARCHIVO_UNIVERSO):
+    """Lanza ``actualizar_universo`` en un hilo y devuelve el hilo, salvo que ya
+    haya una renovación en curso o que la última empezara hace menos de
+    ESPERA_REINTENTO (entonces devuelve None)."""
+    global _renovacion, _ultimo_intento
+    with _lock:
+        ahora = time.time()
+        en_curso = _renovacion is not None and _renovacion.is_alive()
+        if en_curso or ahora - _ultimo_intento < ESPERA_REINTENTO:
+            return None
+        _ultimo_intento = ahora
+        hilo = _renovacion = threading.Thread(target=_renovar, args=(archivo,), name="universo", daemon=True)
+    hilo.start()
+    return hilo
+
+
+def cargar_universo(archivo=ARCHIVO_UNIVERSO, incluido=ARCHIVO_INCLUIDO):
+    """Universo local sin esperar a la red: la copia de ``archivo`` o, mientras no
+    exista, la incluida en el repositorio. Si la copia falta o caducó se renueva
+    en segundo plano y las ejecuciones siguientes ya leen la nueva. Sin ninguna
+    tabla se usa el índice de fundamentales; sin él tampoco, devuelve None."""
+    global _universo
+    existe = archivo.exists()
+    if not existe or time.time() - archivo.stat().st_mtime >= TTL_UNIVERSO:
+        renovar_en_segundo_plano(archivo)
+
+    origen = archivo if existe else incluido
+    if origen.exists():
+        version = (str(origen), origen.stat().st_mtime)
+        with _lock:
+            if _universo is None or _universo[0] != version:
+                _universo = (version, Universo(pd.read_parquet(origen)))
+            return _universo[1]
+
+    version = ("indice", version_indice())
+    if version[1] is None:
+        return None
+    with _lock:
+        if _universo is None or _universo[0] != version:
+            _universo = (version, Universo(cargar_indice()[["Nombre", "Sector"]]))
+        return _universo[1]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Actualiza el universo local de tickers.")
+    parser.add_argument("--extra", help="CSV con más símbolos (columnas Ticker, Nombre, Sector)", default=ARCHIVO_EXTRA)
+    parser.add_argument("--archivo", type=Path, default=ARCHIVO_UNIVERSO)
+    args = parser.parse_args(argv)
+
+    universo = actualizar_universo(args.archivo, args.extra)
+    print(f"Universo guardado en {args.archivo}: {len(universo)} tickers.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())